@@ -1,56 +1,101 @@
-from dotenv import load_dotenv
-from langchain.agents import tool
-from langchain.agents.output_parsers import ReActSingleInputOutputParser
-from langchain.prompts import PromptTemplate
-from langchain.tools.render import render_text_description
-from langchain_openai import ChatOpenAI
-from langchain.tools import Tool
-import os
-from typing import Union, List
-from langchain.schema import AgentAction, AgentFinish
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.agents import AgentAction, AgentFinish
+from langchain_core.prompts import PromptTemplate
+from langchain_core.tools import Tool, render_text_description, tool
+from typing import Callable, Iterator, Optional, Union, List
 from pathlib import Path
 import sqlalchemy as sa
-from langchain.agents.format_scratchpad import format_log_to_str
-from langchain_pinecone import PineconeVectorStore
-from langchain_openai import OpenAIEmbeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.runnables import Runnable
 from langchain_core.exceptions import OutputParserException
-from streamlit import secrets
+from tools.config import config
+from tools.cache import get_llm_cache, cached_embeddings
+from tools.timing import StageTimer
+from tools.db import connect
+from tools.query_result import prune_spool, stream_result, result_file_from_observation
+from tools.scratchpad import Scratchpad
+from tools.result_cache import get_result_cache
+from tools.retrieval import Retriever, get_retriever
+from tools.schema_catalog import get_schema_catalog
+from tools.sql_check import check_sql
+from tools.tracing import annotate
 
 
 current_dir = Path(__file__).resolve().parent
-dotenv_path = current_dir.parent / '.env'
-load_dotenv(dotenv_path)
 
-redshift_dsn = secrets["REDSHIFT_DSN"]
+def precheck_query(query: str) -> List[str]:
+    """Errors found in `query` locally against the crawled schema catalog, so failing SQL never reaches Redshift."""
+    if not config.get("SQL_PRECHECK_ENABLED", True):
+        return []
+    return check_sql(query, get_schema_catalog())
 
-engine = sa.create_engine(redshift_dsn)
+def _execute_sql(connection: sa.engine.Connection, sql: str) -> sa.engine.CursorResult:
+    """Run generated SQL as is, a `:name` or `%` inside its literals is not a bind parameter."""
+    return connection.execution_options(no_parameters=True).exec_driver_sql(sql)
 
-openai_api_key = secrets["OPENAI_API_KEY"]
-pinecone_api_key = secrets["PINECONE_API_KEY"]
-pinecone_index_name = secrets["PINECONE_INDEX_NAME"]
-
-@tool
-def validate_redshift_query(query: str) -> str:
-    """Validate the SQL query in Redshift to ensure it can be executed without errors."""
-    with engine.connect() as connection:
-        test_query = query
+def explain_query(query: str) -> str:
+    """The warehouse round trip of `validate_redshift_query`, replaced by fixtures in replay benchmarks."""
+    with connect() as connection:
+        # EXPLAIN parses and plans the query without running it
+        test_query = f"EXPLAIN {query.strip().rstrip(';')}"
         try:
-            columns_result = connection.execute(sa.text(test_query))
-            row = columns_result.fetchone()
+            _execute_sql(connection, test_query).fetchall()
             return "Query is valid"
         except Exception as e:
             return f"Error occurred while validating query: {str(e)}"
+
+def execute_query(query: str) -> Optional[str]:
+    """The warehouse round trip of `run_redshift_query`: the result preview, or None when the query fails."""
+    fetch_size = int(config.get("RESULT_FETCH_SIZE", 1000))
+    spool_dir = config.get("RESULT_SPOOL_DIR", "")
+    spool_dir = current_dir.parent / spool_dir if spool_dir else None
+    with connect() as connection:
+        try:
+            # Server-side cursor fetched in batches, only a bounded preview goes back to the agent
+            result = _execute_sql(connection.execution_options(stream_results=True), query)
+            observation = stream_result(
+                result,
+                max_rows=int(config.get("RESULT_MAX_ROWS", 50)),
+                max_bytes=int(config.get("RESULT_MAX_BYTES", 4000)),
+                spool_dir=spool_dir,
+                fetch_size=fetch_size
+            )
+        except sa.exc.SQLAlchemyError:
+            return None
+    if spool_dir is not None:
+        prune_spool(spool_dir, int(config.get("RESULT_SPOOL_MAX_BYTES", 1073741824)))
+    return observation
+
+@tool
+def validate_redshift_query(query: str) -> str:
+    """Validate the SQL query in Redshift to ensure it can be executed without errors."""
+    errors = precheck_query(query)
+    if errors:
+        annotate(precheck_errors=len(errors))
+        return f"Error occurred while validating query: {'; '.join(errors)}"
+    return explain_query(query)
         
 @tool
 def run_redshift_query(query: str) -> Union[str, List[str]]:
     """Run the SQL Query which already validated then return the result."""
-    with engine.connect() as connection:
-        try:
-            result = connection.execute(sa.text(query))
-            rows = result.fetchall()
-            return f"{str(rows)}"
-        except Exception as e:
-            return "Redshift SQL query is not valid"
+    errors = precheck_query(query)
+    if errors:
+        annotate(precheck_errors=len(errors))
+        return f"Redshift SQL query is not valid: {'; '.join(errors)}"
+    result_cache = get_result_cache()
+    if result_cache is not None:
+        cached = result_cache.get(query)
+        annotate(cached=cached is not None)
+        if cached is not None:
+            return cached
+    observation = execute_query(query)
+    if observation is None:
+        return "Redshift SQL query is not valid"
+    if result_cache is not None:
+        result_cache.set(query, observation)
+    return observation
         
 def find_tool_by_name(tools: List[Tool], tool_name:str)->Tool:
     for tool in tools:
@@ -58,12 +103,9 @@ def find_tool_by_name(tools: List[Tool], tool_name:str)->Tool:
             return tool
     raise ValueError(f"Tool with '{tool_name}' not found.")
 
-def redshift_agent(query: str, docsearch: PineconeVectorStore) -> str:
-    docs = docsearch.similarity_search(query, k=5)
-    context = "\n".join([doc.page_content for doc in docs])
-    tools = [validate_redshift_query, run_redshift_query]
+tools = [validate_redshift_query, run_redshift_query]
 
-    template = """
+AGENT_TEMPLATE = """
     You are an agent designed to interact with a Redshift database accurately. You have access to the following tools:
 
     {tools}
@@ -93,43 +135,196 @@ def redshift_agent(query: str, docsearch: PineconeVectorStore) -> str:
     Question: {input}
     Thought: {agent_scratchpad}
     """
+
+PARALLEL_TOOLS_INSTRUCTIONS = """    When the question needs several independent facts, you can request up to {max_parallel_actions} actions in one step: write one Action and Action Input pair after another, then stop. They run at the same time, then each observation is shown after its action. Only combine actions that do not depend on each other's results.
+
+"""
+
+def get_agent_llm(http_client=None) -> BaseChatModel:
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(
+        api_key=config["OPENAI_API_KEY"],
+        temperature=0,
+        stop=["\n    Observation","\nObservation"],
+        cache=get_llm_cache(),
+        http_client=http_client
+    )
+
+def build_agent(llm: BaseChatModel, parallel: Optional[bool] = None) -> Runnable:
+    """Build the agent runnable once; the retrieved context is passed on every invoke.
+
+    With `parallel` (default AGENT_PARALLEL_TOOLS) the LLM may request several actions per turn
+    and the runnable returns them as a list.
+    """
+    # Importing langchain.agents pulls in most of langchain, so only when an agent is built
+    from langchain.agents.format_scratchpad import format_log_to_str
+    from langchain.agents.output_parsers import ReActSingleInputOutputParser
+    from parser.output_parser import ReActMultiActionOutputParser
+
+    if parallel is None:
+        parallel = config.get("AGENT_PARALLEL_TOOLS", False)
+    template = AGENT_TEMPLATE
+    if parallel:
+        template = template.replace("    Begin!", PARALLEL_TOOLS_INSTRUCTIONS + "    Begin!")
     prompt = PromptTemplate.from_template(template=template).partial(
         tools=render_text_description(tools),
-        context=context,
         tool_names=", ".join([t.name for t in tools])
     )
+    if parallel:
+        prompt = prompt.partial(max_parallel_actions=str(int(config.get("AGENT_MAX_PARALLEL_ACTIONS", 4))))
+    return {
+        "input": lambda x:x["input"],
+        "context": lambda x:x["context"],
+        "agent_scratchpad": lambda x: format_log_to_str(x["agent_scratchpad"]),
+        } | prompt | llm | (ReActMultiActionOutputParser() if parallel else ReActSingleInputOutputParser())
 
-    llm = ChatOpenAI(
-        api_key=openai_api_key,
-        temperature=0,
-        stop=["\n    Observation","\nObservation"]
+def get_scratchpad() -> Scratchpad:
+    """A fresh scratchpad for one question, configured from the SCRATCHPAD_* secrets."""
+    return Scratchpad(
+        token_budget=int(config.get("SCRATCHPAD_TOKEN_BUDGET", 2000)),
+        keep_recent=int(config.get("SCRATCHPAD_KEEP_RECENT", 2)),
+        compact_observation_chars=int(config.get("SCRATCHPAD_COMPACT_OBSERVATION_CHARS", 200))
     )
 
-    intermediate_steps = []
+_tool_pool = None
+_tool_pool_lock = threading.Lock()
+
+def get_tool_pool() -> ThreadPoolExecutor:
+    """Process-wide threads running the tool calls of parallel agent turns."""
+    global _tool_pool
+    with _tool_pool_lock:
+        if _tool_pool is None:
+            _tool_pool = ThreadPoolExecutor(
+                max_workers=int(config.get("AGENT_PARALLEL_TOOL_WORKERS", 8)),
+                thread_name_prefix="agent-tool"
+            )
+        return _tool_pool
+
+def _run_tool(action: AgentAction, timer: StageTimer, iteration: int) -> str:
+    tool_to_use = find_tool_by_name(tools, action.tool)
+    with timer.span(f"tool:{action.tool}", iteration=iteration, sql=str(action.tool_input)) as span:
+        observation = str(tool_to_use.func(str(action.tool_input)))
+        span.set(observation_bytes=len(observation.encode("utf-8")))
+    return observation
+
+def run_tools(actions: List[AgentAction], timer: StageTimer, iteration: int) -> List[str]:
+    """The observations of `actions`, run concurrently on the tool pool when there are several."""
+    if len(actions) == 1:
+        return [_run_tool(actions[0], timer, iteration)]
+    # Each call gets a copy of the context so its span nests under the current trace
+    futures = [
+        get_tool_pool().submit(contextvars.copy_context().run, _run_tool, action, timer, iteration)
+        for action in actions
+    ]
+    return [future.result() for future in futures]
+
+class AgentCancelled(Exception):
+    """Raised inside the agent loop when `should_stop` reports the question was cancelled."""
+
+def iter_redshift_agent(
+    query: str,
+    docsearch: Retriever,
+    agent: Optional[Runnable] = None,
+    timer: Optional[StageTimer] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+    scratchpad: Optional[Scratchpad] = None,
+    max_iterations: Optional[int] = None,
+) -> Iterator[dict]:
+    """Run the ReAct loop, yielding an "action" and an "observation" event per tool call
+    and finally a "finish" event holding the AgentFinish. `should_stop` is checked before every LLM turn.
+
+    When the agent requests several actions in one turn (AGENT_PARALLEL_TOOLS), up to
+    AGENT_MAX_PARALLEL_ACTIONS of them run concurrently and their observations are returned together.
+
+    The steps are sent back to the LLM through `scratchpad`, which keeps them under its token budget.
+    After `max_iterations` LLM turns without a final answer the loop stops with "stopped" set in the
+    return values. The per-iteration token accounting is returned as "iterations".
+    """
+    timer = timer or StageTimer()
+    with timer.stage("retrieval"), timer.span("retrieval") as span:
+        docs = docsearch.similarity_search(query, k=5)
+        span.set(documents=len(docs))
+    context = "\n".join([doc.page_content for doc in docs])
+
+    if agent is None:
+        agent = build_agent(get_agent_llm())
+
+    scratchpad = scratchpad or get_scratchpad()
+    max_iterations = max_iterations or int(config.get("AGENT_MAX_ITERATIONS", 10))
+    max_actions = int(config.get("AGENT_MAX_PARALLEL_ACTIONS", 4))
 
-    agent = {
-        "input": lambda x:x["input"],
-        "agent_scratchpad": lambda x: format_log_to_str(x["agent_scratchpad"]),
-        } | prompt | llm | ReActSingleInputOutputParser()
-    
     agent_step = ""
-    last_step = None
+    last_sql = None
+    last_result_file = None
     while not isinstance(agent_step, AgentFinish):
-        agent_step: Union[AgentAction, AgentFinish] = agent.invoke({"input":query, "agent_scratchpad": intermediate_steps})
-        print(agent_step)
-        if isinstance(agent_step, AgentAction):
-            tool_name = agent_step.tool
-            tool_to_use = find_tool_by_name(tools, tool_name)
-            tool_input = agent_step.tool_input
-
-            observation = tool_to_use.func(str(tool_input))
-            intermediate_steps.append((agent_step, str(observation)))
-    
-    return agent_step
+        if should_stop is not None and should_stop():
+            raise AgentCancelled("Question was cancelled")
+        if len(scratchpad.iterations) >= max_iterations:
+            agent_step = AgentFinish(
+                {"output": f"Agent stopped after {max_iterations} iterations without reaching a final answer.", "stopped": True},
+                log=""
+            )
+            break
+        intermediate_steps = scratchpad.steps()
+        usage_before = dict(timer.usage.get("agent_loop", {}))
+        with timer.stage("agent_loop"), timer.span("iteration", iteration=len(scratchpad.iterations) + 1) as span:
+            agent_step: Union[AgentAction, List[AgentAction], AgentFinish] = agent.invoke(
+                {"input":query, "context": context, "agent_scratchpad": intermediate_steps},
+                config={"callbacks": timer.callbacks}
+            )
+            usage_after = timer.usage.get("agent_loop", {})
+            scratchpad.record_iteration(
+                prompt_tokens=usage_after.get("prompt_tokens", 0) - usage_before.get("prompt_tokens", 0),
+                completion_tokens=usage_after.get("completion_tokens", 0) - usage_before.get("completion_tokens", 0),
+                scratchpad_tokens=Scratchpad.tokens(intermediate_steps)
+            )
+            span.set(**scratchpad.iterations[-1], final=isinstance(agent_step, AgentFinish))
+        if isinstance(agent_step, AgentFinish):
+            break
+        actions = agent_step if isinstance(agent_step, list) else [agent_step]
+        for action in actions:
+            yield {"type": "action", "thought": action.log, "tool": action.tool, "tool_input": str(action.tool_input)}
+
+        # The tool spans are siblings of the iteration's span, which is closed before the actions are yielded
+        with timer.stage("agent_loop"):
+            observations = run_tools(actions[:max_actions], timer, len(scratchpad.iterations))
+        observations += [
+            f"Not run, at most {max_actions} actions run at once. Request it again if it is still needed."
+        ] * len(actions[max_actions:])
+        for i, (action, observation) in enumerate(zip(actions, observations)):
+            scratchpad.add(action, observation)
+            yield {"type": "observation", "tool": action.tool, "observation": observation}
+            if action.tool == run_redshift_query.name and i < max_actions:
+                last_sql = str(action.tool_input)
+                last_result_file = result_file_from_observation(observation)
+
+    agent_step.return_values["sql"] = last_sql
+    agent_step.return_values["result_file"] = last_result_file
+    agent_step.return_values["iterations"] = scratchpad.iterations
+    yield {"type": "finish", "step": agent_step}
+
+def redshift_agent(
+    query: str,
+    docsearch: Retriever,
+    agent: Optional[Runnable] = None,
+    timer: Optional[StageTimer] = None,
+    on_step: Optional[Callable[[dict], None]] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+) -> str:
+    """Run the ReAct loop to completion; `on_step` receives every event of `iter_redshift_agent`."""
+    for event in iter_redshift_agent(query, docsearch, agent=agent, timer=timer, should_stop=should_stop):
+        if event["type"] == "finish":
+            return event["step"]
+        if on_step is not None:
+            on_step(event)
 
 if __name__ == "__main__":
-    embeddings = OpenAIEmbeddings(api_key=openai_api_key, model="text-embedding-ada-002")
-    docsearch = PineconeVectorStore(index_name=pinecone_index_name, embedding=embeddings, pinecone_api_key=pinecone_api_key)
+    from langchain_openai import OpenAIEmbeddings
+    from tools.vector_store import get_vectorstore
+
+    embeddings = cached_embeddings(OpenAIEmbeddings(api_key=config["OPENAI_API_KEY"], model="text-embedding-ada-002"))
+    docsearch = get_retriever(get_vectorstore(embeddings), embeddings)
     
     query = "Which seller_id has the highest total sales value?"
     result = redshift_agent(query, docsearch)
@@ -0,0 +1,115 @@
+"""Compare the per-table metadata crawl with the bulk schema crawl.
+
+Runs against a local Postgres stand-in for Redshift. The schema is seeded with
+synthetic tables and `admin.v_generate_tbl_ddl` is emulated with a view so the
+per-table path can run unchanged.
+
+    python -m benchmarks.bench_crawl_metadata --dsn postgresql://postgres@localhost/postgres --tables 500
+"""
+
+import argparse
+import os
+import time
+
+import sqlalchemy as sa
+
+from tools import sql_helper
+from tools.db import set_engine
+
+
+DDL_VIEW = """
+CREATE OR REPLACE VIEW admin.v_generate_tbl_ddl AS
+SELECT ns.nspname AS schemaname, cl.relname AS tablename,
+'ALTER TABLE ' || ns.nspname || '.' || cl.relname || ' ADD FOREIGN KEY (' || att.attname || ') REFERENCES '
+|| fns.nspname || '.' || fcl.relname || '(' || fatt.attname || ');' AS ddl
+FROM pg_constraint con
+JOIN pg_class cl ON cl.oid = con.conrelid
+JOIN pg_namespace ns ON ns.oid = cl.relnamespace
+JOIN pg_attribute att ON att.attrelid = con.conrelid AND att.attnum = con.conkey[1]
+JOIN pg_class fcl ON fcl.oid = con.confrelid
+JOIN pg_namespace fns ON fns.oid = fcl.relnamespace
+JOIN pg_attribute fatt ON fatt.attrelid = con.confrelid AND fatt.attnum = con.confkey[1]
+WHERE con.contype = 'f'
+"""
+
+
+def seed(engine, schema_name: str, table_count: int):
+    with engine.begin() as connection:
+        connection.execute(sa.text(f"DROP SCHEMA IF EXISTS {schema_name} CASCADE"))
+        connection.execute(sa.text(f"CREATE SCHEMA {schema_name}"))
+        connection.execute(sa.text("CREATE SCHEMA IF NOT EXISTS admin"))
+        connection.execute(sa.text(DDL_VIEW))
+        for i in range(table_count):
+            table_name = f"table_{i:05d}"
+            parent = f", parent_id int REFERENCES {schema_name}.table_{i - 1:05d}(id)" if i else ""
+            connection.execute(sa.text(f"""
+            CREATE TABLE {schema_name}.{table_name} (
+                id int PRIMARY KEY{parent},
+                name varchar(64),
+                amount numeric(12, 2),
+                created_at timestamp
+            );
+            COMMENT ON TABLE {schema_name}.{table_name} IS 'Synthetic table number {i}';
+            COMMENT ON COLUMN {schema_name}.{table_name}.name IS 'Name of the record';
+            """))
+        # A composite primary key, and a view without any key that only the bulk crawl reads
+        connection.execute(sa.text(f"""
+        CREATE TABLE {schema_name}.order_lines (
+            order_id int,
+            line_no int,
+            amount numeric(12, 2),
+            PRIMARY KEY (order_id, line_no)
+        );
+        CREATE VIEW {schema_name}.order_totals AS
+        SELECT order_id, SUM(amount) AS amount FROM {schema_name}.order_lines GROUP BY order_id;
+        """))
+
+
+def normalize(metadata: dict) -> dict:
+    return {**metadata, "foreign_keys": sorted(metadata["foreign_keys"], key=lambda fk: fk["foreign_key"])}
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--dsn", default=os.environ.get("BENCH_PG_DSN"), help="Postgres DSN (or BENCH_PG_DSN)")
+    arg_parser.add_argument("--schema", default="bench_mart")
+    arg_parser.add_argument("--tables", type=int, default=200)
+    args = arg_parser.parse_args()
+    if not args.dsn:
+        arg_parser.error("--dsn or BENCH_PG_DSN is required")
+
+    engine = sa.create_engine(args.dsn)
+    set_engine(engine)
+
+    print(f"Seeding {args.tables} tables into {args.schema}...")
+    seed(engine, args.schema, args.tables)
+
+    start = time.perf_counter()
+    with engine.connect() as connection:
+        table_names = connection.execute(sa.text(
+            "select tablename from pg_tables where schemaname = :schema order by tablename"
+        ), {"schema": args.schema}).scalars().all()
+    per_table = [sql_helper.get_table_metadata(args.schema, table_name) for table_name in table_names]
+    per_table_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    bulk = sql_helper.get_schemas_metadata(args.schema)
+    bulk_seconds = time.perf_counter() - start
+
+    per_table_by_name = {metadata["table_name"]: normalize(metadata) for metadata in per_table}
+    mismatches = [
+        metadata["table_name"] for metadata in bulk
+        if metadata["table_name"] in per_table_by_name and normalize(metadata) != per_table_by_name[metadata["table_name"]]
+    ]
+    # Every crawled table and view must render, with or without a primary key
+    for metadata in bulk:
+        sql_helper.metadata_to_text(metadata)
+
+    print(f"per-table: {len(per_table)} tables in {per_table_seconds:.3f}s")
+    print(f"bulk:      {len(bulk)} tables and views in {bulk_seconds:.3f}s")
+    print(f"speedup:   {per_table_seconds / bulk_seconds:.1f}x")
+    print(f"mismatching tables: {len(mismatches)}")
+
+
+if __name__ == "__main__":
+    main()
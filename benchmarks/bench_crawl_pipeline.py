@@ -0,0 +1,98 @@
+"""Time every stage of the crawl pipeline over thousands of tables.
+
+Seeds a local Postgres stand-in for Redshift with foreign-key linked tables, then runs `crawl`
+end to end with a fake summarizer LLM, hashing embeddings and stores in a temporary directory:
+a full crawl, an incremental re-crawl with nothing changed, and one after `--changed` tables
+gained a column. Prints the time spent per stage of each run.
+
+    python -m benchmarks.bench_crawl_pipeline --dsn postgresql://postgres@localhost/postgres --tables 2000 --llm-latency 0.05
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import sqlalchemy as sa
+
+from benchmarks.bench_crawl_metadata import seed
+from benchmarks.bench_summarize import FakeLLM
+from benchmarks.stubs import HashingEmbeddings
+from core.crawl_metadata import CrawlContext, crawl
+from tools.answer_cache import SemanticAnswerCache
+from tools.config import config
+from tools.crawl_manifest import CrawlManifest
+from tools.db import set_engine
+from tools.keyword_index import BM25Index
+from tools.result_cache import ResultCache
+from tools.schema_catalog import SchemaCatalog
+from tools.schema_context import ColumnIndex
+from tools.timing import StageTimer
+from tools.vector_store import LocalVectorStore
+
+
+def build_context(path: Path, llm: FakeLLM, columns: bool) -> CrawlContext:
+    embeddings = HashingEmbeddings()
+    return CrawlContext(
+        embeddings=embeddings,
+        vectorstore=LocalVectorStore(embeddings, path=path / "vector_store"),
+        keyword_index=BM25Index(path / "keyword_index.json"),
+        catalog=SchemaCatalog(path / "schema_catalog.pkl"),
+        column_index=ColumnIndex(
+            BM25Index(path / "column_index" / "keyword_index.json", column_boost=0),
+            LocalVectorStore(embeddings, path=path / "column_index" / "vector_store")
+        ) if columns else None,
+        manifest=CrawlManifest(path / "crawl_manifest.json"),
+        answer_cache=SemanticAnswerCache(path / "answer_cache.sqlite", embeddings),
+        result_cache=ResultCache(path / "result_cache.sqlite"),
+        summarize=llm
+    )
+
+
+def run(label: str, tables: list, context: CrawlContext, llm: FakeLLM, full: bool = False):
+    timer = StageTimer()
+    calls_before = llm.calls
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        changed, unchanged, dropped = crawl(tables, full=full, context=context, timer=timer)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12} wall={elapsed:7.2f}s changed={len(changed)} unchanged={len(unchanged)} dropped={len(dropped)} llm calls={llm.calls - calls_before}")
+    print(f"{'':<12} {timer.report()}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--dsn", default=os.environ.get("BENCH_PG_DSN"), help="Postgres DSN (or BENCH_PG_DSN)")
+    arg_parser.add_argument("--schema", default="bench_crawl_pipeline")
+    arg_parser.add_argument("--tables", type=int, default=2000)
+    arg_parser.add_argument("--changed", type=int, default=50, help="tables altered before the last re-crawl")
+    arg_parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds per fake summarizer call")
+    arg_parser.add_argument("--concurrency", type=int, default=8)
+    arg_parser.add_argument("--columns", action="store_true", help="also build the column index, as with RETRIEVAL_MODE=column")
+    args = arg_parser.parse_args()
+    if not args.dsn:
+        arg_parser.error("--dsn or BENCH_PG_DSN is required")
+
+    engine = sa.create_engine(args.dsn)
+    set_engine(engine)
+    start = time.perf_counter()
+    seed(engine, args.schema, args.tables)
+    print(f"seeded {args.tables} tables in {time.perf_counter() - start:.1f}s")
+    config.set("SUMMARY_CONCURRENCY", args.concurrency)
+
+    tables = [{"schema_name": args.schema, "table_name": f"table_{i:05d}"} for i in range(args.tables)]
+    llm = FakeLLM(args.llm_latency)
+    context = build_context(Path(tempfile.mkdtemp()), llm, args.columns)
+    run("full", tables, context, llm, full=True)
+    run("unchanged", tables, context, llm)
+    with engine.begin() as connection:
+        for i in range(0, args.tables, max(1, args.tables // args.changed)):
+            connection.execute(sa.text(f"ALTER TABLE {args.schema}.table_{i:05d} ADD COLUMN note varchar(64)"))
+    run("changed", tables, context, llm)
+
+
+if __name__ == "__main__":
+    main()
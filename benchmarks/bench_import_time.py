@@ -0,0 +1,77 @@
+"""Measure the cold import time of the app's entry modules with `python -X importtime`.
+
+Every module is imported in a fresh interpreter, `--runs` times, and the median cumulative
+time is reported along with the heaviest imports it pulls in. `--baseline <git rev>` measures
+the same modules in that revision, extracted to a temporary directory with `git archive`,
+to show the difference.
+
+    python -m benchmarks.bench_import_time --baseline HEAD~1
+"""
+
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+from io import BytesIO
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+MODULES = ["tools.sql_helper", "agents.redshift_agent", "core.run", "core.crawl_metadata"]
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_times(root: Path, module: str) -> dict:
+    """Cumulative microseconds of every module imported by a cold `import module` run in `root`."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=root, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed in {root}:\n{completed.stderr[-2000:]}")
+    times = {}
+    for line in completed.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            times[match.group(4)] = int(match.group(2))
+    return times
+
+
+def measure(root: Path, module: str, runs: int) -> tuple:
+    samples = [import_times(root, module) for _ in range(runs)]
+    total = statistics.median(sample[module] for sample in samples)
+    return total, samples[-1]
+
+
+def extract(rev: str) -> Path:
+    archive = subprocess.run(["git", "archive", rev], cwd=ROOT, capture_output=True, check=True).stdout
+    path = Path(tempfile.mkdtemp())
+    with tarfile.open(fileobj=BytesIO(archive)) as tar:
+        tar.extractall(path, filter="data")
+    return path
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--modules", nargs="+", default=MODULES)
+    arg_parser.add_argument("--runs", type=int, default=5)
+    arg_parser.add_argument("--top", type=int, default=5, help="heaviest imports listed per module")
+    arg_parser.add_argument("--baseline", help="git revision to compare with, e.g. HEAD~1")
+    args = arg_parser.parse_args()
+
+    baseline = extract(args.baseline) if args.baseline else None
+    for module in args.modules:
+        total, times = measure(ROOT, module, args.runs)
+        line = f"{module:<24} {total / 1000:7.0f}ms"
+        if baseline is not None:
+            baseline_total, _ = measure(baseline, module, args.runs)
+            line += f"  {args.baseline}: {baseline_total / 1000:7.0f}ms  ({(baseline_total - total) / 1000:+.0f}ms saved)"
+        print(line)
+        heaviest = sorted((name for name in times if name != module and "." not in name), key=times.get, reverse=True)
+        print("    " + ", ".join(f"{name}={times[name] / 1000:.0f}ms" for name in heaviest[:args.top]))
+
+
+if __name__ == "__main__":
+    main()
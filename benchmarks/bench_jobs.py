@@ -0,0 +1,63 @@
+"""Load test the background question executor with stubbed LLM and database backends.
+
+Submits --users questions at once and polls them the way the Streamlit UI does.
+Reports throughput, latency percentiles, rejected submissions and, with
+--cancel-every, how quickly cancelled questions stop.
+
+    python -m benchmarks.bench_jobs --users 50 --workers 8 --llm-latency 0.2
+"""
+
+import argparse
+import statistics
+import time
+from functools import partial
+
+from benchmarks.stubs import build_stub_context, use_sqlite_engine
+from core.jobs import ExecutorBusy, QuestionExecutor
+from core.run import ask_redshift_stream
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--users", type=int, default=50)
+    arg_parser.add_argument("--workers", type=int, default=8)
+    arg_parser.add_argument("--max-pending", type=int, default=100)
+    arg_parser.add_argument("--llm-latency", type=float, default=0.2)
+    arg_parser.add_argument("--cancel-every", type=int, default=0, help="Cancel every Nth question after submitting it")
+    args = arg_parser.parse_args()
+
+    use_sqlite_engine()
+    context = build_stub_context(llm_latency=args.llm_latency)
+    executor = QuestionExecutor(partial(ask_redshift_stream, context=context, use_cache=False), max_workers=args.workers, max_pending=args.max_pending)
+
+    start = time.perf_counter()
+    jobs, rejected = [], 0
+    for i in range(args.users):
+        try:
+            job = executor.submit(f"How many sales in region {i}?")
+        except ExecutorBusy:
+            rejected += 1
+            continue
+        if args.cancel_every and i % args.cancel_every == 0:
+            job.cancel()
+        jobs.append(job)
+
+    # Poll like the UI fragment does
+    while not all(job.done for job in jobs):
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - start
+
+    latencies = [job.finished_at - job.submitted_at for job in jobs if job.status == "done"]
+    print(f"submitted={len(jobs)} rejected={rejected} statuses={executor.stats()}")
+    print(f"wall={elapsed:.2f}s throughput={len(latencies) / elapsed:.1f} questions/s")
+    if latencies:
+        print(f"latency p50={statistics.median(latencies) * 1000:.0f}ms p95={percentile(latencies, 0.95) * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
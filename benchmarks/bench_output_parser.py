@@ -0,0 +1,86 @@
+"""Time the ReAct output parser against the regex parser it replaced on large synthetic completions.
+
+`tests/test_output_parser.py` checks that both parse random completions the same way.
+
+    python -m benchmarks.bench_output_parser --sizes 1000 10000 100000
+"""
+
+import argparse
+import re
+import time
+
+from langchain_core.agents import AgentAction, AgentFinish
+from langchain_core.exceptions import OutputParserException
+
+from parser.output_parser import (
+    FINAL_ANSWER_ACTION,
+    FINAL_ANSWER_AND_PARSABLE_ACTION_ERROR_MESSAGE,
+    MISSING_ACTION_AFTER_THOUGHT_ERROR_MESSAGE,
+    MISSING_ACTION_INPUT_AFTER_ACTION_ERROR_MESSAGE,
+    parse_react,
+)
+
+
+def legacy_parse(text: str):
+    """The parser as it was, several DOTALL regex searches over the whole completion."""
+    includes_answer = FINAL_ANSWER_ACTION in text
+    regex = r"Action\s*\d*\s*:(.*?)Action\s*\d*\s*Input\s*\d*\s*:(.*?)(?:$|Thought:|\Z)"
+    action_match = re.search(regex, text, re.DOTALL)
+    if action_match:
+        if includes_answer:
+            raise OutputParserException(f"{FINAL_ANSWER_AND_PARSABLE_ACTION_ERROR_MESSAGE}: {text}")
+        return AgentAction(action_match.group(1).strip(), action_match.group(2).strip(), text)
+    elif includes_answer:
+        final_answer_match = re.split(FINAL_ANSWER_ACTION, text, flags=re.DOTALL)
+        if len(final_answer_match) > 1:
+            return AgentFinish({"output": final_answer_match[-1].strip()}, text)
+    if not re.search(r"Action\s*\d*\s*:", text, re.DOTALL):
+        raise OutputParserException(
+            f"Could not parse LLM output: `{text}`",
+            observation=MISSING_ACTION_AFTER_THOUGHT_ERROR_MESSAGE, llm_output=text, send_to_llm=True,
+        )
+    elif not re.search(r"Action\s*\d*\s*Input\s*\d*\s*:", text, re.DOTALL):
+        raise OutputParserException(
+            f"Could not parse LLM output: `{text}`",
+            observation=MISSING_ACTION_INPUT_AFTER_ACTION_ERROR_MESSAGE, llm_output=text, send_to_llm=True,
+        )
+    else:
+        raise OutputParserException(f"Could not parse LLM output: `{text}`")
+
+
+def synthetic(kind: str, size: int) -> str:
+    thought = "I should look at the sales per region and route, then validate the query before running it. "
+    body = (thought * (size // len(thought) + 1))[:size]
+    if kind == "action":
+        return f"{body}\nAction: run_redshift_query\nAction Input: SELECT region, SUM(sales_value) FROM sales GROUP BY region\n"
+    if kind == "final answer":
+        return f"{body}\nThought: I now know the final answer.\nFinal Answer: {body}"
+    # A completion that mentions actions but never gives an input, the regex tries every "Action:" in turn
+    steps = "".join(f"Action: step {i} of the plan\n" for i in range(size // 24))
+    return f"{body[:size // 10]}\n{steps}"
+
+
+def per_call_ms(function, text: str, seconds: float = 0.3) -> float:
+    calls, start = 0, time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        try:
+            function(text)
+        except OutputParserException:
+            pass
+        calls += 1
+    return (time.perf_counter() - start) / calls * 1000
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = arg_parser.parse_args()
+
+    for kind in ("action", "final answer", "no input"):
+        for size in args.sizes:
+            text = synthetic(kind, size)
+            legacy, new = per_call_ms(legacy_parse, text), per_call_ms(parse_react, text)
+            print(f"{kind:<13} {len(text):>8} chars  regex={legacy:9.3f}ms  parse_react={new:8.3f}ms ({legacy / new:5.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Replay multi-part questions through the agent loop with one tool call per turn and with parallel tool calls.
+
+Every question in `benchmarks/fixtures/multi_part_transcripts.jsonl` needs a few independent probe
+queries. A scripted agent LLM validates and runs them one per turn, or, with AGENT_PARALLEL_TOOLS,
+validates all of them in one turn and runs all of them in the next. LLM calls take --llm-latency
+plus --token-latency per completion token, so batched turns pay for their longer completions,
+and the stub warehouse sleeps per round trip. Reports LLM turns, prompt tokens, warehouse calls
+and latency per question for both modes.
+
+    python -m benchmarks.bench_parallel_tools --latency-scale 0.1
+"""
+
+import argparse
+import statistics
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from langchain_core.documents import Document
+from langchain_core.messages import BaseMessage
+
+from benchmarks.replay import load_sessions, patched_warehouse
+from benchmarks.stubs import REFINE_SCRIPT, HashingEmbeddings, ScriptedChatModel
+from core.context import AppContext
+from core.run import ask_redshift
+from tools.answer_cache import SemanticAnswerCache
+from tools.config import config
+from tools.result_cache import ResultCache, set_result_cache
+from tools.sql_parse import extract_tables
+from tools.timing import StageTimer
+from tools.vector_store import LocalVectorStore
+
+TRANSCRIPTS = Path(__file__).resolve().parent / "fixtures" / "multi_part_transcripts.jsonl"
+FINAL = "I now know the final answer.\nFinal Answer: The answer is in the query results."
+
+
+def sequential_script(probes: List[str]) -> List[str]:
+    script = []
+    for probe in probes:
+        script.append(f"I should check the query for this part of the question.\nAction: validate_redshift_query\nAction Input: {probe}")
+        script.append(f"The query is valid.\nAction: run_redshift_query\nAction Input: {probe}")
+    return script + [FINAL]
+
+
+def parallel_script(probes: List[str]) -> List[str]:
+    validate = "".join(f"\nAction: validate_redshift_query\nAction Input: {probe}" for probe in probes)
+    run = "".join(f"\nAction: run_redshift_query\nAction Input: {probe}" for probe in probes)
+    return [
+        f"The question needs {len(probes)} independent facts, I should check their queries together.{validate}",
+        f"The queries are valid.{run}",
+        FINAL,
+    ]
+
+
+class TurnScriptedChatModel(ScriptedChatModel):
+    """Answers each question from its own script, one entry per LLM turn; `start` selects the question.
+
+    Besides `latency` per call, every completion token costs `token_latency`.
+    """
+
+    scripts: Dict[str, List[str]] = {}
+    question: Optional[str] = None
+    position: int = 0
+
+    def start(self, question: str):
+        self.question = question
+        self.position = 0
+
+    def _reply(self, messages: List[BaseMessage]) -> str:
+        script = self.scripts[self.question]
+        reply = script[min(self.position, len(script) - 1)]
+        self.position += 1
+        time.sleep(self.token_latency * len(reply) // 4)
+        return reply
+
+
+class StubWarehouse:
+    """Counts EXPLAINs and queries, which may arrive concurrently, and sleeps per round trip."""
+
+    def __init__(self, explain_latency: float, query_latency: float):
+        self.explain_latency = explain_latency
+        self.query_latency = query_latency
+        self.executed: List[str] = []
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def explain(self, query: str) -> str:
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.explain_latency)
+        return "Query is valid"
+
+    def execute(self, query: str) -> str:
+        with self.lock:
+            self.calls += 1
+            self.executed.append(query)
+        time.sleep(self.query_latency)
+        return "[(42,)]"
+
+
+def run_mode(transcripts: List[dict], parallel: bool, args) -> dict:
+    config.set("AGENT_PARALLEL_TOOLS", parallel)
+    script = parallel_script if parallel else sequential_script
+    llm = TurnScriptedChatModel(
+        scripts={transcript["question"]: script(transcript["probes"]) for transcript in transcripts},
+        latency=args.llm_latency * args.latency_scale,
+        token_latency=args.token_latency * args.latency_scale
+    )
+    embeddings = HashingEmbeddings()
+    docsearch = LocalVectorStore(embeddings)
+    tables = sorted({table for transcript in transcripts for probe in transcript["probes"] for table in extract_tables(probe)})
+    docsearch.add_documents([Document(page_content=f"Table `{table}`") for table in tables])
+    context = AppContext(
+        embeddings=embeddings,
+        docsearch=docsearch,
+        agent_llm=llm,
+        refine_llm=ScriptedChatModel(script=REFINE_SCRIPT),
+        answer_cache=SemanticAnswerCache(":memory:", embeddings),
+        retriever=docsearch
+    )
+    warehouse = StubWarehouse(args.explain_latency * args.latency_scale, args.query_latency * args.latency_scale)
+    results = {"turns": [], "prompt_tokens": [], "warehouse_calls": [], "latency": [], "executed": {}}
+    with patched_warehouse(lambda query: [], warehouse.explain, warehouse.execute):
+        for transcript in transcripts:
+            llm.start(transcript["question"])
+            timer, details = StageTimer(), {}
+            calls_before, executed_before = warehouse.calls, len(warehouse.executed)
+            start = time.perf_counter()
+            ask_redshift(transcript["question"], context=context, timer=timer, use_cache=False, details=details)
+            results["latency"].append(time.perf_counter() - start)
+            results["turns"].append(len(details["iterations"]))
+            results["prompt_tokens"].append(sum(iteration["prompt_tokens"] for iteration in details["iterations"]))
+            results["warehouse_calls"].append(warehouse.calls - calls_before)
+            results["executed"][transcript["question"]] = sorted(warehouse.executed[executed_before:])
+    context.close()
+    return results
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--transcripts", default=str(TRANSCRIPTS))
+    arg_parser.add_argument("--llm-latency", type=float, default=0.8, help="seconds per agent LLM call")
+    arg_parser.add_argument("--token-latency", type=float, default=0.015, help="seconds per completion token")
+    arg_parser.add_argument("--explain-latency", type=float, default=0.2)
+    arg_parser.add_argument("--query-latency", type=float, default=1.0)
+    arg_parser.add_argument("--latency-scale", type=float, default=1.0, help="factor on all latencies")
+    args = arg_parser.parse_args()
+
+    transcripts = load_sessions(Path(args.transcripts))
+    # Results are not cached, so both modes make the same warehouse round trips
+    set_result_cache(ResultCache(":memory:", max_bytes=0))
+    sequential = run_mode(transcripts, False, args)
+    parallel = run_mode(transcripts, True, args)
+
+    probes = sum(len(transcript["probes"]) for transcript in transcripts)
+    print(f"{len(transcripts)} questions, {probes} probe queries, latency scale {args.latency_scale}")
+    for label, results in (("one per turn", sequential), ("parallel", parallel)):
+        latencies = sorted(results["latency"])
+        print(
+            f"{label:<13} turns={statistics.mean(results['turns']):.2f} prompt tokens={statistics.mean(results['prompt_tokens']):.0f} "
+            f"warehouse calls={statistics.mean(results['warehouse_calls']):.2f} latency p50={statistics.median(latencies) * 1000:.0f}ms "
+            f"max={latencies[-1] * 1000:.0f}ms total={sum(latencies):.2f}s"
+        )
+    same = sum(sequential["executed"][question] == parallel["executed"][question] for question in sequential["executed"])
+    print(f"same queries run in both modes for {same}/{len(transcripts)} questions")
+
+
+if __name__ == "__main__":
+    main()
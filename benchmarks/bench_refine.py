@@ -0,0 +1,46 @@
+"""Compare the answer pipeline with the refine step on demand against always refining.
+
+Uses fake chat models that report OpenAI-like token usage, priced as gpt-4o-mini.
+
+    python -m benchmarks.bench_refine --questions 20 --llm-latency 0.2
+"""
+
+import argparse
+import statistics
+import time
+
+from benchmarks.stubs import build_stub_context, use_sqlite_engine
+from core.run import ask_redshift
+from tools.timing import StageTimer
+
+
+def run(context, questions: int, refine: bool):
+    latencies, timers = [], []
+    for i in range(questions):
+        timer = StageTimer()
+        start = time.perf_counter()
+        ask_redshift(f"How many sales in region {i}?", context=context, timer=timer, use_cache=False, refine=refine)
+        latencies.append((time.perf_counter() - start) * 1000)
+        timers.append(timer)
+    calls = sum(usage["calls"] for timer in timers for usage in timer.usage.values()) / questions
+    tokens = sum(usage["prompt_tokens"] + usage["completion_tokens"] for timer in timers for usage in timer.usage.values()) / questions
+    cost = sum(timer.total_cost() for timer in timers) / questions
+    mode = "always refine" if refine else "refine on demand"
+    print(f"{mode:>16}: p50={statistics.median(latencies):7.1f}ms  LLM calls/question={calls:.1f}  tokens/question={tokens:.0f}  cost/question=${cost:.6f}")
+    print(f"{'':>16}  last question: {timers[-1].report()}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--questions", type=int, default=20)
+    arg_parser.add_argument("--llm-latency", type=float, default=0.2)
+    args = arg_parser.parse_args()
+
+    use_sqlite_engine()
+    context = build_stub_context(llm_latency=args.llm_latency)
+    run(context, args.questions, refine=True)
+    run(context, args.questions, refine=False)
+
+
+if __name__ == "__main__":
+    main()
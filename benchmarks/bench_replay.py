@@ -0,0 +1,90 @@
+"""Replay recorded question sessions through the whole pipeline, offline and deterministically.
+
+The LLM, the retriever and the warehouse answer from a fixture written by `benchmarks.replay`,
+sleeping the recorded latencies times `--latency-scale`, so a change to the agent loop, the
+prompts or the SQL tools can be measured without OpenAI, Pinecone or Redshift. Prompts that no
+longer hash like the recorded ones are reported as drift, calls the fixture has no answer for
+as misses: either means the change altered what the run sends, not only how fast.
+
+    python -m benchmarks.bench_replay --repeat 3 --latency-scale 0.1
+"""
+
+import argparse
+import statistics
+import time
+from pathlib import Path
+
+from benchmarks.replay import ReplayChatModel, ReplayRetriever, ReplayWarehouse, load_sessions
+from benchmarks.stubs import HashingEmbeddings
+from core.context import AppContext
+from core.run import ask_redshift
+from tools.answer_cache import SemanticAnswerCache
+from tools.result_cache import ResultCache, set_result_cache
+from tools.timing import StageTimer
+from tools.vector_store import LocalVectorStore
+
+SESSIONS = Path(__file__).resolve().parent / "fixtures" / "replay_sessions.jsonl"
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--sessions", default=str(SESSIONS), help="fixture recorded by benchmarks.replay")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--latency-scale", type=float, default=1.0, help="factor on the recorded LLM and warehouse latencies")
+    arg_parser.add_argument("--result-cache", action="store_true", help="keep query results cached across repeats")
+    args = arg_parser.parse_args()
+
+    sessions = load_sessions(Path(args.sessions))
+    agent_llm = ReplayChatModel.for_stage(sessions, "agent_loop", args.latency_scale)
+    refine_llm = ReplayChatModel.for_stage(sessions, "refine", args.latency_scale)
+    warehouse = ReplayWarehouse(sessions, args.latency_scale)
+    embeddings = HashingEmbeddings()
+    context = AppContext(
+        embeddings=embeddings,
+        docsearch=LocalVectorStore(embeddings),
+        agent_llm=agent_llm,
+        refine_llm=refine_llm,
+        answer_cache=SemanticAnswerCache(":memory:", embeddings),
+        retriever=ReplayRetriever(sessions)
+    )
+    set_result_cache(ResultCache(":memory:", max_bytes=64 * 1024 * 1024 if args.result_cache else 0))
+
+    latencies, iterations, llm_calls, tokens, warehouse_calls = [], [], [], [], []
+    recorded_latencies = [session["seconds"] * args.latency_scale for session in sessions]
+    with warehouse.installed():
+        for _ in range(args.repeat):
+            for session in sessions:
+                agent_llm.start(session["question"])
+                refine_llm.start(session["question"])
+                timer, details = StageTimer(), {}
+                calls_before = warehouse.calls
+                start = time.perf_counter()
+                ask_redshift(session["question"], context=context, timer=timer, use_cache=False, details=details)
+                latencies.append(time.perf_counter() - start)
+                iterations.append(len(details.get("iterations", [])))
+                llm_calls.append(sum(usage["calls"] for usage in timer.usage.values()))
+                tokens.append(sum(usage["prompt_tokens"] + usage["completion_tokens"] for usage in timer.usage.values()))
+                warehouse_calls.append(warehouse.calls - calls_before)
+
+    print(f"{len(sessions)} recorded questions x {args.repeat}, latency scale {args.latency_scale}")
+    print(
+        f"latency p50={percentile(latencies, 0.5) * 1000:.0f}ms p90={percentile(latencies, 0.9) * 1000:.0f}ms "
+        f"p99={percentile(latencies, 0.99) * 1000:.0f}ms (recorded p50={percentile(recorded_latencies, 0.5) * 1000:.0f}ms)"
+    )
+    print(
+        f"per question: iterations={statistics.mean(iterations):.2f} llm calls={statistics.mean(llm_calls):.2f} "
+        f"tokens={statistics.mean(tokens):.0f} warehouse calls={statistics.mean(warehouse_calls):.2f}"
+    )
+    print(
+        f"prompt drift={agent_llm.drift + refine_llm.drift} llm misses={agent_llm.misses + refine_llm.misses} "
+        f"warehouse misses={warehouse.misses}"
+    )
+
+
+if __name__ == "__main__":
+    main()
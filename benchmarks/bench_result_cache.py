@@ -0,0 +1,92 @@
+"""Replay a dashboard-style workload through run_redshift_query with and without the result cache.
+
+A few aggregate queries are repeated with different formatting against a local Postgres
+stand-in for Redshift. Halfway through, one table is invalidated as a data load would do.
+
+    python -m benchmarks.bench_result_cache --dsn postgresql://postgres@localhost/postgres --rows 1000000 --questions 60
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import sqlalchemy as sa
+
+from agents import redshift_agent
+from tools.db import set_engine
+from tools.result_cache import ResultCache, set_result_cache
+
+QUERIES = [
+    "SELECT seller_id, SUM(amount) AS total FROM bench_result_cache.sales GROUP BY seller_id ORDER BY total DESC LIMIT 10",
+    "SELECT COUNT(*) AS sales, AVG(amount) AS average FROM bench_result_cache.sales",
+    "SELECT region, COUNT(*) AS routes FROM bench_result_cache.routes GROUP BY region ORDER BY region",
+    "SELECT r.region, SUM(s.amount) AS total FROM bench_result_cache.sales s JOIN bench_result_cache.routes r ON s.route_id = r.route_id GROUP BY r.region ORDER BY total DESC",
+    "SELECT route_id, COUNT(*) AS incidents FROM bench_result_cache.incidents GROUP BY route_id ORDER BY incidents DESC LIMIT 10",
+]
+
+
+def reformat(query: str, rng: random.Random) -> str:
+    """The same query as an LLM might write it again: other keyword case, spacing and a trailing semicolon."""
+    if rng.random() < 0.5:
+        query = query.replace("SELECT", "select").replace("GROUP BY", "group by")
+    if rng.random() < 0.5:
+        query = query.replace(" FROM", "\n  FROM")
+    return query + (";" if rng.random() < 0.5 else "")
+
+
+def run(label: str, result_cache: ResultCache, questions: int):
+    set_result_cache(result_cache)
+    rng = random.Random(7)
+    latencies = []
+    for i in range(questions):
+        if i == questions // 2:
+            result_cache.invalidate_tables(["bench_result_cache.sales"])
+        start = time.perf_counter()
+        redshift_agent.run_redshift_query.func(reformat(rng.choice(QUERIES), rng))
+        latencies.append((time.perf_counter() - start) * 1000)
+    stats = result_cache.stats()
+    print(
+        f"{label:<9} p50={statistics.median(latencies):7.1f}ms mean={statistics.mean(latencies):7.1f}ms "
+        f"warehouse queries={stats['misses']:3d} hit ratio={stats['hit_ratio']:.2f} bytes saved={stats['bytes_saved']}"
+    )
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--dsn", default=os.environ.get("BENCH_PG_DSN"), help="Postgres DSN (or BENCH_PG_DSN)")
+    arg_parser.add_argument("--rows", type=int, default=1000000)
+    arg_parser.add_argument("--questions", type=int, default=60)
+    args = arg_parser.parse_args()
+    if not args.dsn:
+        arg_parser.error("--dsn or BENCH_PG_DSN is required")
+
+    engine = sa.create_engine(args.dsn)
+    set_engine(engine)
+    with engine.begin() as connection:
+        connection.execute(sa.text("DROP SCHEMA IF EXISTS bench_result_cache CASCADE"))
+        connection.execute(sa.text("CREATE SCHEMA bench_result_cache"))
+        connection.execute(sa.text(
+            "CREATE TABLE bench_result_cache.sales AS "
+            "SELECT i AS sale_id, i % 1000 AS seller_id, i % 200 AS route_id, (i % 97) * 1.5 AS amount FROM generate_series(1, :rows) i"
+        ), {"rows": args.rows})
+        connection.execute(sa.text(
+            "CREATE TABLE bench_result_cache.routes AS "
+            "SELECT i AS route_id, 'region_' || (i % 8) AS region FROM generate_series(0, 199) i"
+        ))
+        connection.execute(sa.text(
+            "CREATE TABLE bench_result_cache.incidents AS "
+            "SELECT i AS incident_id, i % 200 AS route_id FROM generate_series(1, :rows / 10) i"
+        ), {"rows": args.rows})
+
+    directory = Path(tempfile.mkdtemp())
+    # Nothing fits in a zero-byte cache, so every call goes to the warehouse
+    run("uncached", ResultCache(directory / "uncached.sqlite", max_bytes=0), args.questions)
+    run("cached", ResultCache(directory / "cached.sqlite"), args.questions)
+
+
+if __name__ == "__main__":
+    main()
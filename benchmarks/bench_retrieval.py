@@ -0,0 +1,94 @@
+"""Measure retrieval recall and latency of vector, BM25 and hybrid search on a synthetic catalog.
+
+Table documents are rendered with `meaningful_text_from_metadata` and embedded with an offline
+hashing embedding. Every question names one or two exact columns of the table it is about.
+
+    python -m benchmarks.bench_retrieval --tables 2000 --questions 300
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from benchmarks.stubs import HashingEmbeddings
+from tools.keyword_index import BM25Index, HybridSearch, document_key
+from tools.sql_helper import meaningful_text_from_metadata
+from tools.vector_store import LocalVectorStore
+
+NOUNS = [
+    "seller", "buyer", "route", "station", "ticket", "train", "incident", "maintenance", "invoice", "payment",
+    "carriage", "driver", "delay", "fare", "booking", "customer", "depot", "signal", "platform", "revenue",
+    "cost", "schedule", "crew", "asset", "contract", "supplier", "passenger", "journey", "region", "refund",
+]
+MEASURES = ["amount", "count", "minutes", "value", "score", "rate", "total", "distance", "duration", "weight"]
+SUMMARY = "This table seems to store operational records of the railway business. It is assumed to relate to other tables through its id columns."
+
+
+def synthetic_catalog(tables: int, rng: random.Random):
+    catalog = []
+    for i in range(tables):
+        subject, detail = rng.sample(NOUNS, 2)
+        name = f"{subject}_{detail}_{i}"
+        specific = rng.sample([f"{noun}_{measure}" for noun in NOUNS for measure in MEASURES], 5)
+        columns = [f"{name}_id", "created_at", "updated_at", "status"] + specific
+        catalog.append({
+            "schema_name": "railway_mart",
+            "table_name": name,
+            "table_description": f"contains {subject} {detail} records",
+            "primary_key": {"primary_key_column": f"{name}_id", "primary_key_name": f"{name}_pkey"},
+            "foreign_keys": [],
+            "columns": [{"column_name": c, "column_description": "", "column_type": "integer"} for c in columns],
+        })
+    return catalog
+
+
+def questions_for(catalog, count: int, rng: random.Random):
+    questions = []
+    for metadata in rng.sample(catalog, min(count, len(catalog))):
+        measure, group = rng.sample([c["column_name"] for c in metadata["columns"][4:]], 2)
+        questions.append((f"What is the total {measure} per {group} for each status?", f"railway_mart.{metadata['table_name']}"))
+    return questions
+
+
+def evaluate(label: str, search, questions, k: int):
+    hits, latencies = 0, []
+    for question, expected in questions:
+        start = time.perf_counter()
+        docs = search(question, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += expected in [document_key(doc) for doc in docs]
+    print(f"{label:<7} recall@{k}={hits / len(questions):.3f}  p50={statistics.median(latencies):6.2f}ms  p95={statistics.quantiles(latencies, n=20)[-1]:6.2f}ms")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--tables", type=int, default=2000)
+    arg_parser.add_argument("--questions", type=int, default=300)
+    arg_parser.add_argument("--k", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    rng = random.Random(42)
+    catalog = synthetic_catalog(args.tables, rng)
+    docs = [meaningful_text_from_metadata(metadata, SUMMARY) for metadata in catalog]
+    ids = [f"{metadata['schema_name']}.{metadata['table_name']}" for metadata in catalog]
+
+    start = time.perf_counter()
+    vector_store = LocalVectorStore(HashingEmbeddings())
+    vector_store.add_documents(docs, ids=ids)
+    vector_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    keyword_index = BM25Index()
+    keyword_index.add_documents(docs, ids=ids)
+    keyword_index.search("warm up")
+    print(f"{args.tables} tables: vector index built in {vector_seconds:.2f}s, BM25 index in {time.perf_counter() - start:.2f}s")
+
+    questions = questions_for(catalog, args.questions, rng)
+    hybrid = HybridSearch(vector_store, keyword_index)
+    evaluate("vector", lambda q, k: vector_store.similarity_search(q, k=k), questions, args.k)
+    evaluate("bm25", lambda q, k: keyword_index.search(q, k=k), questions, args.k)
+    evaluate("hybrid", lambda q, k: hybrid.similarity_search(q, k=k), questions, args.k)
+
+
+if __name__ == "__main__":
+    main()
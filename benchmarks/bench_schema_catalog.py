@@ -0,0 +1,65 @@
+"""Measure building, loading and querying the schema catalog with its precomputed join paths.
+
+Uses the synthetic star schema of `bench_schema_context`, with snowflaked dimensions
+so some joins take several hops.
+
+    python -m benchmarks.bench_schema_catalog --facts 1500 --dimensions 500
+"""
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_schema_context import star_schema
+from tools.schema_catalog import SchemaCatalog
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--facts", type=int, default=1500)
+    arg_parser.add_argument("--dimensions", type=int, default=500)
+    arg_parser.add_argument("--lookups", type=int, default=10000)
+    args = arg_parser.parse_args()
+
+    rng = random.Random(5)
+    fact_tables, dims = star_schema(args.facts, args.dimensions, rng)
+    # Snowflake: every dimension after the first references an earlier one
+    for i, dim in enumerate(dims[1:], start=1):
+        parent = dims[rng.randrange(i)]
+        dim["columns"].append({"column_name": f"{parent['table_name']}_id", "column_description": "", "column_type": "integer"})
+        dim["foreign_keys"].append({
+            "foreign_key": f"{parent['table_name']}_id", "foreign_name": f"{dim['table_name']}_parent_fkey",
+            "reference_schema_name": "mart", "reference_table_name": parent["table_name"], "reference_key": f"{parent['table_name']}_id",
+        })
+    metadatas = fact_tables + dims
+    path = Path(tempfile.mkdtemp()) / "schema_catalog.pkl"
+
+    start = time.perf_counter()
+    catalog = SchemaCatalog(path)
+    catalog.upsert(metadatas)
+    catalog.save()
+    print(f"{len(metadatas)} tables, {sum(len(m['columns']) for m in metadatas)} columns: "
+          f"built and saved in {time.perf_counter() - start:.2f}s, {path.stat().st_size / 1e6:.1f} MB")
+
+    loads = []
+    for _ in range(5):
+        start = time.perf_counter()
+        catalog = SchemaCatalog(path)
+        loads.append((time.perf_counter() - start) * 1000)
+    print(f"load p50={statistics.median(loads):.1f}ms")
+
+    ids = list(catalog.tables)
+    pairs = [(rng.choice(ids), rng.choice(ids)) for _ in range(args.lookups)]
+    start = time.perf_counter()
+    hops = [len(catalog.join_path(source, target) or []) for source, target in pairs]
+    elapsed = (time.perf_counter() - start) / args.lookups * 1e6
+    print(f"join_path: {elapsed:.1f}us per lookup, mean {statistics.mean(hops):.1f} joins per path")
+    source, target = fact_tables[0]["table_name"], fact_tables[1]["table_name"]
+    print(f"join_clause({source!r}, {target!r}):\n{catalog.join_clause(source, target)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Compare table-level retrieval with column-level retrieval plus foreign-key expansion.
+
+Builds a synthetic star schema of wide fact and dimension tables. Each question names one fact
+measure and one dimension attribute, so answering needs both tables and their join key.
+Reports how often the context holds everything needed and how large the context is.
+
+    python -m benchmarks.bench_schema_context --facts 150 --dimensions 50 --questions 200
+"""
+
+import argparse
+import random
+import re
+import statistics
+import time
+
+from benchmarks.stubs import HashingEmbeddings
+from tools.keyword_index import BM25Index, HybridSearch
+from tools.schema_catalog import SchemaCatalog
+from tools.schema_context import ColumnIndex, SchemaContextRetriever
+from tools.scratchpad import estimate_tokens
+from tools.sql_helper import meaningful_text_from_metadata
+from tools.vector_store import LocalVectorStore
+
+SUMMARY = "This table seems to store records of the railway business. It is assumed to relate to other tables through its id columns."
+ATTRIBUTES = ["name", "code", "category", "city", "country", "segment", "tier", "channel", "owner", "status"]
+MEASURES = ["amount", "quantity", "minutes", "distance", "cost", "revenue", "weight", "delay", "count", "score"]
+
+
+def table(name: str, description: str, columns: list, primary_key: str, foreign_keys: list) -> dict:
+    return {
+        "schema_name": "mart",
+        "table_name": name,
+        "table_description": description,
+        "primary_key": {"primary_key_column": primary_key, "primary_key_name": f"{name}_pkey"},
+        "foreign_keys": foreign_keys,
+        "columns": [{"column_name": c, "column_description": "", "column_type": "integer"} for c in columns],
+    }
+
+
+def star_schema(facts: int, dimensions: int, rng: random.Random):
+    dims = []
+    for i in range(dimensions):
+        name = f"dim_{i}"
+        attributes = [f"{name}_{attribute}_{j}" for j in range(6) for attribute in ATTRIBUTES]
+        dims.append(table(name, f"describes dimension {i}", [f"{name}_id"] + attributes, f"{name}_id", []))
+    fact_tables = []
+    for i in range(facts):
+        name = f"fact_{i}"
+        joined = rng.sample(dims, 3)
+        keys = [f"{dim['table_name']}_id" for dim in joined]
+        measures = [f"{name}_{measure}_{j}" for j in range(10) for measure in MEASURES]
+        foreign_keys = [{
+            "foreign_key": key, "foreign_name": f"{name}_{key}_fkey",
+            "reference_schema_name": "mart", "reference_table_name": dim["table_name"], "reference_key": key,
+        } for key, dim in zip(keys, joined)]
+        fact_tables.append(table(name, f"records fact events {i}", [f"{name}_id"] + keys + measures, f"{name}_id", foreign_keys))
+    return fact_tables, dims
+
+
+def questions_for(fact_tables, dims, count: int, rng: random.Random):
+    by_name = {dim["table_name"]: dim for dim in dims}
+    questions = []
+    for _ in range(count):
+        fact = rng.choice(fact_tables)
+        foreign_key = rng.choice(fact["foreign_keys"])
+        dim = by_name[foreign_key["reference_table_name"]]
+        measure = rng.choice(fact["columns"][4:])["column_name"]
+        attribute = rng.choice(dim["columns"][1:])["column_name"]
+        needed = [fact["table_name"], dim["table_name"], measure, attribute, foreign_key["foreign_key"]]
+        questions.append((f"What is the total {measure} for each {attribute}?", needed))
+    return questions
+
+
+def evaluate(label: str, retriever, questions, k: int):
+    complete, tokens, latencies = 0, [], []
+    for question, needed in questions:
+        start = time.perf_counter()
+        context = "\n".join(doc.page_content for doc in retriever.similarity_search(question, k=k))
+        latencies.append((time.perf_counter() - start) * 1000)
+        tokens.append(estimate_tokens(context))
+        complete += all(re.search(rf"\b{re.escape(name)}\b", context) for name in needed)
+    print(
+        f"{label:<7} complete context={complete / len(questions):.3f}  context tokens p50={statistics.median(tokens):6.0f}  "
+        f"retrieval p50={statistics.median(latencies):6.2f}ms"
+    )
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--facts", type=int, default=150)
+    arg_parser.add_argument("--dimensions", type=int, default=50)
+    arg_parser.add_argument("--questions", type=int, default=200)
+    arg_parser.add_argument("--k", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    rng = random.Random(3)
+    fact_tables, dims = star_schema(args.facts, args.dimensions, rng)
+    metadatas = fact_tables + dims
+    embeddings = HashingEmbeddings()
+
+    docs = [meaningful_text_from_metadata(metadata, SUMMARY) for metadata in metadatas]
+    ids = [f"mart.{metadata['table_name']}" for metadata in metadatas]
+    table_store = LocalVectorStore(embeddings)
+    table_store.add_documents(docs, ids=ids)
+    table_keywords = BM25Index()
+    table_keywords.add_documents(docs, ids=ids)
+
+    start = time.perf_counter()
+    column_index = ColumnIndex(BM25Index(column_boost=0), LocalVectorStore(embeddings))
+    column_index.upsert_tables(metadatas)
+    catalog = SchemaCatalog()
+    catalog.upsert(metadatas)
+    catalog.save()
+    print(f"{len(metadatas)} tables, {sum(len(m['columns']) for m in metadatas)} columns indexed in {time.perf_counter() - start:.2f}s")
+
+    questions = questions_for(fact_tables, dims, args.questions, rng)
+    evaluate("table", HybridSearch(table_store, table_keywords), questions, args.k)
+    evaluate("column", SchemaContextRetriever(column_index, catalog), questions, args.k)
+
+
+if __name__ == "__main__":
+    main()
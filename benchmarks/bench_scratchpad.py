@@ -0,0 +1,64 @@
+"""Measure prompt tokens per ReAct iteration with and without scratchpad compaction.
+
+Replays a long scripted session (repeated validations, large result previews)
+against a throwaway SQLite database with a fake chat model reporting token usage.
+
+    python -m benchmarks.bench_scratchpad --rows 200
+"""
+
+import argparse
+
+from agents.redshift_agent import build_agent, iter_redshift_agent
+from benchmarks.stubs import ScriptedChatModel, build_stub_context, use_sqlite_engine
+from tools.scratchpad import Scratchpad
+from tools.timing import StageTimer
+
+
+def session_script(rows: int):
+    queries = [
+        f"WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < {rows}) "
+        f"SELECT i AS {name}_id, hex(randomblob(24)) AS {name}_code FROM n"
+        for name in ("seller", "route", "incident")
+    ]
+    steps = [
+        ("validate_redshift_query", queries[0]),
+        ("validate_redshift_query", queries[0]),
+        ("run_redshift_query", queries[0]),
+        ("validate_redshift_query", queries[1]),
+        ("run_redshift_query", queries[1]),
+        ("validate_redshift_query", queries[1]),
+        ("validate_redshift_query", queries[2]),
+        ("run_redshift_query", queries[2]),
+    ]
+    script = [f"Step {i}, let me check the data.\nAction: {tool}\nAction Input: {query}" for i, (tool, query) in enumerate(steps)]
+    return script + ["I now know the final answer.\nFinal Answer: The answer is 1."]
+
+
+def run(label: str, context, script, scratchpad: Scratchpad):
+    agent = build_agent(ScriptedChatModel(script=script))
+    timer = StageTimer()
+    finish = None
+    for event in iter_redshift_agent("Which seller has the most sales?", context.docsearch, agent=agent, timer=timer, scratchpad=scratchpad):
+        if event["type"] == "finish":
+            finish = event["step"]
+    iterations = finish.return_values["iterations"]
+    print(f"{label}: iterations={len(iterations)} prompt tokens total={sum(i['prompt_tokens'] for i in iterations)}")
+    print("  per iteration: " + " ".join(str(i["prompt_tokens"]) for i in iterations))
+    print("  scratchpad:    " + " ".join(str(i["scratchpad_tokens"]) for i in iterations))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--rows", type=int, default=200)
+    arg_parser.add_argument("--token-budget", type=int, default=1000)
+    args = arg_parser.parse_args()
+
+    use_sqlite_engine()
+    context = build_stub_context()
+    script = session_script(args.rows)
+    run("uncompacted", context, script, Scratchpad(token_budget=None))
+    run(f"budget={args.token_budget}", context, script, Scratchpad(token_budget=args.token_budget))
+
+
+if __name__ == "__main__":
+    main()
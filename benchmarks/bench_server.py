@@ -0,0 +1,147 @@
+"""Load test the HTTP question service with stubbed LLM, embedding and warehouse backends.
+
+Sends --questions requests from --clients concurrent connections, spread over --tenants with
+--noisy-share of them from tenant_0, and reports throughput, response codes and per-tenant
+latency percentiles. The warehouse holds a pooled connection for --query-latency per round trip,
+so a small pool makes questions wait for it. The load runs once with concurrent embedding
+requests sent one by one and once batched, comparing embedding requests per question.
+
+    python -m benchmarks.bench_server --questions 400 --clients 64 --tenants 4 --llm-latency 0.05
+
+Pass --url to load an already running service (`uvicorn core.server:create_app --factory`) instead.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from collections import Counter, defaultdict
+from functools import partial
+
+import httpx
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from benchmarks.replay import patched_warehouse
+from benchmarks.stubs import LatencyEmbeddings, build_stub_context, use_sqlite_engine
+from core.jobs import QuestionExecutor
+from core.run import ask_redshift_stream
+from core.server import QuestionServer, TENANT_HEADER, TenantLimiter, create_app
+from tools import db
+from tools.embedding_batch import BatchingEmbeddings
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def stub_warehouse(latency: float):
+    def explain(query: str) -> str:
+        with db.connect():
+            time.sleep(latency)
+        return "Query is valid"
+
+    def execute(query: str) -> str:
+        with db.connect():
+            time.sleep(latency)
+        return "[(1,)]"
+
+    return patched_warehouse(lambda query: [], explain, execute)
+
+
+async def load(client: httpx.AsyncClient, args) -> tuple:
+    rng = random.Random(7)
+    tenants = [
+        "tenant_0" if rng.random() < args.noisy_share else f"tenant_{rng.randint(1, max(1, args.tenants - 1))}"
+        for _ in range(args.questions)
+    ]
+    connections = asyncio.Semaphore(args.clients)
+    results = []
+
+    async def send(i: int, tenant: str):
+        async with connections:
+            start = time.perf_counter()
+            response = await client.post("/ask", json={"question": f"How many sales in region {i}?", "use_cache": False}, headers={TENANT_HEADER: tenant})
+            results.append((tenant, response.status_code, time.perf_counter() - start))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(send(i, tenant) for i, tenant in enumerate(tenants)))
+    return results, time.perf_counter() - start
+
+
+def report(label: str, results: list, elapsed: float):
+    codes = Counter(code for _, code, _ in results)
+    answered = [latency for _, code, latency in results if code == 200]
+    print(f"{label}: wall={elapsed:.2f}s throughput={len(answered) / elapsed:.1f} questions/s responses={dict(sorted(codes.items()))}")
+    by_tenant = defaultdict(list)
+    for tenant, code, latency in results:
+        if code == 200:
+            by_tenant[tenant].append(latency)
+    for tenant, latencies in sorted(by_tenant.items()):
+        print(
+            f"    {tenant:<10} answered={len(latencies):4d} p50={statistics.median(latencies) * 1000:6.0f}ms "
+            f"p95={percentile(latencies, 0.95) * 1000:6.0f}ms p99={percentile(latencies, 0.99) * 1000:6.0f}ms"
+        )
+
+
+async def run_in_process(args, batching: bool):
+    model = LatencyEmbeddings(DeterministicFakeEmbedding(size=64), latency=args.embed_latency)
+    embeddings = BatchingEmbeddings(model) if batching else model
+    context = build_stub_context(llm_latency=args.llm_latency, embeddings=embeddings)
+    model.calls = 0
+    executor = QuestionExecutor(partial(ask_redshift_stream, context=context), max_workers=args.workers, max_pending=args.max_pending)
+    server = QuestionServer(
+        executor=executor,
+        limiter=TenantLimiter(concurrency=args.tenant_concurrency, max_queued=args.tenant_max_queued),
+        backpressure_seconds=args.backpressure_seconds
+    )
+    before = db.pool_metrics()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=create_app(server)), base_url="http://server", timeout=None) as client:
+        results, elapsed = await load(client, args)
+    label = "batched embeddings" if batching else "unbatched embeddings"
+    report(label, results, elapsed)
+    metrics = db.pool_metrics()
+    print(
+        f"    embedding requests={model.calls} for {sum(code == 200 for _, code, _ in results)} questions, "
+        f"warehouse checkouts={metrics['checkouts'] - before['checkouts']} waited={metrics['waits'] - before['waits']}"
+    )
+    executor.executor.shutdown()
+    context.close()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--url", help="load a running service instead of an in-process one with stubs")
+    arg_parser.add_argument("--questions", type=int, default=400)
+    arg_parser.add_argument("--clients", type=int, default=64, help="concurrent client connections")
+    arg_parser.add_argument("--tenants", type=int, default=4)
+    arg_parser.add_argument("--noisy-share", type=float, default=0.5, help="share of the questions sent by tenant_0")
+    arg_parser.add_argument("--workers", type=int, default=16)
+    arg_parser.add_argument("--max-pending", type=int, default=64)
+    arg_parser.add_argument("--tenant-concurrency", type=int, default=4)
+    arg_parser.add_argument("--tenant-max-queued", type=int, default=32)
+    arg_parser.add_argument("--backpressure-seconds", type=float, default=5)
+    arg_parser.add_argument("--llm-latency", type=float, default=0.05)
+    arg_parser.add_argument("--embed-latency", type=float, default=0.05, help="seconds per embeddings request")
+    arg_parser.add_argument("--query-latency", type=float, default=0.02, help="seconds a warehouse round trip holds its connection")
+    arg_parser.add_argument("--pool-size", type=int, default=4)
+    args = arg_parser.parse_args()
+
+    if args.url:
+        async def remote():
+            async with httpx.AsyncClient(base_url=args.url, timeout=None) as client:
+                results, elapsed = await load(client, args)
+            report(args.url, results, elapsed)
+
+        asyncio.run(remote())
+        return
+
+    with stub_warehouse(args.query_latency):
+        for batching in (False, True):
+            use_sqlite_engine(pool_size=args.pool_size, max_overflow=0)
+            asyncio.run(run_in_process(args, batching))
+
+
+if __name__ == "__main__":
+    main()
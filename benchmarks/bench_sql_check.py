@@ -0,0 +1,136 @@
+"""Replay recorded agent transcripts through the SQL tools with and without the local pre-check.
+
+The transcripts in `benchmarks/fixtures/agent_transcripts.jsonl` hold the tool calls of agent runs,
+including their typical mistakes: misspelled tables and columns, a wrong schema, DML and SELECT INTO. They run
+against a local Postgres stand-in for Redshift seeded with the tables they use, crawled into a
+schema catalog. The replay keeps every tool call, so the LLM turns are the same in both modes.
+`--latency` adds the round trip to a remote Redshift leader node that a local Postgres lacks.
+
+    python -m benchmarks.bench_sql_check --dsn postgresql://postgres@localhost/postgres --latency 0.1
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+from pathlib import Path
+
+import sqlalchemy as sa
+
+from agents import redshift_agent
+from tools import sql_helper
+from tools.config import config
+from tools.db import set_engine
+from tools.result_cache import ResultCache, set_result_cache
+from tools.schema_catalog import SchemaCatalog, set_schema_catalog
+from tools.sql_check import check_sql
+
+TRANSCRIPTS = Path(__file__).resolve().parent / "fixtures" / "agent_transcripts.jsonl"
+
+TABLES = [
+    "CREATE TABLE {schema}.seller (seller_id int PRIMARY KEY, seller_name varchar(64), region varchar(32))",
+    "CREATE TABLE {schema}.route (route_id int PRIMARY KEY, origin_station varchar(64), destination_station varchar(64), distance_km int)",
+    "CREATE TABLE {schema}.sales_transaction (transaction_id int PRIMARY KEY, seller_id int REFERENCES {schema}.seller(seller_id), "
+    "route_id int REFERENCES {schema}.route(route_id), sales_value numeric(12, 2), ticket_count int, sale_date timestamp)",
+    "CREATE TABLE {schema}.incident_maintenance (incident_id int PRIMARY KEY, route_id int REFERENCES {schema}.route(route_id), "
+    "incident_date date, incident_type varchar(32), cost numeric(12, 2))",
+    "CREATE TABLE {schema}.route_performance_metrics (route_id int REFERENCES {schema}.route(route_id), month date, on_time_rate float, avg_delay_minutes float)",
+    "CREATE TABLE {schema}.financial_performance_metrics (month date PRIMARY KEY, revenue numeric(14, 2), operating_cost numeric(14, 2), profit numeric(14, 2))",
+]
+
+
+def seed(engine, schema: str):
+    with engine.begin() as connection:
+        connection.execute(sa.text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+        connection.execute(sa.text(f"CREATE SCHEMA {schema}"))
+        for ddl in TABLES:
+            connection.execute(sa.text(ddl.format(schema=schema)))
+        connection.execute(sa.text(f"INSERT INTO {schema}.seller SELECT i, 'seller ' || i, 'region ' || i % 5 FROM generate_series(0, 99) i"))
+        connection.execute(sa.text(f"INSERT INTO {schema}.route SELECT i, 'station ' || i, 'station ' || i + 1, 20 + i * 7 FROM generate_series(0, 49) i"))
+        connection.execute(sa.text(
+            f"INSERT INTO {schema}.sales_transaction SELECT i, i % 100, i % 50, (i % 97) * 1.5, 1 + i % 4, "
+            "now() - (i % 400) * interval '1 day' FROM generate_series(1, 200000) i"
+        ))
+
+
+def replay(transcripts: list, precheck: bool, statements: list) -> dict:
+    config.set("SQL_PRECHECK_ENABLED", precheck)
+    set_result_cache(ResultCache(":memory:"))
+    calls, rejected_latencies = [], []
+    start_replay = time.perf_counter()
+    for transcript in transcripts:
+        before = len(statements)
+        for step in transcript["steps"]:
+            tool = redshift_agent.find_tool_by_name(redshift_agent.tools, step["tool"])
+            start = time.perf_counter()
+            observation = tool.func(step["tool_input"])
+            elapsed = (time.perf_counter() - start) * 1000
+            if "Error occurred" in observation or "not valid" in observation:
+                rejected_latencies.append(elapsed)
+        calls.append(len(statements) - before)
+    return {"calls": calls, "rejected_latencies": rejected_latencies, "seconds": time.perf_counter() - start_replay}
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--dsn", default=os.environ.get("BENCH_PG_DSN"), help="Postgres DSN (or BENCH_PG_DSN)")
+    arg_parser.add_argument("--latency", type=float, default=0.1, help="seconds added to every warehouse statement")
+    arg_parser.add_argument("--schema", default="bench_sql_check", help="schema the transcripts' railways_mart is replayed against")
+    args = arg_parser.parse_args()
+    if not args.dsn:
+        arg_parser.error("--dsn or BENCH_PG_DSN is required")
+
+    engine = sa.create_engine(args.dsn)
+    set_engine(engine)
+    seed(engine, args.schema)
+    catalog = SchemaCatalog()
+    catalog.upsert(sql_helper.get_schemas_metadata(args.schema))
+    catalog.save()
+    set_schema_catalog(catalog)
+
+    # Count what reaches the warehouse, the SQL the tools send and nothing else
+    statements = []
+
+    @sa.event.listens_for(engine, "before_cursor_execute")
+    def on_execute(connection, cursor, statement, *rest):
+        statements.append(statement)
+        time.sleep(args.latency)
+
+    transcripts = [json.loads(line) for line in TRANSCRIPTS.read_text().splitlines() if line.strip()]
+    for transcript in transcripts:
+        for step in transcript["steps"]:
+            step["tool_input"] = step["tool_input"].replace("railways_mart.", f"{args.schema}.")
+    tool_calls = sum(len(transcript["steps"]) for transcript in transcripts)
+    print(f"{len(transcripts)} transcripts, {tool_calls} tool calls")
+
+    for label, precheck in (("warehouse", False), ("precheck", True)):
+        results = replay(transcripts, precheck, statements)
+        latencies = results["rejected_latencies"]
+        print(
+            f"{label:<10} warehouse calls={sum(results['calls']):3d} per question={statistics.mean(results['calls']):.2f} "
+            f"rejected calls={len(latencies):2d} p50 latency of a rejection={statistics.median(latencies) if latencies else 0:7.2f}ms "
+            f"replay={results['seconds']:.2f}s"
+        )
+
+    # Every local rejection should be one the warehouse makes too; DML is left out, EXPLAIN accepts it
+    disagreements = []
+    sa.event.remove(engine, "before_cursor_execute", on_execute)
+    with engine.connect() as connection:
+        for transcript in transcripts:
+            for step in transcript["steps"]:
+                errors = check_sql(step["tool_input"], catalog)
+                if not errors or errors[0].startswith("Only SELECT"):
+                    continue
+                try:
+                    with connection.begin():
+                        connection.execute(sa.text(f"EXPLAIN {step['tool_input']}"))
+                    disagreements.append((step["tool_input"], errors))
+                except Exception:
+                    pass
+    for sql, errors in disagreements:
+        print(f"accepted by the warehouse, rejected locally: {sql[:70]!r} -> {errors}")
+
+
+if __name__ == "__main__":
+    main()
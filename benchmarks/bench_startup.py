@@ -0,0 +1,103 @@
+"""Measure first-question and steady-state latency of ask_redshift with stubbed backends.
+
+Compares rebuilding the AppContext per question (the old behaviour) with reusing one. Every
+context is a real AppContext over a temporary directory: local vector store, keyword index,
+answer cache and the agent and refine ChatOpenAI clients on its shared HTTP client. That client
+talks to a mock transport answering like the OpenAI API, and the warehouse is SQLite. Embeddings
+are an offline stand-in, OpenAIEmbeddings downloads its tokenizer on first use. Building a context
+with every default client, OpenAI embeddings included, is timed on its own.
+
+    python -m benchmarks.bench_startup --questions 20 --llm-latency 0.05
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+import httpx
+from langchain_core.documents import Document
+
+from benchmarks.stubs import HashingEmbeddings, openai_chat_transport, use_sqlite_engine
+from core.context import AppContext
+from core.run import ask_redshift
+from tools.config import config
+from tools.timing import StageTimer
+from tools.vector_store import LocalVectorStore
+
+
+def use_temporary_state(documents: int = 50):
+    """Point every file the context opens at a fresh directory, with `documents` table documents indexed."""
+    directory = Path(tempfile.mkdtemp())
+    config.set("OPENAI_API_KEY", "sk-stub")
+    config.set("VECTOR_STORE", "local")
+    for key, name in (
+        ("LOCAL_VECTOR_STORE_PATH", "vector_store"), ("KEYWORD_INDEX_PATH", "keyword_index.json"),
+        ("ANSWER_CACHE_PATH", "answer_cache.sqlite"), ("CACHE_PATH", "cache.sqlite"),
+        ("RESULT_CACHE_PATH", "result_cache.sqlite"), ("SCHEMA_CATALOG_PATH", "schema_catalog.pkl"),
+    ):
+        config.set(key, str(directory / name))
+    LocalVectorStore(HashingEmbeddings(), path=directory / "vector_store").add_documents(
+        [Document(page_content=f"Table `table_{i}`") for i in range(documents)]
+    )
+
+
+def stub_http_client(transport: httpx.BaseTransport) -> type:
+    """An httpx.Client subclass sending every request to `transport`, to stand in for the context's client."""
+
+    class StubClient(httpx.Client):
+        def __init__(self, **kwargs):
+            super().__init__(transport=transport, **kwargs)
+
+    return StubClient
+
+
+def build_context(transport: httpx.BaseTransport, **components) -> AppContext:
+    with mock.patch.object(httpx, "Client", stub_http_client(transport)):
+        return AppContext(**components)
+
+
+def run(questions: int, transport: httpx.BaseTransport, reuse: bool, offset: int):
+    latencies = []
+    context = None
+    for i in range(questions):
+        timer = StageTimer()
+        start = time.perf_counter()
+        if context is None or not reuse:
+            if context is not None:
+                context.close()
+            context = build_context(transport, embeddings=HashingEmbeddings())
+        # Distinct questions per mode, so the LLM cache of one mode never answers the other
+        ask_redshift(f"How many sales in region {offset + i}?", context=context, timer=timer)
+        latencies.append(time.perf_counter() - start)
+    context.close()
+    return latencies
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--questions", type=int, default=20)
+    arg_parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds per OpenAI request")
+    args = arg_parser.parse_args()
+
+    use_sqlite_engine()
+    use_temporary_state()
+    transport = openai_chat_transport(latency=args.llm_latency)
+
+    builds = []
+    for _ in range(args.questions):
+        start = time.perf_counter()
+        build_context(transport).close()
+        builds.append(time.perf_counter() - start)
+    print(f"{'AppContext()':<22} first={builds[0] * 1000:7.1f}ms steady p50={statistics.median(builds[1:]) * 1000:7.1f}ms")
+
+    for offset, reuse in enumerate((False, True)):
+        latencies = [seconds * 1000 for seconds in run(args.questions, transport, reuse, offset * args.questions)]
+        label = "shared context" if reuse else "rebuild per question"
+        print(f"{label:<22} first={latencies[0]:7.1f}ms steady p50={statistics.median(latencies[1:]):7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
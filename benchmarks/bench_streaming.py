@@ -0,0 +1,44 @@
+"""Compare time to first visible token with total latency for streamed answers.
+
+Uses a fake streaming chat model for both the agent and the refine step.
+
+    python -m benchmarks.bench_streaming --questions 10 --llm-latency 0.2 --token-latency 0.02
+"""
+
+import argparse
+import statistics
+import time
+
+from benchmarks.stubs import build_stub_context, use_sqlite_engine
+from core.run import ask_redshift_stream
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--questions", type=int, default=10)
+    arg_parser.add_argument("--llm-latency", type=float, default=0.2)
+    arg_parser.add_argument("--token-latency", type=float, default=0.02)
+    args = arg_parser.parse_args()
+
+    use_sqlite_engine()
+    context = build_stub_context(llm_latency=args.llm_latency, token_latency=args.token_latency)
+    first_event, first_token, total = [], [], []
+    for i in range(args.questions):
+        start = time.perf_counter()
+        seen_event = seen_token = None
+        for event in ask_redshift_stream(f"How many sales in region {i}?", context=context, use_cache=False, refine=True):
+            now = time.perf_counter() - start
+            seen_event = seen_event if seen_event is not None else now
+            if event["type"] == "token" and seen_token is None:
+                seen_token = now
+        first_event.append(seen_event * 1000)
+        first_token.append(seen_token * 1000)
+        total.append((time.perf_counter() - start) * 1000)
+
+    print(f"first agent event p50={statistics.median(first_event):7.1f}ms")
+    print(f"first answer token p50={statistics.median(first_token):7.1f}ms")
+    print(f"complete answer    p50={statistics.median(total):7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
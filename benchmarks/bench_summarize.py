@@ -0,0 +1,51 @@
+"""Measure the concurrent summarization stage against a fake LLM with artificial latency.
+
+    python -m benchmarks.bench_summarize --tables 200 --latency 0.05 --concurrency 1 8 32
+"""
+
+import argparse
+import random
+import time
+
+from tools.summarizer import summarize_texts
+
+
+class FakeLLM:
+    def __init__(self, latency: float, failure_rate: float = 0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls = 0
+
+    def __call__(self, text: str) -> str:
+        self.calls += 1
+        time.sleep(self.latency)
+        if random.random() < self.failure_rate:
+            raise RuntimeError("Fake rate limit error")
+        return f"This table seems or assumed to be about {len(text)} characters of metadata."
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--tables", type=int, default=200)
+    arg_parser.add_argument("--latency", type=float, default=0.05, help="Seconds per fake LLM call")
+    arg_parser.add_argument("--failure-rate", type=float, default=0.0)
+    arg_parser.add_argument("--requests-per-second", type=float, default=None)
+    arg_parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    args = arg_parser.parse_args()
+
+    texts = [f"Table `table_{i}` in schema `bench_mart`" for i in range(args.tables)]
+    for concurrency in args.concurrency:
+        llm = FakeLLM(args.latency, args.failure_rate)
+        start = time.perf_counter()
+        summaries = summarize_texts(
+            texts, llm,
+            concurrency=concurrency,
+            requests_per_second=args.requests_per_second,
+            backoff=args.latency
+        )
+        elapsed = time.perf_counter() - start
+        print(f"concurrency={concurrency:<4} tables={len(summaries)} calls={llm.calls} wall={elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
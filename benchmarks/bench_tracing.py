@@ -0,0 +1,74 @@
+"""Measure the overhead of tracing on the answer pipeline, disabled and enabled.
+
+Runs questions against fake chat models with no latency, so the pipeline's own
+overhead dominates, then times the tracing primitives on their own.
+
+    python -m benchmarks.bench_tracing --questions 200
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.stubs import build_stub_context, use_sqlite_engine
+from core.run import ask_redshift
+from tools.timing import StageTimer
+from tools.tracing import TraceExporter, Tracer, annotate
+
+
+def run(context, questions: int, tracer_factory) -> list:
+    latencies = []
+    for i in range(questions):
+        timer = StageTimer(tracer=tracer_factory())
+        start = time.perf_counter()
+        ask_redshift(f"How many sales in region {i}?", context=context, timer=timer, use_cache=False)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def per_call_ns(function, repeat: int = 100000) -> float:
+    start = time.perf_counter_ns()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter_ns() - start) / repeat
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--questions", type=int, default=200)
+    args = arg_parser.parse_args()
+
+    use_sqlite_engine()
+    context = build_stub_context()
+    exporter = TraceExporter(Path(tempfile.mkdtemp()) / "traces.jsonl")
+    modes = [
+        ("disabled", lambda: None),
+        ("in memory", lambda: Tracer()),
+        ("exported", lambda: Tracer(exporter)),
+    ]
+    run(context, 10, lambda: None)
+    results = {}
+    # Interleave the modes so drift in the machine's speed hits them alike
+    for _ in range(3):
+        for label, factory in modes:
+            results.setdefault(label, []).extend(run(context, args.questions // 3, factory))
+    baseline = statistics.median(results["disabled"])
+    for label, _ in modes:
+        p50 = statistics.median(results[label])
+        print(f"{label:<10} p50={p50:7.3f}ms per question  overhead={p50 - baseline:+.3f}ms")
+    print(f"exported {sum(1 for _ in open(exporter.path))} spans to {exporter.path}")
+
+    disabled, enabled = StageTimer(), StageTimer(tracer=Tracer())
+
+    def open_span(timer):
+        with timer.span("tool", sql="SELECT 1") as span:
+            span.set(rows=1)
+
+    print(f"span, disabled: {per_call_ns(lambda: open_span(disabled)):6.0f}ns  annotate outside a span: {per_call_ns(lambda: annotate(rows=1)):6.0f}ns")
+    print(f"span, enabled:  {per_call_ns(lambda: open_span(enabled), repeat=20000):6.0f}ns")
+
+
+if __name__ == "__main__":
+    main()
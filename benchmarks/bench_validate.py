@@ -0,0 +1,60 @@
+"""Compare executing a query to validate it with validating it through EXPLAIN.
+
+Runs a heavy aggregate against a local Postgres stand-in for Redshift.
+
+    python -m benchmarks.bench_validate --dsn postgresql://postgres@localhost/postgres --rows 2000000
+"""
+
+import argparse
+import os
+import time
+
+import sqlalchemy as sa
+
+from agents import redshift_agent
+from tools.db import connect, set_engine
+
+QUERY = "SELECT seller_id, SUM(amount) AS total FROM bench_validate.sales GROUP BY seller_id ORDER BY total DESC LIMIT 3"
+INVALID_QUERY = "SELECT seller, SUM(amount) FROM bench_validate.sales GROUP BY seller"
+
+
+def execute_to_validate(query: str) -> str:
+    """The previous validation: run the query and fetch the first row."""
+    with connect() as connection:
+        try:
+            connection.execute(sa.text(query)).fetchone()
+            return "Query is valid"
+        except Exception as e:
+            return f"Error occurred while validating query: {str(e)}"
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--dsn", default=os.environ.get("BENCH_PG_DSN"), help="Postgres DSN (or BENCH_PG_DSN)")
+    arg_parser.add_argument("--rows", type=int, default=2000000)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+    if not args.dsn:
+        arg_parser.error("--dsn or BENCH_PG_DSN is required")
+
+    engine = sa.create_engine(args.dsn)
+    set_engine(engine)
+    with engine.begin() as connection:
+        connection.execute(sa.text("DROP SCHEMA IF EXISTS bench_validate CASCADE"))
+        connection.execute(sa.text("CREATE SCHEMA bench_validate"))
+        connection.execute(sa.text(
+            "CREATE TABLE bench_validate.sales AS "
+            "SELECT i AS sale_id, i % 1000 AS seller_id, (i % 97) * 1.5 AS amount FROM generate_series(1, :rows) i"
+        ), {"rows": args.rows})
+
+    for label, validate in (("execute", execute_to_validate), ("explain", redshift_agent.validate_redshift_query.func)):
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            valid = validate(QUERY)
+        elapsed = (time.perf_counter() - start) / args.repeat
+        invalid = validate(INVALID_QUERY)
+        print(f"{label:<8} {elapsed * 1000:9.1f}ms per validation, valid query -> {valid!r}, invalid query -> {invalid[:60]!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Measure LocalVectorStore query latency against index size.
+
+    python -m benchmarks.bench_vector_store --sizes 1000 5000 20000 100000 --dim 1536
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+
+import numpy as np
+from langchain_core.documents import Document
+
+from tools.vector_store import LocalVectorStore
+
+
+def build_store(size: int, dim: int, path) -> LocalVectorStore:
+    rng = np.random.default_rng(size)
+    store = LocalVectorStore(embedding=None, path=path)
+    vectors = rng.standard_normal((size, dim), dtype=np.float32)
+    store.vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    store.ids = [f"bench_mart.table_{i}" for i in range(size)]
+    store.documents = [Document(page_content=f"Table `table_{i}`", metadata={"table_name": f"table_{i}"}) for i in range(size)]
+    store.save()
+    # Reload so the benchmark searches the memory-mapped matrix like the app does
+    return LocalVectorStore(embedding=None, path=path)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000, 100000])
+    arg_parser.add_argument("--dim", type=int, default=1536)
+    arg_parser.add_argument("--k", type=int, default=5)
+    arg_parser.add_argument("--queries", type=int, default=200)
+    args = arg_parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as path:
+            store = build_store(size, args.dim, path)
+            queries = rng.standard_normal((args.queries, args.dim)).tolist()
+            store.similarity_search_by_vector(queries[0], k=args.k)
+            latencies = []
+            for query in queries:
+                start = time.perf_counter()
+                store.similarity_search_by_vector(query, k=args.k)
+                latencies.append((time.perf_counter() - start) * 1e6)
+            latencies.sort()
+            p95 = latencies[int(len(latencies) * 0.95) - 1]
+            print(f"size={size:<7} p50={statistics.median(latencies):9.1f}us p95={p95:9.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""Record question runs into fixture files and replay them offline.
+
+A fixture holds one JSON session per line: the question, the retrieved documents, every LLM
+call (stage, prompt hash, response, token usage, latency) and every warehouse round trip
+(EXPLAIN or query, SQL, observation, latency), plus the local pre-check's verdicts so a replay
+does not depend on the crawled schema catalog. `bench_replay` answers the questions again with
+the replay backends below, so the whole pipeline runs without OpenAI, Pinecone or Redshift.
+
+Record real runs with the configured app (spends API money and warehouse time):
+
+    python -m benchmarks.replay --questions questions.txt --out benchmarks/fixtures/my_sessions.jsonl
+
+or play scripted agent transcripts against a local Postgres stand-in, which is how the bundled
+`benchmarks/fixtures/replay_sessions.jsonl` was made:
+
+    python -m benchmarks.replay --transcripts benchmarks/fixtures/agent_transcripts.jsonl --dsn postgresql://postgres@localhost/postgres --out benchmarks/fixtures/replay_sessions.jsonl
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.documents import Document
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult, LLMResult
+
+from agents import redshift_agent
+from tools.result_cache import normalize_sql
+from tools.timing import StageTimer, llm_usage
+
+
+def prompt_hash(messages: List[BaseMessage]) -> str:
+    return hashlib.sha1("\n".join(str(message.content) for message in messages).encode("utf-8")).hexdigest()
+
+
+def load_sessions(path: Path) -> List[dict]:
+    return [json.loads(line) for line in Path(path).read_text().splitlines() if line.strip()]
+
+
+class RecordingHandler(BaseCallbackHandler):
+    """Callback handler appending every LLM call to the session being recorded."""
+
+    def __init__(self, timer: StageTimer, session: dict):
+        self.timer = timer
+        self.session = session
+        self.started: Dict[UUID, tuple] = {}
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[BaseMessage]], *, run_id: UUID, **kwargs: Any):
+        self.started[run_id] = (time.perf_counter(), prompt_hash(messages[0]), self.timer.current)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+        start, digest, stage = self.started.pop(run_id)
+        prompt_tokens, completion_tokens, _, model_name = llm_usage(response)
+        self.session["llm"].append({
+            "stage": stage,
+            "prompt_hash": digest,
+            "response": response.generations[0][0].text,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "model_name": model_name,
+            "latency": time.perf_counter() - start,
+        })
+
+
+class RecordingRetriever:
+    def __init__(self, retriever, session: dict):
+        self.retriever = retriever
+        self.session = session
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        docs = self.retriever.similarity_search(query, k=k, **kwargs)
+        self.session["retrieval"] = [{"page_content": doc.page_content, "metadata": doc.metadata} for doc in docs]
+        return docs
+
+
+@contextmanager
+def patched_warehouse(precheck, explain, execute):
+    """Swap the agent tools' pre-check and warehouse round trips, restoring them afterwards."""
+    original = redshift_agent.precheck_query, redshift_agent.explain_query, redshift_agent.execute_query
+    redshift_agent.precheck_query, redshift_agent.explain_query, redshift_agent.execute_query = precheck, explain, execute
+    try:
+        yield
+    finally:
+        redshift_agent.precheck_query, redshift_agent.explain_query, redshift_agent.execute_query = original
+
+
+def record_session(question: str, context) -> dict:
+    """Answer `question` with `context` and return everything needed to replay the run."""
+    from core.run import ask_redshift
+
+    session = {"question": question, "retrieval": [], "llm": [], "warehouse": [], "precheck": {}}
+    timer = StageTimer()
+    timer.callbacks.append(RecordingHandler(timer, session))
+    details = {}
+    precheck, explain, execute = redshift_agent.precheck_query, redshift_agent.explain_query, redshift_agent.execute_query
+
+    def recorded_precheck(query: str) -> List[str]:
+        errors = precheck(query)
+        session["precheck"][normalize_sql(query)] = errors
+        return errors
+
+    def recorded(kind, function):
+        def call(query: str):
+            start = time.perf_counter()
+            observation = function(query)
+            session["warehouse"].append({"kind": kind, "sql": query, "observation": observation, "latency": time.perf_counter() - start})
+            return observation
+        return call
+
+    retriever = context.retriever
+    context.retriever = RecordingRetriever(retriever, session)
+    try:
+        with patched_warehouse(recorded_precheck, recorded("explain", explain), recorded("execute", execute)):
+            start = time.perf_counter()
+            session["answer"] = ask_redshift(question, context=context, timer=timer, use_cache=False, details=details)
+            session["seconds"] = time.perf_counter() - start
+        session["iterations"] = len(details.get("iterations", []))
+    finally:
+        context.retriever = retriever
+    return session
+
+
+class ReplayChatModel(BaseChatModel):
+    """Chat model answering with the recorded responses of one stage, in recorded order.
+
+    `start` selects the session of the next question. Recorded latencies are slept,
+    scaled by `latency_scale`. Prompts that differ from the recording are counted in `drift`.
+    """
+
+    calls: Dict[str, List[dict]] = {}
+    latency_scale: float = 1.0
+    question: Optional[str] = None
+    position: int = 0
+    drift: int = 0
+    misses: int = 0
+
+    @classmethod
+    def for_stage(cls, sessions: List[dict], stage: str, latency_scale: float = 1.0) -> "ReplayChatModel":
+        calls = {session["question"]: [call for call in session["llm"] if call["stage"] == stage] for session in sessions}
+        return cls(calls=calls, latency_scale=latency_scale)
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay-chat"
+
+    def start(self, question: str):
+        self.question = question
+        self.position = 0
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        calls = self.calls.get(self.question, [])
+        if self.position >= len(calls):
+            # The run left the recording, e.g. after a code change altered the agent's path
+            self.misses += 1
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content="Final Answer: not recorded"))])
+        call = calls[self.position]
+        self.position += 1
+        if prompt_hash(messages) != call["prompt_hash"]:
+            self.drift += 1
+        time.sleep(call["latency"] * self.latency_scale)
+        usage = {
+            "input_tokens": call["prompt_tokens"],
+            "output_tokens": call["completion_tokens"],
+            "total_tokens": call["prompt_tokens"] + call["completion_tokens"],
+        }
+        message = AIMessage(content=call["response"], usage_metadata=usage, response_metadata={"model_name": call["model_name"]})
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class ReplayRetriever:
+    """Returns the recorded documents of the question being replayed."""
+
+    def __init__(self, sessions: List[dict]):
+        self.documents = {
+            session["question"]: [Document(page_content=doc["page_content"], metadata=doc["metadata"]) for doc in session["retrieval"]]
+            for session in sessions
+        }
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return self.documents.get(query, [])[:k]
+
+
+class ReplayWarehouse:
+    """Answers pre-checks, EXPLAINs and queries with the recorded results, counting warehouse round trips."""
+
+    def __init__(self, sessions: List[dict], latency_scale: float = 1.0):
+        self.latency_scale = latency_scale
+        self.recorded = {
+            (call["kind"], normalize_sql(call["sql"])): call
+            for session in sessions for call in session["warehouse"]
+        }
+        self.prechecks = {sql: errors for session in sessions for sql, errors in session["precheck"].items()}
+        self.calls = 0
+        self.misses = 0
+
+    def precheck(self, query: str) -> List[str]:
+        return self.prechecks.get(normalize_sql(query), [])
+
+    def _answer(self, kind: str, query: str) -> Optional[str]:
+        self.calls += 1
+        call = self.recorded.get((kind, normalize_sql(query)))
+        if call is None:
+            self.misses += 1
+            return "Error occurred while validating query: not recorded" if kind == "explain" else None
+        time.sleep(call["latency"] * self.latency_scale)
+        return call["observation"]
+
+    def explain(self, query: str) -> str:
+        return self._answer("explain", query)
+
+    def execute(self, query: str) -> Optional[str]:
+        return self._answer("execute", query)
+
+    def installed(self):
+        return patched_warehouse(self.precheck, self.explain, self.execute)
+
+
+def scripted_context(transcript: dict, rng: random.Random):
+    """A stub context whose agent LLM plays one recorded transcript with GPT-like latency."""
+    from benchmarks.stubs import REFINE_SCRIPT, HashingEmbeddings, ScriptedChatModel
+    from core.context import AppContext
+    from tools.answer_cache import SemanticAnswerCache
+    from tools.vector_store import LocalVectorStore
+
+    script = [
+        f"I should check the query for the question.\nAction: {step['tool']}\nAction Input: {step['tool_input']}"
+        for step in transcript["steps"]
+    ] + ["I now know the final answer.\nFinal Answer: The answer is in the last query result."]
+    embeddings = HashingEmbeddings()
+    docsearch = LocalVectorStore(embeddings)
+    docsearch.add_documents([Document(page_content=f"Table `bench_sql_check.{table}`") for table in transcript["tables"]])
+    return AppContext(
+        embeddings=embeddings,
+        docsearch=docsearch,
+        agent_llm=ScriptedChatModel(script=script, latency=rng.uniform(0.6, 1.6)),
+        refine_llm=ScriptedChatModel(script=REFINE_SCRIPT, latency=rng.uniform(0.6, 1.6)),
+        answer_cache=SemanticAnswerCache(":memory:", embeddings),
+        retriever=docsearch
+    )
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--questions", help="file with one question per line, answered by the configured app")
+    arg_parser.add_argument("--transcripts", help="agent transcripts to play with a scripted LLM instead")
+    arg_parser.add_argument("--dsn", default=os.environ.get("BENCH_PG_DSN"), help="Postgres DSN (or BENCH_PG_DSN) for --transcripts")
+    arg_parser.add_argument("--out", required=True)
+    args = arg_parser.parse_args()
+    if bool(args.questions) == bool(args.transcripts):
+        arg_parser.error("give either --questions or --transcripts")
+
+    sessions = []
+    if args.questions:
+        from core.context import get_app_context
+
+        context = get_app_context()
+        for question in Path(args.questions).read_text().splitlines():
+            if question.strip():
+                sessions.append(record_session(question.strip(), context))
+                print(f"recorded {question.strip()!r}")
+    else:
+        import sqlalchemy as sa
+        from benchmarks.bench_sql_check import seed
+        from tools import sql_helper
+        from tools.config import config
+        from tools.db import set_engine
+        from tools.schema_catalog import SchemaCatalog, set_schema_catalog
+        from tools.sql_parse import extract_tables
+
+        if not args.dsn:
+            arg_parser.error("--dsn or BENCH_PG_DSN is required with --transcripts")
+        engine = sa.create_engine(args.dsn)
+        set_engine(engine)
+        # No spooled result files, their local paths would end up in the fixture
+        config.set("RESULT_SPOOL_DIR", "")
+        seed(engine, "bench_sql_check")
+        catalog = SchemaCatalog()
+        catalog.upsert(sql_helper.get_schemas_metadata("bench_sql_check"))
+        set_schema_catalog(catalog)
+        rng = random.Random(7)
+        for transcript in load_sessions(Path(args.transcripts)):
+            for step in transcript["steps"]:
+                step["tool_input"] = step["tool_input"].replace("railways_mart.", "bench_sql_check.")
+            transcript["tables"] = sorted({table.split(".")[-1] for step in transcript["steps"] for table in extract_tables(step["tool_input"])})
+            sessions.append(record_session(transcript["question"], scripted_context(transcript, rng)))
+            print(f"recorded {transcript['question']!r}")
+
+    Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.out, "w") as f:
+        for session in sessions:
+            f.write(json.dumps(session) + "\n")
+    print(f"{len(sessions)} sessions written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
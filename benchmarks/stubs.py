@@ -0,0 +1,176 @@
+"""Stubbed LLM, vector store and database backends shared by the benchmarks."""
+
+import hashlib
+import json
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Iterator, List, Optional
+
+import httpx
+import sqlalchemy as sa
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from core.context import AppContext
+from tools.answer_cache import SemanticAnswerCache
+from tools.db import set_engine
+from tools.vector_store import LocalVectorStore
+
+REACT_SCRIPT = [
+    "I should count the sales.\nAction: validate_redshift_query\nAction Input: SELECT 1",
+    "The query is valid.\nAction: run_redshift_query\nAction Input: SELECT 1",
+    "I now know the final answer.\nFinal Answer: The answer is 1.",
+]
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model that answers from `script` with artificial latency, streaming word by word.
+
+    The reply follows the last scripted step already in the prompt's scratchpad, so
+    concurrent questions sharing one model each get a consistent ReAct run, even when
+    the scratchpad drops repeated steps. Script entries must therefore be distinct.
+    """
+
+    script: List[str] = REACT_SCRIPT
+    latency: float = 0.0
+    token_latency: float = 0.0
+    model_name: str = "gpt-4o-mini"
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-chat"
+
+    def _reply(self, messages: List[BaseMessage]) -> str:
+        scratchpad = messages[-1].content.split("Begin!")[-1]
+        done = [i for i, reply in enumerate(self.script) if reply in scratchpad]
+        step = max(done) + 1 if done else 0
+        return self.script[min(step, len(self.script) - 1)]
+
+    def _usage(self, messages: List[BaseMessage], reply: str) -> dict:
+        # Rough OpenAI-like count of four characters per token
+        input_tokens = sum(len(str(m.content)) for m in messages) // 4
+        output_tokens = len(reply) // 4
+        return {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        time.sleep(self.latency)
+        reply = self._reply(messages)
+        message = AIMessage(content=reply, usage_metadata=self._usage(messages, reply), response_metadata={"model_name": self.model_name})
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        self.calls += 1
+        time.sleep(self.latency)
+        reply = self._reply(messages)
+        for token in re.findall(r"\S+\s*", reply):
+            time.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(messages, reply), response_metadata={"model_name": self.model_name}))
+
+
+class HashingEmbeddings(Embeddings):
+    """Offline stand-in for a real embedding model: a normalized bag of hashed words.
+
+    Similar wording gives similar vectors, but like a real model a long table document
+    is dominated by its boilerplate rather than by one exact column name.
+    """
+
+    def __init__(self, size: int = 256):
+        self.size = size
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = [0.0] * self.size
+        for word in re.findall(r"\w+", text.lower()):
+            vector[int(hashlib.md5(word.encode("utf-8")).hexdigest(), 16) % self.size] += 1.0
+        norm = sum(value * value for value in vector) ** 0.5 or 1.0
+        return [value / norm for value in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+
+class LatencyEmbeddings(Embeddings):
+    """Wraps embeddings with a fixed latency per request, like one round trip to the API, counting requests."""
+
+    def __init__(self, embeddings: Embeddings, latency: float = 0.0):
+        self.embeddings = embeddings
+        self.latency = latency
+        self.calls = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        time.sleep(self.latency)
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        self.calls += 1
+        time.sleep(self.latency)
+        return self.embeddings.embed_query(text)
+
+
+def use_sqlite_engine(pool_size: int = 5, max_overflow: int = 10):
+    """Point the shared engine at a throwaway SQLite file behind a regular QueuePool."""
+    path = Path(tempfile.mkdtemp()) / "stub.db"
+    set_engine(sa.create_engine(
+        f"sqlite:///{path}",
+        poolclass=sa.pool.QueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        connect_args={"check_same_thread": False}
+    ))
+
+
+REFINE_SCRIPT = [
+    "The seller with the highest total sales value is seller twenty two. "
+    "I found it by summing the sales value per seller and ordering the totals from highest to lowest."
+]
+
+
+def openai_chat_transport(script: List[str] = REACT_SCRIPT, latency: float = 0.0) -> httpx.MockTransport:
+    """HTTP transport answering OpenAI chat completion requests like `ScriptedChatModel`, streamed when asked.
+
+    Refine prompts get the REFINE_SCRIPT reply, usage is counted the same way as the scripted model.
+    """
+    model = ScriptedChatModel(script=script)
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        time.sleep(latency)
+        body = json.loads(request.content)
+        prompt = body["messages"][-1]["content"]
+        reply = REFINE_SCRIPT[0] if "refine the output" in prompt else model._reply([HumanMessage(content=prompt)])
+        usage = model._usage([HumanMessage(content=prompt)], reply)
+        usage = {"prompt_tokens": usage["input_tokens"], "completion_tokens": usage["output_tokens"], "total_tokens": usage["total_tokens"]}
+        response = {"id": "stub", "created": 0, "model": body["model"]}
+        if not body.get("stream"):
+            choice = {"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}
+            return httpx.Response(200, json={**response, "object": "chat.completion", "choices": [choice], "usage": usage})
+        chunks = [
+            {"choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}
+            for token in re.findall(r"\S+\s*", reply)
+        ]
+        chunks.append({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        chunks.append({"choices": [], "usage": usage})
+        events = "".join(f"data: {json.dumps({**response, 'object': 'chat.completion.chunk', **chunk})}\n\n" for chunk in chunks)
+        return httpx.Response(200, text=events + "data: [DONE]\n\n", headers={"content-type": "text/event-stream"})
+
+    return httpx.MockTransport(handle)
+
+
+def build_stub_context(llm_latency: float = 0.0, token_latency: float = 0.0, documents: int = 50, embeddings: Optional[Embeddings] = None) -> AppContext:
+    embeddings = embeddings or DeterministicFakeEmbedding(size=64)
+    docsearch = LocalVectorStore(embeddings)
+    docsearch.add_documents([Document(page_content=f"Table `table_{i}`") for i in range(documents)])
+    return AppContext(
+        embeddings=embeddings,
+        docsearch=docsearch,
+        agent_llm=ScriptedChatModel(latency=llm_latency),
+        refine_llm=ScriptedChatModel(script=REFINE_SCRIPT, latency=llm_latency, token_latency=token_latency),
+        answer_cache=SemanticAnswerCache(":memory:", embeddings)
+    )
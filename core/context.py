@@ -0,0 +1,95 @@
+import threading
+from typing import Optional
+
+import httpx
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import PromptTemplate
+from langchain_core.vectorstores import VectorStore
+from tools.config import config
+
+from agents.redshift_agent import build_agent, get_agent_llm
+from tools.answer_cache import SemanticAnswerCache, get_answer_cache
+from tools.cache import cached_embeddings, get_llm_cache
+from tools.embedding_batch import BatchingEmbeddings
+from tools.retrieval import Retriever, get_retriever
+from tools.vector_store import get_vectorstore
+
+REFINE_TEMPLATE = """
+    Given the following output:
+    {output}
+
+    refine the output (change like Action: Action:Input to a sentence). Refine also the Final Answer so its not using number but still keep the context
+    """
+
+
+class AppContext:
+    """Long-lived clients shared by every question: embeddings, vector store, retriever, agent and refine chain.
+
+    All OpenAI clients share one pooled HTTP client so connections are kept alive
+    between questions. Any component can be injected, e.g. stubs in benchmarks.
+    """
+
+    def __init__(
+        self,
+        embeddings: Optional[Embeddings] = None,
+        docsearch: Optional[VectorStore] = None,
+        agent_llm: Optional[BaseChatModel] = None,
+        refine_llm: Optional[BaseChatModel] = None,
+        answer_cache: Optional[SemanticAnswerCache] = None,
+        retriever: Optional[Retriever] = None,
+    ):
+        max_connections = int(config.get("HTTP_MAX_CONNECTIONS", 20))
+        self.http_client = httpx.Client(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        )
+        openai_api_key = config.get("OPENAI_API_KEY")
+        if embeddings is None:
+            from langchain_openai import OpenAIEmbeddings
+
+            embeddings = OpenAIEmbeddings(
+                api_key=openai_api_key,
+                model="text-embedding-ada-002",
+                http_client=self.http_client
+            )
+            max_batch = int(config.get("EMBEDDING_BATCH_MAX", 64))
+            if max_batch:
+                # Questions arriving together share one embeddings request
+                embeddings = BatchingEmbeddings(
+                    embeddings,
+                    max_batch=max_batch,
+                    max_in_flight=int(config.get("EMBEDDING_BATCH_MAX_IN_FLIGHT", 4))
+                )
+            embeddings = cached_embeddings(embeddings)
+        self.embeddings = embeddings
+        self.docsearch = docsearch or get_vectorstore(self.embeddings)
+        self.retriever = retriever or get_retriever(self.docsearch, self.embeddings)
+        self.answer_cache = answer_cache or get_answer_cache(self.embeddings)
+        self.agent = build_agent(agent_llm or get_agent_llm(http_client=self.http_client))
+        if refine_llm is None:
+            from langchain_openai import ChatOpenAI
+
+            refine_llm = ChatOpenAI(
+                api_key=openai_api_key,
+                model="gpt-4o-mini",
+                temperature=0,
+                cache=get_llm_cache(),
+                stream_usage=True,
+                http_client=self.http_client
+            )
+        self.refine_chain = PromptTemplate.from_template(REFINE_TEMPLATE) | refine_llm | StrOutputParser()
+
+    def close(self):
+        self.http_client.close()
+
+
+_context = None
+_context_lock = threading.Lock()
+
+def get_app_context() -> AppContext:
+    global _context
+    with _context_lock:
+        if _context is None:
+            _context = AppContext()
+        return _context
@@ -1,27 +1,165 @@
 """Author: Rishad Harisdias Bustomi"""
 
-from tools.sql_helper import meaningful_text_from_metadata, get_table_metadata
-from langchain_openai import OpenAIEmbeddings
-from langchain_pinecone import PineconeVectorStore
-from dotenv import load_dotenv
-import os
+from tools.sql_helper import meaningful_text_from_metadata, get_schemas_metadata, metadata_to_text, get_assumption_summary_and_relationship
+from tools.summarizer import summarize_texts
+from tools.crawl_manifest import CrawlManifest, document_id
+from tools.cache import cached_embeddings, get_cache
+from tools.answer_cache import SemanticAnswerCache, get_answer_cache
+from tools.result_cache import ResultCache, get_result_cache
+from tools.vector_store import get_vectorstore
+from tools.keyword_index import BM25Index, get_keyword_index
+from tools.schema_catalog import SchemaCatalog, get_schema_catalog
+from tools.schema_context import ColumnIndex, get_column_index
+from tools.timing import StageTimer
+from tools.config import config
+import argparse
 from pathlib import Path
-from streamlit import secrets
+from typing import Callable, Optional
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
 
 
 current_dir = Path(__file__).resolve().parent
-dotenv_path = current_dir.parent / '.env'
-load_dotenv(dotenv_path)
 
-openai_api_key = secrets["OPENAI_API_KEY"]
-pinecone_api_key = secrets["PINECONE_API_KEY"]
-pinecone_index_name = secrets["PINECONE_INDEX_NAME"]
+class CrawlContext:
+    """Stores and clients the crawl writes to: vector store, keyword index, schema catalog, column index,
+    manifest and the caches it invalidates, plus the LLM summarizer.
+
+    Any component can be injected, e.g. stubs and temporary stores in benchmarks.
+    """
+
+    def __init__(
+        self,
+        embeddings: Optional[Embeddings] = None,
+        vectorstore: Optional[VectorStore] = None,
+        keyword_index: Optional[BM25Index] = None,
+        catalog: Optional[SchemaCatalog] = None,
+        column_index: Optional[ColumnIndex] = None,
+        manifest: Optional[CrawlManifest] = None,
+        answer_cache: Optional[SemanticAnswerCache] = None,
+        result_cache: Optional[ResultCache] = None,
+        summarize: Optional[Callable[[str], str]] = None,
+    ):
+        if embeddings is None:
+            from langchain_openai import OpenAIEmbeddings
+
+            embeddings = cached_embeddings(OpenAIEmbeddings(api_key=config["OPENAI_API_KEY"], model="text-embedding-ada-002"))
+        self.embeddings = embeddings
+        self.vectorstore = vectorstore or get_vectorstore(self.embeddings)
+        self.keyword_index = keyword_index or get_keyword_index()
+        self.catalog = catalog or get_schema_catalog()
+        # Columns are only indexed, and embedded, when the app retrieves at column granularity
+        if column_index is None and config.get("RETRIEVAL_MODE", "table") == "column":
+            column_index = get_column_index(self.embeddings)
+        self.column_index = column_index
+        self.manifest = manifest or CrawlManifest(current_dir.parent / config.get("CRAWL_MANIFEST_PATH", ".askdb/crawl_manifest.json"))
+        self.answer_cache = answer_cache or get_answer_cache()
+        self.result_cache = result_cache or get_result_cache()
+        self.summarize = summarize or get_assumption_summary_and_relationship
+
+
+def crawl(list_of_tables: list, full: bool = False, context: Optional[CrawlContext] = None, timer: Optional[StageTimer] = None):
+    """
+    Crawl the metadata of the given tables and sync their documents to the vector database.
+    Unless `full` is set, only new or changed tables are summarized and embedded,
+    and tables no longer crawled are deleted from the index.
+    The time spent per stage is added to `timer`.
+    """
+    timer = timer or StageTimer()
+    print("Crawling metadata...")
+    with timer.stage("metadata"):
+        schema_names = sorted({table["schema_name"] for table in list_of_tables})
+        crawled = {
+            (metadata["schema_name"], metadata["table_name"]): metadata
+            for metadata in get_schemas_metadata(schema_names)
+        }
+    selected = []
+    for table in list_of_tables:
+        metadata = crawled.get((table["schema_name"], table["table_name"]))
+        if metadata is None:
+            print(f"Table {table['schema_name']}.{table['table_name']} not found, skipping.")
+            continue
+        selected.append(metadata)
+
+    context = context or CrawlContext()
+    vectorstore, keyword_index, catalog = context.vectorstore, context.keyword_index, context.catalog
+    column_index, manifest = context.column_index, context.manifest
+    with timer.stage("diff"):
+        if full:
+            print("Full crawl, clearing the index...")
+            vectorstore.delete(delete_all=True)
+            keyword_index.delete(delete_all=True)
+            catalog.clear()
+            if column_index is not None:
+                column_index.clear()
+            manifest.clear()
+        changed, unchanged, dropped = manifest.diff(selected)
+    print(f"{len(changed)} new or changed, {len(unchanged)} unchanged, {len(dropped)} dropped tables.")
+
+    if changed:
+        concurrency = int(config.get("SUMMARY_CONCURRENCY", 8))
+        print(f"Summarizing {len(changed)} tables with concurrency {concurrency}...")
+        with timer.stage("summarize"):
+            summaries = summarize_texts(
+                [metadata_to_text(metadata) for metadata in changed],
+                context.summarize,
+                concurrency=concurrency,
+                requests_per_second=float(config.get("SUMMARY_REQUESTS_PER_SECOND", 0)) or None
+            )
+            docs = [meaningful_text_from_metadata(metadata, summary) for metadata, summary in zip(changed, summaries)]
+        print(f"Embedding and upserting {len(docs)} documents to the vector store...")
+        with timer.stage("embed"):
+            vectorstore.add_documents(docs, ids=[document_id(metadata) for metadata in changed])
+        with timer.stage("index"):
+            keyword_index.add_documents(docs, ids=[document_id(metadata) for metadata in changed])
+            catalog.upsert(changed)
+            if column_index is not None:
+                print(f"Indexing the columns of {len(changed)} tables...")
+                column_index.upsert_tables(changed)
+            for metadata in changed:
+                manifest.update(metadata)
+
+    if dropped:
+        print(f"Deleting {len(dropped)} dropped tables from the vector store...")
+        with timer.stage("index"):
+            vectorstore.delete(ids=dropped)
+            keyword_index.delete(ids=dropped)
+            catalog.remove(dropped)
+            if column_index is not None:
+                column_index.delete_tables(dropped)
+            for doc_id in dropped:
+                manifest.remove(doc_id)
+
+    # Nothing to write when no table changed, rewriting the catalog would also make every app process reload it
+    if full or changed or dropped:
+        with timer.stage("save"):
+            keyword_index.save()
+            catalog.save()
+            if column_index is not None:
+                column_index.save()
+            manifest.save()
+
+    with timer.stage("invalidate"):
+        answer_cache = context.answer_cache
+        if answer_cache is not None and (changed or dropped):
+            invalidated = answer_cache.invalidate_tables([document_id(metadata) for metadata in changed] + dropped)
+            print(f"Invalidated {invalidated} cached answers.")
+        result_cache = context.result_cache
+        if result_cache is not None and (changed or dropped):
+            result_cache.invalidate_tables([document_id(metadata) for metadata in changed] + dropped)
+            print(f"Invalidated cached query results of {len(changed) + len(dropped)} tables.")
+    return changed, unchanged, dropped
+
 
 if __name__ == "__main__":
     """
     This function crawl the metadata from databases, 
     implement the embedding model, and store to vector database
     """
+    arg_parser = argparse.ArgumentParser(description="Crawl table metadata into the vector database.")
+    arg_parser.add_argument("--full", action="store_true", help="Clear the index and re-crawl every table")
+    args = arg_parser.parse_args()
+
     list_of_tables = [
         {
             "schema_name": "railway_mart",
@@ -45,22 +183,8 @@ if __name__ == "__main__":
         }
     ]
 
-    docs = []
-    print("Crawling metadata and generating docs...")
-    for table in list_of_tables:
-        metadata = get_table_metadata(table["schema_name"], table["table_name"])
-        doc = meaningful_text_from_metadata(metadata)
-        docs.append(doc)
-
-    print(f"{len(docs)} documents generated.")
-    print("Implementing embedding model and storing to PineVector...")
-    embeddings = OpenAIEmbeddings(api_key=openai_api_key, model="text-embedding-ada-002")
-    PineconeVectorStore.from_documents(
-        documents=docs,
-        embedding=embeddings,
-        index_name=pinecone_index_name,
-        pinecone_api_key=pinecone_api_key
-    )
+    timer = StageTimer()
+    crawl(list_of_tables, full=args.full, timer=timer)
+    print(f"Timings: {timer.report()}")
+    print(f"Cache: {get_cache().stats()}")
     print("Done!")
-    
-
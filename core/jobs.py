@@ -0,0 +1,130 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional
+
+from agents.redshift_agent import AgentCancelled
+from core.run import ask_redshift_stream
+from tools.config import config
+from tools.timing import StageTimer
+from tools.tracing import new_tracer
+
+
+class ExecutorBusy(Exception):
+    """Raised when the question queue is full."""
+
+
+class QuestionJob:
+    """A question running in the background; the UI polls `status`, `events` and `answer`.
+
+    `events` holds the agent's "action" and "observation" events followed by the answer's "token" events.
+    """
+
+    def __init__(self, question: str, options: Optional[dict] = None):
+        self.id = uuid.uuid4().hex
+        self.question = question
+        self.options = options or {}
+        self.status = "queued"
+        self.events: List[dict] = []
+        self.answer: Optional[str] = None
+        self.details: dict = {}
+        self.error: Optional[str] = None
+        self.timer = StageTimer(tracer=new_tracer())
+        self.submitted_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.cancel_event = threading.Event()
+        self.future = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("done", "failed", "cancelled")
+
+    def cancel(self):
+        self.cancel_event.set()
+        if self.future is not None and self.future.cancel():
+            self._finish("cancelled")
+
+    def _finish(self, status: str):
+        self.status = status
+        self.finished_at = time.time()
+
+
+class QuestionExecutor:
+    """Bounded pool running questions off the Streamlit script thread.
+
+    At most `max_workers` questions run at once and at most `max_pending`
+    (running plus queued) are accepted; beyond that `submit` raises ExecutorBusy.
+    """
+
+    def __init__(self, stream: Callable[..., Iterator[dict]], max_workers: int = 4, max_pending: int = 16, retention_seconds: float = 3600):
+        self.stream = stream
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="question")
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.retention_seconds = retention_seconds
+        self.jobs: Dict[str, QuestionJob] = {}
+        self.lock = threading.Lock()
+
+    def submit(self, question: str, **options) -> QuestionJob:
+        """Queue a question; `options` are passed on to the stream, e.g. refine=True."""
+        if not self.slots.acquire(blocking=False):
+            raise ExecutorBusy("Too many questions in progress, please try again shortly.")
+        job = QuestionJob(question, options)
+        with self.lock:
+            self._prune()
+            self.jobs[job.id] = job
+        job.future = self.executor.submit(self._run, job)
+        job.future.add_done_callback(lambda _: self.slots.release())
+        return job
+
+    def _run(self, job: QuestionJob):
+        if job.cancel_event.is_set():
+            job._finish("cancelled")
+            return
+        job.status = "running"
+        try:
+            for event in self.stream(job.question, timer=job.timer, details=job.details, should_stop=job.cancel_event.is_set, **job.options):
+                if event["type"] == "done":
+                    job.answer = event["refined"]
+                else:
+                    job.events.append(event)
+            job._finish("done")
+        except AgentCancelled:
+            job._finish("cancelled")
+        except Exception as e:
+            job.error = str(e)
+            job._finish("failed")
+
+    def get(self, job_id: str) -> Optional[QuestionJob]:
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def pop(self, job_id: str) -> Optional[QuestionJob]:
+        with self.lock:
+            return self.jobs.pop(job_id, None)
+
+    def _prune(self):
+        cutoff = time.time() - self.retention_seconds
+        for job_id in [job_id for job_id, job in self.jobs.items() if job.done and job.finished_at < cutoff]:
+            del self.jobs[job_id]
+
+    def stats(self) -> dict:
+        with self.lock:
+            statuses = [job.status for job in self.jobs.values()]
+        return {status: statuses.count(status) for status in ("queued", "running", "done", "failed", "cancelled")}
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_question_executor() -> QuestionExecutor:
+    """Process-wide executor shared by every Streamlit session."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = QuestionExecutor(
+                ask_redshift_stream,
+                max_workers=int(config.get("QUESTION_WORKERS", 4)),
+                max_pending=int(config.get("QUESTION_MAX_PENDING", 16))
+            )
+        return _executor
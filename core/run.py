@@ -1,53 +1,136 @@
-from agents.redshift_agent import redshift_agent
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_pinecone import PineconeVectorStore
-from dotenv import load_dotenv
-from pathlib import Path
-from langchain.prompts import PromptTemplate
-import os
+from agents.redshift_agent import iter_redshift_agent
+from core.context import AppContext, get_app_context
+from typing import Callable, Iterator, Optional
 from langchain_core.exceptions import OutputParserException
-from langchain.schema.output_parser import StrOutputParser
-from streamlit import secrets
+from tools.timing import StageTimer
+from tools.tracing import new_tracer
+from tools.sql_parse import extract_tables
 
-current_dir = Path(__file__).resolve().parent
-dotenv_path = current_dir.parent / '.env'
-load_dotenv(dotenv_path)
+def refine_answer(
+    result,
+    context: AppContext,
+    timer: StageTimer,
+) -> Iterator[str]:
+    """Rewrite the agent output into plain sentences with the refine chain, streaming its tokens."""
+    with timer.stage("refine"), timer.span("refine"):
+        for chunk in context.refine_chain.stream({"output": result}, config={"callbacks": timer.callbacks}):
+            yield chunk
 
-openai_api_key = secrets["OPENAI_API_KEY"]
-pinecone_api_key = secrets["PINECONE_API_KEY"]
-pinecone_index_name = secrets["PINECONE_INDEX_NAME"]
+def ask_redshift_stream(
+    query: str,
+    context: Optional[AppContext] = None,
+    timer: Optional[StageTimer] = None,
+    use_cache: bool = True,
+    details: Optional[dict] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+    refine: bool = False,
+) -> Iterator[dict]:
+    """Answer a question as a stream of events.
 
-llm = ChatOpenAI(api_key=openai_api_key, model="gpt-4o-mini", temperature=0)
+    Yields the agent's "action" and "observation" events as they happen, then the
+    answer as "token" events, and finally a "done" event with "answer"
+    (the agent's final answer) and "refined" (the concatenated tokens).
+    The refine LLM call only runs when the agent output could not be parsed or `refine` is set,
+    otherwise the tokens are the agent's final answer as is.
+    When `details` is given it is filled with the answer's "sql", "result_file", "cached", "refined"
+    and the agent's per-iteration token accounting ("iterations").
+    """
+    timer = timer or StageTimer(tracer=new_tracer())
+    details = details if details is not None else {}
+    if timer.tracer is None:
+        yield from _answer_stream(query, context, timer, use_cache, details, should_stop, refine)
+        return
+    timer.tracer.start("question", question=query)
+    try:
+        yield from _answer_stream(query, context, timer, use_cache, details, should_stop, refine)
+    finally:
+        timer.tracer.finish(**{key: details[key] for key in ("cached", "refined") if key in details})
 
-def ask_redshift(query: str):
-    embeddings = OpenAIEmbeddings(api_key=openai_api_key, model="text-embedding-ada-002")
-    docsearch = PineconeVectorStore(index_name=pinecone_index_name, embedding=embeddings, pinecone_api_key=pinecone_api_key)
+def _answer_stream(
+    query: str,
+    context: Optional[AppContext],
+    timer: StageTimer,
+    use_cache: bool,
+    details: dict,
+    should_stop: Optional[Callable[[], bool]],
+    refine: bool,
+) -> Iterator[dict]:
+    details.update({"sql": None, "result_file": None, "cached": False, "refined": False})
+    with timer.stage("context"):
+        context = context or get_app_context()
+    if use_cache and context.answer_cache is not None:
+        with timer.stage("answer_cache"), timer.span("answer_cache") as span:
+            cached = context.answer_cache.lookup(query)
+            span.set(hit=cached is not None)
+        if cached is not None:
+            details.update({"sql": cached["sql"], "cached": True})
+            yield {"type": "token", "text": cached["answer"]}
+            yield {"type": "done", "answer": cached["answer"], "refined": cached["answer"]}
+            return
     try:
-        result = redshift_agent(query, docsearch)
+        result = None
+        for event in iter_redshift_agent(query, context.retriever, agent=context.agent, timer=timer, should_stop=should_stop):
+            if event["type"] == "finish":
+                result = event["step"]
+            else:
+                yield event
     except OutputParserException as e:
         _temp = str(e)
         lines = _temp.split("\n")  # Split into lines
         lines = lines[:-2]  # Remove the last two rows
         result = "\n".join(lines)
-    
-    template = """
-    Given the following output:
-    {output}
-
-    refine the output (change like Action: Action:Input to a sentence). Refine also the Final Answer so its not using number but still keep the context
-    """
-    prompt = PromptTemplate.from_template(template)
-    chain = prompt | llm | StrOutputParser()
+        refine = True
 
-    final_result = chain.invoke({"output": result})
     try:
         fi_result = result.return_values["output"]
     except Exception as e:
         fi_result = result.replace("Parsing LLM output produced both a final answer and a parse-able action:","")
-    return fi_result
+    else:
+        # Only clean agent finishes are cached, parser failures and stopped runs are not reusable answers
+        sql = result.return_values.get("sql")
+        details.update({
+            "sql": sql,
+            "result_file": result.return_values.get("result_file"),
+            "iterations": result.return_values.get("iterations", []),
+        })
+        if context.answer_cache is not None and sql and not result.return_values.get("stopped"):
+            context.answer_cache.store(query, fi_result, sql, extract_tables(sql))
+
+    if refine:
+        details["refined"] = True
+        tokens = []
+        for chunk in refine_answer(result, context, timer):
+            tokens.append(chunk)
+            yield {"type": "token", "text": chunk}
+        final_result = "".join(tokens)
+    else:
+        final_result = fi_result
+        yield {"type": "token", "text": fi_result}
+    yield {"type": "done", "answer": fi_result, "refined": final_result}
+
+def ask_redshift(
+    query: str,
+    context: Optional[AppContext] = None,
+    timer: Optional[StageTimer] = None,
+    use_cache: bool = True,
+    details: Optional[dict] = None,
+    on_step: Optional[Callable[[dict], None]] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+    refine: bool = False,
+):
+    """Answer a question and return the answer `ask_redshift_stream` streams, rewritten when `refine` is set.
+    `on_step` receives the agent's "action" and "observation" events, see `ask_redshift_stream`."""
+    for event in ask_redshift_stream(query, context=context, timer=timer, use_cache=use_cache, details=details, should_stop=should_stop, refine=refine):
+        if event["type"] == "done":
+            return event.get("refined", event["answer"])
+        if on_step is not None and event["type"] != "token":
+            on_step(event)
 
 
 if __name__ == "__main__":
     question = "Who are the top 3 sellers based on total sales value?"
-    result = ask_redshift(question)
-    print(f"{result}")
\ No newline at end of file
+    timer = StageTimer(tracer=new_tracer())
+    result = ask_redshift(question, timer=timer)
+    print(f"{result}")
+    print(f"Timings: {timer.report()}")
+    print(f"LLM cost: ${timer.total_cost():.4f}")
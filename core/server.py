@@ -0,0 +1,201 @@
+"""HTTP API serving `ask_redshift` to other internal tools, independent of Streamlit.
+
+    uvicorn core.server:create_app --factory --host 0.0.0.0 --port 8000
+
+Run a single process: the LLM, vector store and warehouse clients, the question executor and the
+tenant limits live in it and are shared by every request.
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Dict, Optional
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from core.jobs import ExecutorBusy, QuestionExecutor, get_question_executor
+from tools.config import config
+from tools.db import pool_metrics, pool_saturated
+
+TENANT_HEADER = "X-Tenant"
+
+
+class TenantBusy(Exception):
+    """Raised when a tenant already has as many questions queued as it may."""
+
+
+class _Tenant:
+    __slots__ = ("semaphore", "running", "waiting")
+
+    def __init__(self, concurrency: int):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.running = 0
+        self.waiting = 0
+
+
+class TenantLimiter:
+    """Per-tenant concurrency limits, so one busy tool cannot take every worker.
+
+    Each tenant runs at most `concurrency` questions at once (or its entry in `limits`), and at
+    most `max_queued` more wait for a slot; beyond that `acquire` raises TenantBusy.
+    """
+
+    def __init__(self, concurrency: int = 2, max_queued: int = 8, limits: Optional[Dict[str, int]] = None):
+        self.concurrency = concurrency
+        self.max_queued = max_queued
+        self.limits = limits or {}
+        self.tenants: Dict[str, _Tenant] = {}
+
+    async def acquire(self, tenant: str):
+        """Wait for one of `tenant`'s slots, hold it until `release`."""
+        state = self.tenants.get(tenant)
+        if state is None:
+            state = self.tenants[tenant] = _Tenant(int(self.limits.get(tenant, self.concurrency)))
+        if state.semaphore.locked() and state.waiting >= self.max_queued:
+            raise TenantBusy(f"Tenant '{tenant}' has too many questions in progress, please try again shortly.")
+        state.waiting += 1
+        try:
+            await state.semaphore.acquire()
+        finally:
+            state.waiting -= 1
+        state.running += 1
+
+    def release(self, tenant: str):
+        state = self.tenants[tenant]
+        state.running -= 1
+        state.semaphore.release()
+
+    def stats(self) -> dict:
+        return {tenant: {"running": state.running, "waiting": state.waiting} for tenant, state in self.tenants.items()}
+
+
+class QuestionServer:
+    """Admits questions through the tenant limits and warehouse backpressure, then runs them on the executor.
+
+    While every warehouse connection is checked out, new questions wait up to `backpressure_seconds`
+    before being turned away, instead of piling up on the pool.
+    """
+
+    def __init__(
+        self,
+        executor: Optional[QuestionExecutor] = None,
+        limiter: Optional[TenantLimiter] = None,
+        backpressure_seconds: Optional[float] = None,
+        timeout_seconds: Optional[float] = None,
+    ):
+        self._executor = executor
+        self.limiter = limiter or TenantLimiter(
+            concurrency=int(config.get("SERVER_TENANT_CONCURRENCY", 2)),
+            max_queued=int(config.get("SERVER_TENANT_MAX_QUEUED", 8)),
+            limits=config.get("SERVER_TENANT_LIMITS", {})
+        )
+        self.backpressure_seconds = float(
+            backpressure_seconds if backpressure_seconds is not None else config.get("SERVER_BACKPRESSURE_SECONDS", 5)
+        )
+        self.timeout_seconds = float(
+            timeout_seconds if timeout_seconds is not None else config.get("SERVER_QUESTION_TIMEOUT_SECONDS", 300)
+        )
+
+    @property
+    def executor(self) -> QuestionExecutor:
+        return self._executor or get_question_executor()
+
+    async def _wait_for_warehouse(self) -> bool:
+        deadline = time.perf_counter() + self.backpressure_seconds
+        while pool_saturated():
+            if time.perf_counter() >= deadline:
+                return False
+            await asyncio.sleep(0.02)
+        return True
+
+    async def ask(self, request: Request) -> JSONResponse:
+        start = time.perf_counter()
+        try:
+            body = await request.json()
+        except ValueError:
+            body = None
+        question = body.get("question") if isinstance(body, dict) else None
+        if not isinstance(question, str) or not question.strip():
+            return JSONResponse({"error": "Expected a JSON body with a non-empty \"question\"."}, status_code=400)
+        options = {key: bool(body[key]) for key in ("refine", "use_cache") if key in body}
+        tenant = request.headers.get(TENANT_HEADER, "default")
+
+        try:
+            await self.limiter.acquire(tenant)
+        except TenantBusy as e:
+            return JSONResponse({"error": str(e)}, status_code=429, headers={"Retry-After": "1"})
+        job = None
+        try:
+            if not await self._wait_for_warehouse():
+                return JSONResponse(
+                    {"error": "The warehouse is busy, please try again shortly."},
+                    status_code=503, headers={"Retry-After": "1"}
+                )
+            job = self.executor.submit(question, **options)
+        except ExecutorBusy as e:
+            return JSONResponse({"error": str(e)}, status_code=503, headers={"Retry-After": "1"})
+        finally:
+            if job is None:
+                self.limiter.release(tenant)
+
+        # Cancelling a job only stops it at its next step, so the tenant keeps the slot until it has stopped
+        loop = asyncio.get_running_loop()
+
+        def release_slot(future):
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(self.limiter.release, tenant)
+
+        job.future.add_done_callback(release_slot)
+        try:
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(job.future)), self.timeout_seconds)
+        except asyncio.TimeoutError:
+            job.cancel()
+            return JSONResponse({"id": job.id, "error": "The question timed out."}, status_code=504)
+
+        self.executor.pop(job.id)
+        response = {
+            "id": job.id,
+            "status": job.status,
+            "answer": job.answer,
+            "sql": job.details.get("sql"),
+            "cached": job.details.get("cached", False),
+            "refined": job.details.get("refined", False),
+            "seconds": round(time.perf_counter() - start, 3),
+            "timings": job.timer.report(),
+        }
+        if job.status == "failed":
+            return JSONResponse({**response, "error": job.error}, status_code=500)
+        return JSONResponse(response)
+
+    async def health(self, request: Request) -> JSONResponse:
+        return JSONResponse({"status": "ok"})
+
+    async def stats(self, request: Request) -> JSONResponse:
+        return JSONResponse({
+            "tenants": self.limiter.stats(),
+            "questions": self.executor.stats(),
+            "pool": pool_metrics(),
+        })
+
+
+def create_app(server: Optional[QuestionServer] = None) -> Starlette:
+    """The ASGI app: POST /ask, GET /stats and GET /health."""
+    server = server or QuestionServer()
+    return Starlette(routes=[
+        Route("/ask", server.ask, methods=["POST"]),
+        Route("/stats", server.stats, methods=["GET"]),
+        Route("/health", server.health, methods=["GET"]),
+    ])
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    arg_parser = argparse.ArgumentParser(description="Serve ask_redshift over HTTP.")
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8000)
+    args = arg_parser.parse_args()
+    uvicorn.run(create_app(), host=args.host, port=args.port)
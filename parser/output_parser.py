@@ -1,11 +1,9 @@
 import re
-from typing import Union
+from typing import Iterator, List, Optional, Tuple, Union
 
 from langchain_core.agents import AgentAction, AgentFinish
 from langchain_core.exceptions import OutputParserException
-
-from langchain.agents.agent import AgentOutputParser
-from langchain.agents.mrkl.prompt import FORMAT_INSTRUCTIONS
+from langchain_core.output_parsers import BaseOutputParser
 
 FINAL_ANSWER_ACTION = "Final Answer:"
 MISSING_ACTION_AFTER_THOUGHT_ERROR_MESSAGE = (
@@ -17,9 +15,136 @@ MISSING_ACTION_INPUT_AFTER_ACTION_ERROR_MESSAGE = (
 FINAL_ANSWER_AND_PARSABLE_ACTION_ERROR_MESSAGE = (
     "Parsing LLM output produced both a final answer and a parse-able action:"
 )
+FORMAT_INSTRUCTIONS = """Use the following format:
+
+Question: the input question you must answer
+Thought: you should always think about what to do
+Action: the action to take, should be one of [{tool_names}]
+Action Input: the input to the action
+Observation: the result of the action
+... (this Thought/Action/Action Input/Observation can repeat N times)
+Thought: I now know the final answer
+Final Answer: the final answer to the original input question"""
+
+# The markers of the format: "Action" starts "Action:" and "Action Input:", each with optional numbers
+_LITERALS = (("Action", None), ("Thought:", "thought"), (FINAL_ANSWER_ACTION, "final"))
+_ACTION = re.compile(r"Action\s*\d*\s*(Input\s*\d*\s*)?:")
+_ACTION_MARKER = re.compile(r"Action\s*\d*\s*:")
+_INPUT_MARKER = re.compile(r"Action\s*\d*\s*Input\s*\d*\s*:")
+
+
+def _markers(text: str) -> Iterator[Tuple[str, int, int]]:
+    """(kind, start, end) of every marker, in order.
+
+    Finds the next occurrence of each literal with `str.find`, which is much faster than a regex
+    alternation trying every position, and only runs `_ACTION` where an "Action" is.
+    """
+    found = [text.find(literal) for literal, _ in _LITERALS]
+    while True:
+        start = min((i for i in found if i != -1), default=-1)
+        if start == -1:
+            return
+        index = found.index(start)
+        literal, kind = _LITERALS[index]
+        if kind is None:
+            match = _ACTION.match(text, start)
+            if match is None:
+                found[index] = text.find(literal, start + 1)
+                continue
+            kind, end = "action" if match.group(1) is None else "input", match.end()
+        else:
+            end = start + len(literal)
+        yield kind, start, end
+        found = [
+            i if i == -1 or i >= end else text.find(literal, end)
+            for i, (literal, _) in zip(found, _LITERALS)
+        ]
 
 
-class ReActSingleInputOutputParser(AgentOutputParser):
+def parse_react(text: str) -> Union[AgentAction, AgentFinish]:
+    """Parse a ReAct completion like the DOTALL regex `Action:(.*?)Action Input:(.*?)(?:$|Thought:)` it replaced.
+
+    The tool is the text between the first "Action:" and the first "Action Input:" after it, the tool input
+    runs up to the next "Thought:" or the end. The input is looked for once after the first "Action:" rather
+    than after every one in turn, so an output full of `Action:` lines without an input parses in linear time.
+    """
+    includes_answer = FINAL_ANSWER_ACTION in text
+    action_match = _ACTION_MARKER.search(text)
+    input_match = _INPUT_MARKER.search(text, action_match.end()) if action_match else None
+    if input_match:
+        if includes_answer:
+            raise OutputParserException(
+                f"{FINAL_ANSWER_AND_PARSABLE_ACTION_ERROR_MESSAGE}: {text}"
+            )
+        thought = text.find("Thought:", input_match.end())
+        action = text[action_match.end():input_match.start()].strip()
+        tool_input = text[input_match.end():thought if thought != -1 else len(text)].strip()
+        return AgentAction(action, tool_input, text)
+    if includes_answer:
+        # The answer is whatever follows the last "Final Answer:"
+        return AgentFinish({"output": text.rsplit(FINAL_ANSWER_ACTION, 1)[-1].strip()}, text)
+
+    if action_match is None:
+        raise OutputParserException(
+            f"Could not parse LLM output: `{text}`",
+            observation=MISSING_ACTION_AFTER_THOUGHT_ERROR_MESSAGE,
+            llm_output=text,
+            send_to_llm=True,
+        )
+    if not _INPUT_MARKER.search(text):
+        raise OutputParserException(
+            f"Could not parse LLM output: `{text}`",
+            observation=MISSING_ACTION_INPUT_AFTER_ACTION_ERROR_MESSAGE,
+            llm_output=text,
+            send_to_llm=True,
+        )
+    raise OutputParserException(f"Could not parse LLM output: `{text}`")
+
+
+def parse_react_actions(text: str) -> Union[List[AgentAction], AgentFinish]:
+    """Parse a completion that may hold several Action/Action Input pairs, to be run together.
+
+    Every input runs up to the next marker. Each action's log is its own part of the completion,
+    the first one including the thought, so the scratchpad renders the batch as consecutive steps.
+    A completion with at most one pair parses exactly like `parse_react`.
+    """
+    pairs: List[Tuple[int, int, int]] = []
+    action: Optional[Tuple[int, int]] = None
+    spans: List[Tuple[int, int]] = []
+    has_final = False
+    for kind, start, end in _markers(text):
+        if pairs and len(spans) < len(pairs):
+            spans.append((pairs[-1][2], start))
+        if kind == "action":
+            action = (start, end)
+        elif kind == "input" and action is not None:
+            pairs.append((action[1], start, end))
+            action = None
+        elif kind == "final":
+            has_final = True
+    if len(pairs) < 2:
+        result = parse_react(text)
+        return [result] if isinstance(result, AgentAction) else result
+    if has_final:
+        raise OutputParserException(
+            f"{FINAL_ANSWER_AND_PARSABLE_ACTION_ERROR_MESSAGE}: {text}"
+        )
+    if len(spans) < len(pairs):
+        spans.append((pairs[-1][2], len(text)))
+
+    actions = []
+    log_start = 0
+    for (tool_start, tool_end, _), (input_start, input_end) in zip(pairs, spans):
+        actions.append(AgentAction(
+            text[tool_start:tool_end].strip(),
+            text[input_start:input_end].strip(),
+            text[log_start:input_end].strip("\n")
+        ))
+        log_start = input_end
+    return actions
+
+
+class ReActSingleInputOutputParser(BaseOutputParser[Union[AgentAction, AgentFinish]]):
     """Parses ReAct-style LLM calls that have a single tool input.
 
     Expects output to be in one of two formats.
@@ -55,48 +180,28 @@ class ReActSingleInputOutputParser(AgentOutputParser):
         return FORMAT_INSTRUCTIONS
 
     def parse(self, text: str) -> Union[AgentAction, AgentFinish]:
-        includes_answer = FINAL_ANSWER_ACTION in text
-        
-        # Updated regex to capture multiline content
-        regex = r"Action\s*\d*\s*:(.*?)Action\s*\d*\s*Input\s*\d*\s*:(.*?)(?:$|Thought:|\Z)"
-        action_match = re.search(regex, text, re.DOTALL)
-        
-        if action_match:
-            if includes_answer:
-                raise OutputParserException(
-                    f"{FINAL_ANSWER_AND_PARSABLE_ACTION_ERROR_MESSAGE}: {text}"
-                )
-            action = action_match.group(1).strip()
-            action_input = action_match.group(2)
-            tool_input = action_input.strip()
-
-            return AgentAction(action, tool_input, text)
-
-        elif includes_answer:
-            # Split on Final Answer: and take the last part
-            final_answer_match = re.split(FINAL_ANSWER_ACTION, text, flags=re.DOTALL)
-            if len(final_answer_match) > 1:
-                return AgentFinish(
-                    {"output": final_answer_match[-1].strip()}, text
-                )
-
-        if not re.search(r"Action\s*\d*\s*:", text, re.DOTALL):
-            raise OutputParserException(
-                f"Could not parse LLM output: `{text}`",
-                observation=MISSING_ACTION_AFTER_THOUGHT_ERROR_MESSAGE,
-                llm_output=text,
-                send_to_llm=True,
-            )
-        elif not re.search(r"Action\s*\d*\s*Input\s*\d*\s*:", text, re.DOTALL):
-            raise OutputParserException(
-                f"Could not parse LLM output: `{text}`",
-                observation=MISSING_ACTION_INPUT_AFTER_ACTION_ERROR_MESSAGE,
-                llm_output=text,
-                send_to_llm=True,
-            )
-        else:
-            raise OutputParserException(f"Could not parse LLM output: `{text}`")
+        return parse_react(text)
+
+    @property
+    def _type(self) -> str:
+        return "react-single-input"
+
+
+class ReActMultiActionOutputParser(BaseOutputParser[Union[List[AgentAction], AgentFinish]]):
+    """Parses ReAct-style LLM calls that may request several tool calls at once, see `parse_react_actions`.
+
+    Like the single-input parser the agent uses otherwise, tool inputs are stripped of surrounding quotes.
+    """
+
+    def get_format_instructions(self) -> str:
+        return FORMAT_INSTRUCTIONS
+
+    def parse(self, text: str) -> Union[List[AgentAction], AgentFinish]:
+        result = parse_react_actions(text)
+        if isinstance(result, AgentFinish):
+            return result
+        return [AgentAction(action.tool, action.tool_input.strip(" ").strip('"'), action.log) for action in result]
 
     @property
     def _type(self) -> str:
-        return "react-single-input"
\ No newline at end of file
+        return "react-multi-action"
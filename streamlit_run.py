@@ -1,8 +1,68 @@
+import altair as alt
+import pandas as pd
 import streamlit as st
 from streamlit_chat import message
 import time
-from core.run import ask_redshift
-from streamlit import secrets
+import os
+from core.jobs import ExecutorBusy, get_question_executor
+from tools.config import config
+from tools.schema_catalog import get_schema_catalog
+
+SIDEBAR_MAX_TABLES = int(config.get("SIDEBAR_MAX_TABLES", 50))
+
+def render_trace(rows: list, key: str):
+    """Per-question waterfall of the traced spans, one bar per span from its start to its end."""
+    data = pd.DataFrame([
+        dict(row, attributes=", ".join(f"{name}={value}" for name, value in row["attributes"].items()))
+        for row in rows
+    ])
+    chart = alt.Chart(data).mark_bar().encode(
+        x=alt.X("start_ms:Q", title="ms since the question started"),
+        x2="end_ms:Q",
+        y=alt.Y("span:N", sort=None, title=None),
+        tooltip=["span", alt.Tooltip("duration_ms:Q", format=".1f"), "attributes"]
+    )
+    st.altair_chart(chart, use_container_width=True, key=key)
+
+@st.fragment(run_every=0.5)
+def render_job_progress():
+    """Poll the running question and render its agent steps as they arrive."""
+    executor = get_question_executor()
+    job = executor.get(st.session_state.job_id)
+    if job is None:
+        st.session_state.job_id = None
+        st.rerun()
+    if job.done:
+        executor.pop(job.id)
+        st.session_state.job_id = None
+        if job.status == "done":
+            st.session_state.messages.append({
+                "role": "assistant",
+                "content": job.answer,
+                "result_file": job.details.get("result_file"),
+                "timing": f"Answered in {job.timer.total():.2f}s for ${job.timer.total_cost():.6f} ({job.timer.report()})",
+                "trace": job.timer.tracer.waterfall() if job.timer.tracer is not None else None
+            })
+        elif job.status == "failed":
+            st.session_state.messages.append({"role": "assistant", "content": f"Sorry, something went wrong: {job.error}"})
+        else:
+            st.session_state.messages.append({"role": "assistant", "content": "Question cancelled."})
+        st.rerun()
+
+    with st.status(f"Processing your question ({job.status})...", expanded=True):
+        tokens = []
+        for event in list(job.events):
+            if event["type"] == "action":
+                st.markdown(event["thought"])
+                st.code(event["tool_input"], language="sql")
+            elif event["type"] == "observation":
+                st.text(event["observation"][:1000])
+            else:
+                tokens.append(event["text"])
+        if tokens:
+            st.markdown("".join(tokens))
+        if st.button("Cancel", key=f"cancel_{job.id}"):
+            job.cancel()
 
 def main():
     # Configure page with dark theme
@@ -35,19 +95,25 @@ def main():
     # Initialize chat history in session state if it doesn't exist
     if "messages" not in st.session_state:
         st.session_state.messages = []
+    if "job_id" not in st.session_state:
+        st.session_state.job_id = None
 
     # Create the main input and button
     question = st.text_input("Type your question here...")
+    refine = st.toggle("Rewrite the answer in plain language", help="Runs one extra LLM call to rephrase the agent's answer.")
     
-    # Create a button with spinner
-    if st.button("Ask", type="primary") and question: 
-        st.session_state.messages.append({"role": "user", "content": question})
-        with st.spinner("Processing your question..."):
-            response = ask_redshift(question)
-            st.session_state.messages.append({
-                "role": "assistant", 
-                "content": response
-            })
+    # Questions run on a shared background executor so the script run is never blocked
+    if st.button("Ask", type="primary", disabled=st.session_state.job_id is not None) and question: 
+        try:
+            job = get_question_executor().submit(question, refine=refine)
+        except ExecutorBusy as e:
+            st.warning(str(e))
+        else:
+            st.session_state.messages.append({"role": "user", "content": question})
+            st.session_state.job_id = job.id
+
+    if st.session_state.job_id is not None:
+        render_job_progress()
 
     # Display chat messages
     chat_container = st.container()
@@ -57,6 +123,15 @@ def main():
                 message(msg["content"], is_user=True, key=f"msg_{i}")
             else:
                 message(msg["content"], is_user=False, key=f"msg_{i}")
+                if msg.get("timing"):
+                    st.caption(msg["timing"])
+                if msg.get("trace"):
+                    with st.expander("Trace"):
+                        render_trace(msg["trace"], key=f"trace_{i}")
+                result_file = msg.get("result_file")
+                if result_file and os.path.exists(result_file):
+                    with open(result_file, "rb") as f:
+                        st.download_button("Download full result (Parquet)", f, file_name=os.path.basename(result_file), key=f"download_{i}")
             
     # Create the sidebar
     with st.sidebar:
@@ -66,45 +141,26 @@ def main():
         st.button("Crawl Tables From Redshift", type="primary")
         
         # Add search box
-        st.text_input("Search tables...")
-        
-        # Add "Crawled Tables (3)" header
-        st.subheader("Crawled Tables (3)")
-        
-        # Add example tables with schema and timestamp
-        tables = [
-            {
-                "name": "sales_transaction",
-                "schema": "railways_mart",
-                "last_crawled": "2024-12-19 10:30:00"
-            },
-            {
-                "name": "incident_maintenance", 
-                "schema": "railways_mart",
-                "last_crawled": "2024-12-19 09:45:00"
-            },
-            {
-                "name": "route",
-                "schema": "railways_mart", 
-                "last_crawled": "2024-12-19 08:15:00"
-            },
-            {
-                "name": "route_performance_metrics",
-                "schema": "railways_mart", 
-                "last_crawled": "2024-12-19 08:15:00"
-            },
-            {
-                "name": "financial_performance_metrics",
-                "schema": "railways_mart", 
-                "last_crawled": "2024-12-19 08:15:00"
-            }
-        ]
-        
-        # Display tables
-        for table in tables:
-            with st.expander(table['name'], expanded=True):
-                st.text(f"Schema: {table['schema']}")
-                st.text(f"Last crawled: {table['last_crawled']}")
+        search = st.text_input("Search tables...").strip().lower()
+
+        # Tables come from the crawled schema catalog
+        catalog = get_schema_catalog()
+        tables = sorted(
+            (table for table in catalog.tables.values() if search in table.id.lower()),
+            key=lambda table: table.id
+        )
+        st.subheader(f"Crawled Tables ({len(tables)})")
+        if not catalog.tables:
+            st.caption("No tables crawled yet, run `python -m core.crawl_metadata`.")
+
+        # Display tables, capped so wide warehouses do not flood the sidebar
+        for table in tables[:SIDEBAR_MAX_TABLES]:
+            with st.expander(table.name, expanded=False):
+                st.text(f"Schema: {table.schema_name}")
+                st.text(f"Columns: {len(table.column_names)}")
+                st.text(f"Last crawled: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(table.crawled_at))}")
+        if len(tables) > SIDEBAR_MAX_TABLES:
+            st.caption(f"Showing {SIDEBAR_MAX_TABLES} of {len(tables)} tables, search to narrow down.")
 
 if __name__ == "__main__":
     main()
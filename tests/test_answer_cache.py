@@ -0,0 +1,38 @@
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+from tools.answer_cache import SemanticAnswerCache, question_words
+
+
+class SameEmbeddings(Embeddings):
+    """Every text gets the same vector, so only the cache's own checks tell questions apart."""
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return [1.0, 0.0]
+
+
+def cache_with(question: str) -> SemanticAnswerCache:
+    cache = SemanticAnswerCache(":memory:", SameEmbeddings())
+    cache.store(question, "Sellers 22, 7 and 9", "SELECT sellerid FROM sales", ["sales"])
+    return cache
+
+
+def test_near_antonyms_miss():
+    cache = cache_with("Who are the top 3 sellers?")
+    assert cache.lookup("Who are the bottom 3 sellers?") is None
+    assert cache.lookup("Who are the top 5 sellers?") is None
+
+
+def test_rephrasings_hit():
+    cache = cache_with("Who are the top 3 sellers?")
+    assert cache.lookup("Show me the top 3 seller")["answer"] == "Sellers 22, 7 and 9"
+    assert cache.lookup("top 3 sellers")["similarity"] > 0.99
+
+
+def test_question_words_drop_phrasing_and_fold_plurals():
+    assert question_words("What are the sales of the top routes?") == {"sale", "top", "route"}
+    assert question_words("List the top route sale") == {"sale", "top", "route"}
@@ -0,0 +1,32 @@
+import sqlalchemy as sa
+
+from tools.db import pool_saturated
+
+
+def sqlite_engine(tmp_path, pool_size: int, max_overflow: int) -> sa.engine.Engine:
+    return sa.create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=sa.pool.QueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        connect_args={"check_same_thread": False}
+    )
+
+
+def test_saturated_once_size_and_overflow_are_checked_out(tmp_path):
+    engine = sqlite_engine(tmp_path, pool_size=1, max_overflow=1)
+    first = engine.connect()
+    assert not pool_saturated(engine)
+    second = engine.connect()
+    assert pool_saturated(engine)
+    second.close()
+    first.close()
+    assert not pool_saturated(engine)
+
+
+def test_unlimited_overflow_is_never_saturated(tmp_path):
+    engine = sqlite_engine(tmp_path, pool_size=1, max_overflow=-1)
+    connections = [engine.connect() for _ in range(3)]
+    assert not pool_saturated(engine)
+    for connection in connections:
+        connection.close()
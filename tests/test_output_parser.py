@@ -0,0 +1,77 @@
+import random
+
+import pytest
+from langchain_core.agents import AgentAction, AgentFinish
+from langchain_core.exceptions import OutputParserException
+
+from benchmarks.bench_output_parser import legacy_parse, synthetic
+from parser.output_parser import ReActMultiActionOutputParser, parse_react, parse_react_actions
+
+FRAGMENTS = [
+    "Action", "Action:", "Action 1:", "Action  2 :", "Action\n:", "Action Input:", "Action 1 Input 1:",
+    "Action\nInput :", "ActionInput:", "Input:", "Thought:", "Thought", "Final Answer:", "Final Answer",
+    "Observation:", " ", "  ", "\n", "\n\n", "validate_redshift_query", "SELECT 1", "foo", "2", ":", '"', "Act", "ion",
+]
+
+
+def outcome(parse, text: str) -> tuple:
+    try:
+        result = parse(text)
+    except OutputParserException as e:
+        return ("error", str(e), e.observation, e.send_to_llm)
+    if isinstance(result, AgentAction):
+        return ("action", result.tool, result.tool_input, result.log)
+    return ("finish", result.return_values, result.log)
+
+
+def random_completions(cases: int, seed: int = 7):
+    rng = random.Random(seed)
+    for _ in range(cases):
+        yield "".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 14)))
+
+
+def test_parse_react_matches_the_regex_parser():
+    for text in random_completions(20000):
+        assert outcome(parse_react, text) == outcome(legacy_parse, text), text
+
+
+@pytest.mark.parametrize("kind", ["action", "final answer", "no input"])
+def test_parse_react_matches_the_regex_parser_on_long_completions(kind):
+    text = synthetic(kind, 10000)
+    assert outcome(parse_react, text) == outcome(legacy_parse, text)
+
+
+def single_action(text: str):
+    result = parse_react_actions(text)
+    if isinstance(result, list):
+        assert len(result) == 1
+        return result[0]
+    return result
+
+
+def test_parse_react_actions_parses_one_pair_like_parse_react():
+    for text in random_completions(5000, seed=11):
+        if text.count("Input") < 2:
+            assert outcome(single_action, text) == outcome(parse_react, text), text
+
+
+def test_parse_react_actions_splits_several_pairs():
+    text = (
+        "I need two facts.\nAction: validate_redshift_query\nAction Input: SELECT 1\n"
+        "Action: run_redshift_query\nAction Input: SELECT 2"
+    )
+    first, second = parse_react_actions(text)
+    assert (first.tool, first.tool_input) == ("validate_redshift_query", "SELECT 1")
+    assert (second.tool, second.tool_input) == ("run_redshift_query", "SELECT 2")
+    assert first.log + "\n" + second.log == text
+
+
+def test_parse_react_actions_rejects_pairs_with_a_final_answer():
+    with pytest.raises(OutputParserException):
+        parse_react_actions("Action: a\nAction Input: 1\nAction: b\nAction Input: 2\nFinal Answer: 3")
+
+
+def test_multi_action_parser_strips_quotes():
+    actions = ReActMultiActionOutputParser().parse('Action: run_redshift_query\nAction Input: "SELECT 1"')
+    assert actions[0].tool_input == "SELECT 1"
+    assert isinstance(ReActMultiActionOutputParser().parse("Final Answer: 42"), AgentFinish)
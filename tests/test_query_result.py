@@ -0,0 +1,14 @@
+import pytest
+
+from tools.query_result import ParquetSpool
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+def test_repeated_column_names_keep_every_column(tmp_path):
+    spool = ParquetSpool(tmp_path, ["id", "id", "id_2", "name"])
+    spool.write([(1, 2, 3, "a"), (4, 5, 6, None)])
+    spool.close()
+    table = pq.read_table(spool.path)
+    assert table.column_names == ["id", "id_2", "id_2_2", "name"]
+    assert table.to_pydict() == {"id": [1, 4], "id_2": [2, 5], "id_2_2": [3, 6], "name": ["a", None]}
@@ -0,0 +1,27 @@
+from tools.sql_helper import add_primary_key_column, meaningful_text_from_metadata, metadata_to_text
+
+
+def metadata(primary_key: dict) -> dict:
+    return {
+        "schema_name": "railways_mart",
+        "table_name": "order_totals",
+        "table_description": "sums the orders",
+        "primary_key": primary_key,
+        "foreign_keys": [],
+        "columns": [{"column_name": "order_id", "column_description": "", "column_type": "int4"}],
+    }
+
+
+def test_tables_without_a_primary_key_render():
+    text = metadata_to_text(metadata({}))
+    assert "primary key" not in text
+    assert "- Column name: order_id" in text
+    assert meaningful_text_from_metadata(metadata({}), assumption_summary="").metadata["primary_key"] == ""
+
+
+def test_composite_primary_key_keeps_every_column():
+    primary_key = {}
+    add_primary_key_column(primary_key, "order_id", "order_lines_pkey")
+    add_primary_key_column(primary_key, "line_no", "order_lines_pkey")
+    assert primary_key == {"primary_key_column": "order_id, line_no", "primary_key_name": "order_lines_pkey"}
+    assert "column name `order_id, line_no`" in metadata_to_text(metadata(primary_key))
@@ -0,0 +1,24 @@
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from tools.vector_store import LocalVectorStore
+
+
+def test_reader_reloads_after_another_process_saves(tmp_path):
+    embeddings = DeterministicFakeEmbedding(size=16)
+    LocalVectorStore(embeddings, path=tmp_path).add_texts(["Table `sales`"], ids=["sales"])
+    reader = LocalVectorStore(embeddings, path=tmp_path)
+    assert [doc.page_content for doc in reader.similarity_search("sales", k=5)] == ["Table `sales`"]
+
+    writer = LocalVectorStore(embeddings, path=tmp_path)
+    writer.add_texts(["Table `route`"], ids=["route"])
+    writer.delete(ids=["sales"])
+    assert [doc.page_content for doc in reader.similarity_search("route", k=5)] == ["Table `route`"]
+
+
+def test_load_keeps_the_old_index_while_a_save_is_half_swapped(tmp_path):
+    embeddings = DeterministicFakeEmbedding(size=16)
+    store = LocalVectorStore(embeddings, path=tmp_path)
+    store.add_texts(["Table `sales`", "Table `route`"], ids=["sales", "route"])
+    reader = LocalVectorStore(embeddings, path=tmp_path)
+    (tmp_path / "documents.json").write_text('[{"id": "sales", "page_content": "Table `sales`", "metadata": {}}]')
+    assert len(reader.similarity_search("sales", k=5)) == 2
@@ -0,0 +1,200 @@
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from tools.config import config
+
+current_dir = Path(__file__).resolve().parent
+
+
+_LITERAL = re.compile(r"'([^']*)'|\"([^\"]*)\"|(\d+(?:[.,]\d+)*)")
+_WORD = re.compile(r"\w+")
+# Question phrasing that does not change what is asked
+_STOPWORDS = frozenset("""
+a an the of in on at to for from by with and or is are was were be been do does did
+what which who whom whose how show me give list tell find get please i we you my our
+can could would should there that this these those it its all
+""".split())
+
+
+def normalize_question(question: str) -> str:
+    return re.sub(r"\s+", " ", question).strip().lower().rstrip("?.! ")
+
+
+def question_literals(question: str) -> tuple:
+    """The numbers and quoted values in a question, which near-duplicates must share to reuse an answer."""
+    return tuple(sorted("".join(groups).lower() for groups in _LITERAL.findall(question)))
+
+
+def question_words(question: str) -> frozenset:
+    """The content words of a question, stopwords dropped and plurals folded, which near-duplicates must share."""
+    words = (word for word in _WORD.findall(question.lower()) if word not in _STOPWORDS)
+    return frozenset(word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word for word in words)
+
+
+class SemanticAnswerCache:
+    """Cache of final answers matched by exact question text or by embedding similarity.
+
+    A similar question only matches when it has the same numbers and quoted values, so
+    "top 5 routes in 2023" never gets the answer of "top 10 routes in 2024", and the same
+    content words, so "bottom 3 sellers" never gets the answer of "top 3 sellers" however
+    close their embeddings are.
+    Entries expire after `ttl_seconds` and can be invalidated by the tables their SQL read.
+    The embedding matrix is kept in memory and reloaded only when the SQLite file changes,
+    so the crawl process can invalidate entries used by the app.
+    """
+
+    def __init__(self, path: Path, embeddings: Optional[Embeddings] = None, threshold: float = 0.95, ttl_seconds: float = 86400):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(path), check_same_thread=False)
+        self.connection.executescript("""
+        PRAGMA journal_mode=WAL;
+        CREATE TABLE IF NOT EXISTS answers (
+            id INTEGER PRIMARY KEY,
+            question TEXT,
+            normalized_question TEXT,
+            embedding BLOB,
+            answer TEXT,
+            sql TEXT,
+            created_at REAL
+        );
+        CREATE INDEX IF NOT EXISTS answers_normalized_question ON answers (normalized_question);
+        CREATE TABLE IF NOT EXISTS answer_tables (answer_id INTEGER, table_name TEXT);
+        CREATE INDEX IF NOT EXISTS answer_tables_table_name ON answer_tables (table_name);
+        """)
+        self.connection.commit()
+        self._version = None
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._created_at = np.zeros(0)
+        self._literals: List[tuple] = []
+        self._words: List[frozenset] = []
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+
+    def _refresh(self):
+        # data_version only changes for commits made by other connections,
+        # our own writes reset _version explicitly
+        version = self.connection.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._version:
+            return
+        rows = self.connection.execute(
+            "SELECT id, created_at, embedding, question FROM answers WHERE embedding IS NOT NULL AND created_at > ?",
+            (time.time() - self.ttl_seconds,)
+        ).fetchall()
+        self._ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self._created_at = np.array([row[1] for row in rows])
+        self._literals = [question_literals(row[3]) for row in rows]
+        self._words = [question_words(row[3]) for row in rows]
+        self._matrix = np.vstack([np.frombuffer(row[2], dtype=np.float32) for row in rows]) if rows else np.zeros((0, 0), dtype=np.float32)
+        self._version = version
+
+    def _row(self, answer_id: int, similarity: float) -> dict:
+        row = self.connection.execute("SELECT question, answer, sql FROM answers WHERE id = ?", (answer_id,)).fetchone()
+        return {"question": row[0], "answer": row[1], "sql": row[2], "similarity": similarity}
+
+    def _embed(self, question: str) -> np.ndarray:
+        vector = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, question: str) -> Optional[dict]:
+        """Return {"question", "answer", "sql", "similarity"} of the best fresh match, or None."""
+        now = time.time()
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT id FROM answers WHERE normalized_question = ? AND created_at > ? ORDER BY created_at DESC LIMIT 1",
+                (normalize_question(question), now - self.ttl_seconds)
+            ).fetchone()
+            if row is not None:
+                self.hits += 1
+                return self._row(row[0], 1.0)
+        if self.embeddings is None:
+            with self.lock:
+                self.misses += 1
+            return None
+
+        vector = self._embed(question)
+        with self.lock:
+            self._refresh()
+            if len(self._ids):
+                scores = self._matrix @ vector
+                scores[self._created_at <= now - self.ttl_seconds] = -1.0
+                literals, words = question_literals(question), question_words(question)
+                candidates = np.flatnonzero(scores >= self.threshold)
+                for best in candidates[np.argsort(-scores[candidates])]:
+                    if self._literals[best] == literals and self._words[best] == words:
+                        self.hits += 1
+                        return self._row(int(self._ids[best]), float(scores[best]))
+            self.misses += 1
+            return None
+
+    def store(self, question: str, answer: str, sql: Optional[str], tables: List[str]):
+        embedding = self._embed(question).tobytes() if self.embeddings is not None else None
+        with self.lock:
+            cursor = self.connection.execute(
+                "INSERT INTO answers (question, normalized_question, embedding, answer, sql, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (question, normalize_question(question), embedding, answer, sql, time.time())
+            )
+            self.connection.executemany(
+                "INSERT INTO answer_tables (answer_id, table_name) VALUES (?, ?)",
+                [(cursor.lastrowid, table.lower()) for table in tables]
+            )
+            self.connection.commit()
+            self._version = None
+
+    def _delete(self, answer_ids: List[int]) -> int:
+        self.connection.executemany("DELETE FROM answers WHERE id = ?", [(i,) for i in answer_ids])
+        self.connection.executemany("DELETE FROM answer_tables WHERE answer_id = ?", [(i,) for i in answer_ids])
+        self.connection.commit()
+        self._version = None
+        return len(answer_ids)
+
+    def invalidate_tables(self, tables: List[str]) -> int:
+        """Drop every answer whose SQL read one of `tables` ("schema.table", also matched unqualified)."""
+        names = set()
+        for table in tables:
+            names.add(table.lower())
+            names.add(table.lower().split(".")[-1])
+        if not names:
+            return 0
+        with self.lock:
+            placeholders = ", ".join("?" for _ in names)
+            rows = self.connection.execute(
+                f"SELECT DISTINCT answer_id FROM answer_tables WHERE table_name IN ({placeholders})",
+                list(names)
+            ).fetchall()
+            return self._delete([row[0] for row in rows])
+
+    def purge_expired(self) -> int:
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT id FROM answers WHERE created_at <= ?", (time.time() - self.ttl_seconds,)
+            ).fetchall()
+            return self._delete([row[0] for row in rows])
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_ratio": self.hits / lookups if lookups else 0.0}
+
+
+def get_answer_cache(embeddings: Optional[Embeddings] = None) -> Optional[SemanticAnswerCache]:
+    """Answer cache configured from secrets, or None when ANSWER_CACHE_ENABLED is false."""
+    if not config.get("ANSWER_CACHE_ENABLED", True):
+        return None
+    return SemanticAnswerCache(
+        current_dir.parent / config.get("ANSWER_CACHE_PATH", ".askdb/answer_cache.sqlite"),
+        embeddings=embeddings,
+        threshold=float(config.get("ANSWER_CACHE_THRESHOLD", 0.95)),
+        ttl_seconds=float(config.get("ANSWER_CACHE_TTL_SECONDS", 86400))
+    )
@@ -0,0 +1,177 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Any, List, Optional, Sequence
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.embeddings import Embeddings
+from langchain_core.load import dumps, loads
+from tools.config import config
+
+current_dir = Path(__file__).resolve().parent
+
+
+def make_key(*parts: Any) -> str:
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SQLiteCache:
+    """Size-bounded LRU key/value store persisted in a single SQLite file, safe to share across threads."""
+
+    def __init__(self, path: Path, max_entries: Optional[int] = None, max_bytes: Optional[int] = None):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        if str(path) != ":memory:":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(path), check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB, size INTEGER, accessed_at REAL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)")
+        self.connection.commit()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self.lock:
+            row = self.connection.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.connection.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self.connection.commit()
+            return row[0]
+
+    def set(self, key: str, value: bytes):
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, len(value), time.time())
+            )
+            self._evict()
+            self.connection.commit()
+
+    def delete(self, key: str):
+        with self.lock:
+            self.connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self.connection.commit()
+
+    def _evict(self):
+        if self.max_entries is not None:
+            self.connection.execute(
+                "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+        if self.max_bytes is not None:
+            total = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total > self.max_bytes:
+                rows = self.connection.execute("SELECT key, size FROM entries ORDER BY accessed_at").fetchall()
+                evicted = []
+                for key, size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    evicted.append((key,))
+                    total -= size
+                self.connection.executemany("DELETE FROM entries WHERE key = ?", evicted)
+
+    def clear(self):
+        with self.lock:
+            self.connection.execute("DELETE FROM entries")
+            self.connection.commit()
+
+    def stats(self) -> dict:
+        with self.lock:
+            entries, size = self.connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": size
+        }
+
+
+class SQLiteLLMCache(BaseCache):
+    """LangChain LLM cache keyed by (model parameters, rendered prompt) on top of `SQLiteCache`."""
+
+    def __init__(self, store: SQLiteCache):
+        self.store = store
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        value = self.store.get(make_key("llm", llm_string, prompt))
+        if value is None:
+            return None
+        return loads(value.decode("utf-8"))
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        self.store.set(make_key("llm", llm_string, prompt), dumps(list(return_val)).encode("utf-8"))
+
+    def clear(self, **kwargs: Any) -> None:
+        self.store.clear()
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that looks every text up in `SQLiteCache` before calling the model."""
+
+    def __init__(self, embeddings: Embeddings, store: SQLiteCache, model: Optional[str] = None):
+        self.embeddings = embeddings
+        self.store = store
+        self.model = model or getattr(embeddings, "model", type(embeddings).__name__)
+
+    def _get(self, text: str) -> Optional[List[float]]:
+        value = self.store.get(make_key("embedding", self.model, text))
+        return array("d", value).tolist() if value is not None else None
+
+    def _set(self, text: str, vector: Sequence[float]):
+        self.store.set(make_key("embedding", self.model, text), array("d", vector).tobytes())
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = [self._get(text) for text in texts]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            computed = self.embeddings.embed_documents([texts[i] for i in missing])
+            for i, vector in zip(missing, computed):
+                self._set(texts[i], vector)
+                vectors[i] = vector
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = self._get(text)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self._set(text, vector)
+        return vector
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache() -> SQLiteCache:
+    global _cache
+    with _cache_lock:
+        if _cache is not None:
+            return _cache
+        max_entries = int(config.get("CACHE_MAX_ENTRIES", 100000)) or None
+        max_bytes = int(config.get("CACHE_MAX_BYTES", 512 * 1024 * 1024)) or None
+        _cache = SQLiteCache(
+            current_dir.parent / config.get("CACHE_PATH", ".askdb/cache.sqlite"),
+            max_entries=max_entries,
+            max_bytes=max_bytes
+        )
+        return _cache
+
+def get_llm_cache() -> SQLiteLLMCache:
+    return SQLiteLLMCache(get_cache())
+
+def cached_embeddings(embeddings: Embeddings) -> CachedEmbeddings:
+    return CachedEmbeddings(embeddings, get_cache())
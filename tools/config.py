@@ -0,0 +1,82 @@
+import os
+import threading
+import tomllib
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+current_dir = Path(__file__).resolve().parent
+
+
+def _parse_env(value: str) -> Any:
+    """An environment variable as the TOML value it spells, e.g. "false" or "50", else the string itself."""
+    try:
+        return tomllib.loads(f"value = {value}")["value"]
+    except tomllib.TOMLDecodeError:
+        return value
+
+
+class Config:
+    """Settings read like `streamlit.secrets`, without importing Streamlit.
+
+    Values come from the same secrets files Streamlit reads, `~/.streamlit/secrets.toml` then
+    the project's `.streamlit/secrets.toml`, plus the file named by ASKDB_CONFIG if set.
+    Environment variables, including those in `.env`, override the files. Nothing is read
+    until the first lookup. `set` overrides a value in this process, e.g. in benchmarks.
+    """
+
+    def __init__(self, files: Optional[List[Path]] = None, dotenv_path: Optional[Path] = None):
+        self.files = files if files is not None else [
+            Path.home() / ".streamlit" / "secrets.toml",
+            current_dir.parent / ".streamlit" / "secrets.toml",
+            Path.cwd() / ".streamlit" / "secrets.toml",
+        ]
+        self.dotenv_path = dotenv_path or current_dir.parent / ".env"
+        self.overrides: Dict[str, Any] = {}
+        self._values: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Any]:
+        with self._lock:
+            if self._values is None:
+                from dotenv import load_dotenv
+
+                load_dotenv(self.dotenv_path)
+                values, seen = {}, set()
+                extra = [Path(os.environ["ASKDB_CONFIG"])] if os.environ.get("ASKDB_CONFIG") else []
+                for path in self.files + extra:
+                    path = path.resolve()
+                    if path in seen or not path.is_file():
+                        continue
+                    seen.add(path)
+                    with open(path, "rb") as f:
+                        values.update(tomllib.load(f))
+                self._values = values
+            return self._values
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self.overrides:
+            return self.overrides[key]
+        values = self._values if self._values is not None else self._load()
+        if key in os.environ:
+            return _parse_env(os.environ[key])
+        return values.get(key, default)
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key, KeyError)
+        if value is KeyError:
+            raise KeyError(f"'{key}' is not configured, set it in .streamlit/secrets.toml or as an environment variable")
+        return value
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, KeyError) is not KeyError
+
+    def set(self, key: str, value: Any):
+        self.overrides[key] = value
+
+    def reload(self):
+        """Read the files again on the next lookup."""
+        with self._lock:
+            self._values = None
+
+
+config = Config()
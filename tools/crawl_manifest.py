@@ -0,0 +1,50 @@
+import hashlib
+import json
+from pathlib import Path
+from typing import List, Tuple
+
+
+def fingerprint(metadata: dict) -> str:
+    """Stable hash of the raw table metadata (columns, types, comments and keys)."""
+    payload = json.dumps(metadata, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def document_id(metadata: dict) -> str:
+    return f"{metadata['schema_name']}.{metadata['table_name']}"
+
+
+class CrawlManifest:
+    """Local record of the fingerprint of every table document stored in the vector index."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.documents = {}
+        if self.path.exists():
+            self.documents = json.loads(self.path.read_text()).get("documents", {})
+
+    def diff(self, metadatas: List[dict]) -> Tuple[List[dict], List[str], List[str]]:
+        """Split a crawl into (changed or new tables, unchanged document ids, dropped document ids)."""
+        changed, unchanged, seen = [], [], set()
+        for metadata in metadatas:
+            doc_id = document_id(metadata)
+            seen.add(doc_id)
+            if self.documents.get(doc_id, {}).get("fingerprint") == fingerprint(metadata):
+                unchanged.append(doc_id)
+            else:
+                changed.append(metadata)
+        dropped = [doc_id for doc_id in self.documents if doc_id not in seen]
+        return changed, unchanged, dropped
+
+    def update(self, metadata: dict):
+        self.documents[document_id(metadata)] = {"fingerprint": fingerprint(metadata)}
+
+    def remove(self, doc_id: str):
+        self.documents.pop(doc_id, None)
+
+    def clear(self):
+        self.documents = {}
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps({"documents": self.documents}, indent=2, sort_keys=True))
@@ -0,0 +1,142 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+import sqlalchemy as sa
+from sqlalchemy.engine import Connection, Engine
+from tools.config import config
+
+_engine = None
+_engine_lock = threading.Lock()
+_metrics_lock = threading.Lock()
+_metrics = {
+    "checkouts": 0,
+    "waits": 0,
+    "wait_seconds": 0.0,
+    "max_wait_seconds": 0.0,
+    "timeouts": 0,
+}
+
+
+def _statement_timeout_ms() -> int:
+    return int(config.get("DB_STATEMENT_TIMEOUT_MS", 300000))
+
+
+def create_engine(dsn: str) -> Engine:
+    """Create the pooled engine with the DB_* pool, timeout and tagging settings."""
+    statement_timeout_ms = _statement_timeout_ms()
+    query_group = config.get("DB_QUERY_GROUP", "")
+    engine = sa.create_engine(
+        dsn,
+        pool_size=int(config.get("DB_POOL_SIZE", 5)),
+        max_overflow=int(config.get("DB_MAX_OVERFLOW", 10)),
+        pool_timeout=float(config.get("DB_POOL_TIMEOUT", 30)),
+        pool_recycle=int(config.get("DB_POOL_RECYCLE", 1800)),
+        pool_pre_ping=True,
+        connect_args={"application_name": config.get("DB_APPLICATION_NAME", "askdbcloud")},
+    )
+
+    @sa.event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if statement_timeout_ms:
+            cursor.execute(f"SET statement_timeout TO {statement_timeout_ms}")
+        if query_group:
+            # Redshift tags every query of the session with the query group for WLM and STL_QUERY
+            cursor.execute("SET query_group TO %s", (query_group,))
+        cursor.close()
+        # Commit so the session settings survive the rollback done when the connection is returned
+        dbapi_connection.commit()
+
+    return engine
+
+
+def get_engine() -> Engine:
+    """The single process-wide engine shared by every module that talks to Redshift."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = create_engine(config["REDSHIFT_DSN"])
+        return _engine
+
+
+def set_engine(engine: Engine):
+    """Replace the shared engine, e.g. with a local Postgres in benchmarks."""
+    global _engine
+    with _engine_lock:
+        _engine = engine
+
+
+def pool_saturated(engine: Optional[Engine] = None) -> bool:
+    """Whether every connection the engine's pool may open, its size plus its overflow, is checked out.
+
+    A pool without an overflow limit (a negative max_overflow) never is.
+    """
+    pool = (engine or get_engine()).pool
+    if not isinstance(pool, sa.pool.QueuePool) or pool._max_overflow < 0:
+        return False
+    return pool.checkedout() >= pool.size() + pool._max_overflow
+
+
+def _execute_committed(connection: Connection, statement: str):
+    """Run `statement` in a transaction of its own and commit it, on SQLAlchemy 1.4 and 2.x connections."""
+    transaction = connection.get_transaction()
+    if transaction is not None:
+        transaction.rollback()
+    with connection.begin():
+        connection.execute(sa.text(statement))
+
+
+@contextmanager
+def connect(statement_timeout_ms: Optional[int] = None, query_tag: Optional[str] = None):
+    """Check a connection out of the shared pool, recording how long the checkout waited.
+
+    `statement_timeout_ms` and `query_tag` override the session defaults for this use only.
+    """
+    engine = get_engine()
+    saturated = pool_saturated(engine)
+    start = time.perf_counter()
+    try:
+        connection = engine.connect()
+    except sa.exc.TimeoutError:
+        with _metrics_lock:
+            _metrics["timeouts"] += 1
+        raise
+    waited = time.perf_counter() - start
+    with _metrics_lock:
+        _metrics["checkouts"] += 1
+        _metrics["waits"] += int(saturated)
+        _metrics["wait_seconds"] += waited
+        _metrics["max_wait_seconds"] = max(_metrics["max_wait_seconds"], waited)
+
+    try:
+        if statement_timeout_ms is not None:
+            connection.execute(sa.text(f"SET statement_timeout TO {int(statement_timeout_ms)}"))
+        if query_tag is not None:
+            connection.execute(sa.text("SET query_group TO :tag"), {"tag": query_tag})
+        yield connection
+    finally:
+        try:
+            if statement_timeout_ms is not None:
+                _execute_committed(connection, f"SET statement_timeout TO {_statement_timeout_ms()}")
+            if query_tag is not None:
+                _execute_committed(connection, "RESET query_group")
+        finally:
+            connection.close()
+
+
+def pool_metrics() -> dict:
+    """Current pool occupancy plus cumulative checkout and wait counters."""
+    pool = get_engine().pool
+    with _metrics_lock:
+        metrics = dict(_metrics)
+    metrics["average_wait_seconds"] = metrics["wait_seconds"] / metrics["checkouts"] if metrics["checkouts"] else 0.0
+    if isinstance(pool, sa.pool.QueuePool):
+        metrics.update({
+            "pool_size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+        })
+    return metrics
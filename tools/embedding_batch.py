@@ -0,0 +1,82 @@
+import threading
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+
+class _Request:
+    __slots__ = ("text", "vector", "error", "lead", "done")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.vector: Optional[List[float]] = None
+        self.error: Optional[BaseException] = None
+        self.lead = False
+        self.done = threading.Event()
+
+
+class BatchingEmbeddings(Embeddings):
+    """Embeddings wrapper that sends concurrent `embed_query` calls to the model as one `embed_documents` call.
+
+    Up to `max_in_flight` requests go to the model at once, so light traffic waits for nothing.
+    Queries arriving while they are all out queue up, and the next request to finish hands the queue,
+    at most `max_batch` texts, to the first queued caller's thread to send as one batch.
+    """
+
+    def __init__(self, embeddings: Embeddings, max_batch: int = 64, max_in_flight: int = 4):
+        self.embeddings = embeddings
+        # Cache keys are per model, so a wrapped model shares its cached vectors
+        self.model = getattr(embeddings, "model", type(embeddings).__name__)
+        self.max_batch = max_batch
+        self.max_in_flight = max_in_flight
+        self.batches = 0
+        self.texts = 0
+        self._pending: List[_Request] = []
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        request = _Request(text)
+        with self._lock:
+            lead = self._in_flight < self.max_in_flight
+            if lead:
+                self._in_flight += 1
+            else:
+                self._pending.append(request)
+        if not lead:
+            request.done.wait()
+            lead = request.lead
+        if lead:
+            self._send(request)
+        if request.error is not None:
+            raise request.error
+        return request.vector
+
+    def _send(self, request: _Request):
+        with self._lock:
+            batch = [request] + self._pending[:self.max_batch - 1]
+            del self._pending[:self.max_batch - 1]
+        texts = list(dict.fromkeys(queued.text for queued in batch))
+        vectors, error = None, None
+        try:
+            vectors = dict(zip(texts, self.embeddings.embed_documents(texts)))
+        except Exception as e:
+            error = e
+        with self._lock:
+            self.batches += 1
+            self.texts += len(texts)
+            if self._pending:
+                # Hand the queue to the first caller waiting in it
+                following = self._pending.pop(0)
+                following.lead = True
+                following.done.set()
+            else:
+                self._in_flight -= 1
+        for queued in batch:
+            if vectors is not None:
+                queued.vector = vectors[queued.text]
+            queued.error = error
+            queued.done.set()
@@ -0,0 +1,160 @@
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+from tools.config import config
+
+current_dir = Path(__file__).resolve().parent
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9_]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased words; identifiers like `seller_id` are kept whole and also split into their parts."""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(token)
+        parts = [part for part in token.split("_") if part]
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+def document_key(doc: Document) -> str:
+    """Identify a table document by "schema.table" (a column document by "schema.table.column"), falling back to its text."""
+    if "schema_name" in doc.metadata and "table_name" in doc.metadata:
+        key = f"{doc.metadata['schema_name']}.{doc.metadata['table_name']}"
+        return f"{key}.{doc.metadata['column_name']}" if "column_name" in doc.metadata else key
+    return doc.page_content
+
+
+class BM25Index:
+    """Okapi BM25 inverted index over the table documents, persisted as one JSON file.
+
+    Each document is indexed on its text plus its column names (`metadata["columns"]`),
+    which are repeated `column_boost` times so questions naming a column find its table.
+    The file is reloaded when the crawl process rewrites it.
+    """
+
+    def __init__(self, path: Optional[Path] = None, k1: float = 1.5, b: float = 0.75, column_boost: int = 3):
+        self.path = Path(path) if path is not None else None
+        self.k1 = k1
+        self.b = b
+        self.column_boost = column_boost
+        self.documents: Dict[str, Document] = {}
+        self.term_counts: Dict[str, Dict[str, int]] = {}
+        self._postings: Optional[Dict[str, List[Tuple[str, int]]]] = None
+        self._mtime = None
+        self.lock = threading.Lock()
+        if self.path is not None and self.path.exists():
+            self.load()
+
+    def load(self):
+        self._mtime = self.path.stat().st_mtime
+        stored = json.loads(self.path.read_text())
+        self.documents = {
+            item["id"]: Document(page_content=item["page_content"], metadata=item["metadata"]) for item in stored
+        }
+        self.term_counts = {item["id"]: item["term_counts"] for item in stored}
+        self._postings = None
+
+    def save(self):
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        stored = [
+            {"id": doc_id, "page_content": doc.page_content, "metadata": doc.metadata, "term_counts": self.term_counts[doc_id]}
+            for doc_id, doc in self.documents.items()
+        ]
+        # Write to a temporary file and swap so the app never reads a half-written index
+        (self.path.parent / f"{self.path.name}.tmp").write_text(json.dumps(stored))
+        os.replace(self.path.parent / f"{self.path.name}.tmp", self.path)
+
+    def add_documents(self, docs: List[Document], ids: Optional[List[str]] = None):
+        for doc, doc_id in zip(docs, ids or [document_key(doc) for doc in docs]):
+            text = doc.page_content + " " + " ".join(doc.metadata.get("columns", []) * self.column_boost)
+            self.documents[doc_id] = doc
+            self.term_counts[doc_id] = dict(Counter(tokenize(text)))
+        self._postings = None
+
+    def delete(self, ids: Optional[List[str]] = None, delete_all: bool = False):
+        for doc_id in list(self.documents) if delete_all else ids or []:
+            self.documents.pop(doc_id, None)
+            self.term_counts.pop(doc_id, None)
+        self._postings = None
+
+    def _build(self):
+        postings: Dict[str, List[Tuple[str, int]]] = {}
+        for doc_id, counts in self.term_counts.items():
+            for term, count in counts.items():
+                postings.setdefault(term, []).append((doc_id, count))
+        self._lengths = {doc_id: sum(counts.values()) for doc_id, counts in self.term_counts.items()}
+        self._average_length = sum(self._lengths.values()) / len(self._lengths) if self._lengths else 0.0
+        self._postings = postings
+
+    def search_with_score(self, query: str, k: int = 4) -> List[Tuple[Document, float]]:
+        with self.lock:
+            if self.path is not None and self.path.exists() and self.path.stat().st_mtime != self._mtime:
+                self.load()
+            if self._postings is None:
+                self._build()
+            documents, index, lengths, average_length = self.documents, self._postings, self._lengths, self._average_length
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            postings = index.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (len(documents) - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, count in postings:
+                norm = self.k1 * (1 - self.b + self.b * lengths[doc_id] / average_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * count * (self.k1 + 1) / (count + norm)
+        top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(documents[doc_id], score) for doc_id, score in top]
+
+    def search(self, query: str, k: int = 4) -> List[Document]:
+        return [doc for doc, _ in self.search_with_score(query, k)]
+
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], k: int = 4, rrf_k: int = 60) -> List[Document]:
+    """Merge ranked lists by summing 1 / (rrf_k + rank) per document, best first."""
+    scores: Dict[str, float] = {}
+    documents: Dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            key = document_key(doc)
+            documents.setdefault(key, doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+    top = sorted(scores, key=scores.get, reverse=True)[:k]
+    return [documents[key] for key in top]
+
+
+class HybridSearch:
+    """Retrieval fusing vector similarity with BM25 keyword matches through reciprocal rank fusion.
+
+    Exposes `similarity_search` like a vector store so the agent retrieves with one call.
+    """
+
+    def __init__(self, docsearch: VectorStore, keyword_index: BM25Index, fetch_k: int = 20, rrf_k: int = 60):
+        self.docsearch = docsearch
+        self.keyword_index = keyword_index
+        self.fetch_k = fetch_k
+        self.rrf_k = rrf_k
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs) -> List[Document]:
+        vector_results = self.docsearch.similarity_search(query, k=self.fetch_k, **kwargs)
+        keyword_results = self.keyword_index.search(query, k=self.fetch_k)
+        if not keyword_results:
+            return vector_results[:k]
+        return reciprocal_rank_fusion([vector_results, keyword_results], k=k, rrf_k=self.rrf_k)
+
+
+def get_keyword_index() -> BM25Index:
+    return BM25Index(current_dir.parent / config.get("KEYWORD_INDEX_PATH", ".askdb/keyword_index.json"))
+
@@ -0,0 +1,187 @@
+import re
+import uuid
+from pathlib import Path
+from typing import List, Optional
+
+from sqlalchemy.engine import CursorResult
+
+from tools.tracing import annotate
+
+RESULT_FILE_MARKER = "Full result saved to: "
+MAX_CELL_CHARS = 50
+SPOOL_DECIMAL_SCALE = 10
+
+
+def _format_cell(value) -> str:
+    text = "NULL" if value is None else str(value)
+    text = text.replace("\n", " ")
+    return text if len(text) <= MAX_CELL_CHARS else text[:MAX_CELL_CHARS - 3] + "..."
+
+
+# Arrow types of the Postgres and Redshift type codes in `cursor.description`
+_ARROW_TYPES = {
+    16: "bool_", 20: "int64", 21: "int64", 23: "int64", 700: "float32", 701: "float64",
+    25: "string", 1042: "string", 1043: "string", 1082: "date32",
+}
+
+
+def _unique_names(columns: List[str]) -> List[str]:
+    """`columns` with repeated names suffixed `_2`, `_3`..., e.g. for `SELECT a.id, b.id`."""
+    names, seen = [], set()
+    for column in columns:
+        name, count = column, 1
+        while name in seen:
+            count += 1
+            name = f"{column}_{count}"
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+class ParquetSpool:
+    """Writes result batches to a Parquet file as they are fetched.
+
+    Columns are typed from the DBAPI `cursor` description where the type code is known, otherwise
+    from the first batch, with all-NULL columns kept as text and decimals widened. Every batch is
+    cast to that schema. Repeated column names are made unique, Parquet needs one name per column.
+    """
+
+    def __init__(self, directory: Path, columns: List[str], cursor=None):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        self.path = directory / f"{uuid.uuid4().hex}.parquet"
+        self.columns = columns
+        self.names = _unique_names(columns)
+        self.cursor = cursor
+        self.writer = None
+        self.schema = None
+
+    def write(self, rows: list):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_arrays([pa.array([row[i] for row in rows]) for i in range(len(self.names))], names=self.names)
+        if self.writer is None:
+            # A server-side cursor only has its full description once the first rows are fetched
+            description = getattr(self.cursor, "description", None) or [None] * len(self.columns)
+            self.schema = pa.schema([
+                _spool_field(field, column) for field, column in zip(table.schema, description)
+            ])
+            self.writer = pq.ParquetWriter(str(self.path), self.schema)
+        self.writer.write_table(table.cast(self.schema))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+    def discard(self):
+        """Close and delete a file that could not be completed."""
+        try:
+            self.close()
+        finally:
+            self.writer = None
+            self.path.unlink(missing_ok=True)
+
+
+def _spool_field(field, description=None):
+    import pyarrow as pa
+
+    type_code = description[1] if description is not None else None
+    if type_code == 1700 and description[4] is not None and 0 < description[4] <= 38:
+        return pa.field(field.name, pa.decimal128(description[4], description[5]))
+    if type_code in _ARROW_TYPES:
+        return pa.field(field.name, getattr(pa, _ARROW_TYPES[type_code])())
+    if pa.types.is_null(field.type):
+        return pa.field(field.name, pa.string())
+    if pa.types.is_decimal(field.type):
+        # The scale inferred from one batch may be too small for the next one
+        return pa.field(field.name, pa.decimal128(38, max(field.type.scale, SPOOL_DECIMAL_SCALE)))
+    return field
+
+
+def prune_spool(directory: Path, max_bytes: int):
+    """Delete the oldest result files in `directory` until they take at most `max_bytes`."""
+    files = sorted(Path(directory).glob("*.parquet"), key=lambda path: path.stat().st_mtime, reverse=True)
+    total = 0
+    for path in files:
+        total += path.stat().st_size
+        if total > max_bytes:
+            path.unlink(missing_ok=True)
+
+
+def stream_result(
+    result: CursorResult,
+    max_rows: int = 50,
+    max_bytes: int = 4000,
+    spool_dir: Optional[Path] = None,
+    fetch_size: int = 1000,
+) -> str:
+    """Render a compact, truncated preview of a streamed result for the agent scratchpad.
+
+    Rows are consumed in batches of `fetch_size` (`result.partitions()`), so memory stays flat.
+    At most `max_rows` rows and `max_bytes` characters are kept for the preview.
+    When `spool_dir` is set every row is also written to a Parquet file there,
+    otherwise fetching stops as soon as the preview is full. If the file cannot be
+    written it is dropped and only the preview is returned.
+    """
+    columns = list(result.keys())
+    lines = [" | ".join(columns)]
+    preview_bytes = len(lines[0])
+    preview_rows = 0
+    total_rows = 0
+    truncated = False
+    column_types = {}
+    spool = ParquetSpool(spool_dir, columns, result.cursor) if spool_dir is not None else None
+    try:
+        for batch in result.partitions(fetch_size):
+            if spool is not None:
+                try:
+                    spool.write(batch)
+                except Exception as e:
+                    annotate(spool_error=str(e))
+                    spool.discard()
+                    spool = None
+            for row in batch:
+                total_rows += 1
+                for column, value in zip(columns, row):
+                    if value is not None and column not in column_types:
+                        column_types[column] = type(value).__name__
+                if truncated:
+                    continue
+                line = " | ".join(_format_cell(value) for value in row)
+                if preview_rows >= max_rows or preview_bytes + len(line) > max_bytes:
+                    truncated = True
+                    continue
+                lines.append(line)
+                preview_rows += 1
+                preview_bytes += len(line) + 1
+            if truncated and spool is None:
+                break
+    except BaseException:
+        # A failed or cancelled fetch leaves no partial file behind
+        if spool is not None:
+            spool.discard()
+            spool = None
+        raise
+    finally:
+        if spool is not None:
+            spool.close()
+        result.close()
+
+    annotate(rows=total_rows, preview_rows=preview_rows, truncated=truncated)
+    column_summary = ", ".join(f"{column} ({column_types.get(column, 'unknown')})" for column in columns)
+    if truncated and spool is None:
+        row_summary = f"Rows: more than {preview_rows} (showing first {preview_rows})"
+    elif truncated:
+        row_summary = f"Rows: {total_rows} (showing first {preview_rows})"
+    else:
+        row_summary = f"Rows: {total_rows}"
+    output = [f"Columns: {column_summary}", row_summary, *lines]
+    if spool is not None and spool.writer is not None:
+        output.append(f"{RESULT_FILE_MARKER}{spool.path}")
+    return "\n".join(output)
+
+
+def result_file_from_observation(observation: str) -> Optional[str]:
+    match = re.search(re.escape(RESULT_FILE_MARKER) + r"(.+)$", observation, re.MULTILINE)
+    return match.group(1) if match else None
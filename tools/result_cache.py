@@ -0,0 +1,206 @@
+import argparse
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import sqlglot
+from tools.config import config
+
+from tools.cache import SQLiteCache, make_key
+from tools.query_result import result_file_from_observation
+from tools.sql_parse import DIALECT, extract_tables
+
+current_dir = Path(__file__).resolve().parent
+
+# Results of queries calling these functions change on every run and are never cached
+VOLATILE_FUNCTIONS = re.compile(r"\b(getdate|sysdate|now|random|current_date|current_time|current_timestamp|timeofday)\b", re.IGNORECASE)
+
+
+def normalize_sql(sql: str) -> str:
+    """Canonical form of a query so formatting and keyword case do not change its cache key."""
+    sql = sql.strip().rstrip(";")
+    try:
+        return ";".join(sqlglot.transpile(sql, read=DIALECT, write=DIALECT))
+    except sqlglot.errors.ParseError:
+        return re.sub(r"\s+", " ", sql)
+
+
+def _dependencies(tables: List[str]) -> List[str]:
+    # Depend on the bare table name too, so invalidating either spelling reaches the entry
+    names = []
+    for table in tables:
+        for name in (table, table.split(".")[-1]):
+            if name not in names:
+                names.append(name)
+    return names
+
+
+class ResultCache:
+    """Cache of `run_redshift_query` observations keyed by normalized SQL.
+
+    Entries live in a byte-bounded in-memory LRU and expire after `ttl_seconds`. With `spill`,
+    entries evicted from memory move to an SQLite LRU next to the version table instead of being dropped.
+    Every entry remembers the version of each table its SQL read. `invalidate_tables` bumps those
+    versions in the SQLite file, so a data load or the crawl in another process invalidates precisely.
+    """
+
+    def __init__(self, path: Path, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: float = 600, spill: bool = False, spill_max_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.lock = threading.Lock()
+        self.memory: "OrderedDict[str, dict]" = OrderedDict()
+        self.memory_bytes = 0
+        self.metrics = {"hits": 0, "misses": 0, "disk_hits": 0, "bytes_saved": 0, "evictions": 0, "spills": 0, "invalidations": 0}
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(path), check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS table_versions (table_name TEXT PRIMARY KEY, version INTEGER)")
+        self.connection.commit()
+        self.spill_store = SQLiteCache(path, max_bytes=spill_max_bytes) if spill and str(path) != ":memory:" else None
+        self._data_version = None
+        self._versions: Dict[str, int] = {}
+
+    def _refresh_versions(self):
+        data_version = self.connection.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self._data_version:
+            self._versions = dict(self.connection.execute("SELECT table_name, version FROM table_versions").fetchall())
+            self._data_version = data_version
+
+    def _fresh(self, entry: dict) -> bool:
+        if time.time() - entry["created_at"] > self.ttl_seconds:
+            return False
+        if any(self._versions.get(table, 0) != version for table, version in entry["versions"].items()):
+            return False
+        result_file = result_file_from_observation(entry["value"])
+        return result_file is None or os.path.exists(result_file)
+
+    def _remember(self, key: str, entry: dict):
+        self.memory[key] = entry
+        self.memory_bytes += entry["size"]
+        while self.memory_bytes > self.max_bytes and self.memory:
+            evicted_key, evicted = self.memory.popitem(last=False)
+            self.memory_bytes -= evicted["size"]
+            self.metrics["evictions"] += 1
+            if self.spill_store is not None:
+                self.spill_store.set(evicted_key, json.dumps(evicted).encode("utf-8"))
+                self.metrics["spills"] += 1
+
+    def _forget(self, key: str):
+        entry = self.memory.pop(key, None)
+        if entry is not None:
+            self.memory_bytes -= entry["size"]
+
+    def get(self, sql: str) -> Optional[str]:
+        """The cached observation for `sql`, or None when missing, expired or invalidated."""
+        key = make_key("result", normalize_sql(sql))
+        with self.lock:
+            self._refresh_versions()
+            entry = self.memory.get(key)
+            if entry is not None:
+                self.memory.move_to_end(key)
+            elif self.spill_store is not None:
+                value = self.spill_store.get(key)
+                if value is not None:
+                    # Promote the entry back to memory, it is spilled again if evicted
+                    self.spill_store.delete(key)
+                    entry = json.loads(value)
+                    self.metrics["disk_hits"] += 1
+                    self._remember(key, entry)
+            if entry is None or not self._fresh(entry):
+                if entry is not None:
+                    self._forget(key)
+                self.metrics["misses"] += 1
+                return None
+            self.metrics["hits"] += 1
+            self.metrics["bytes_saved"] += entry["size"]
+            return entry["value"]
+
+    def set(self, sql: str, value: str):
+        """Cache the observation of a successful query unless it is volatile or its tables are unknown."""
+        if VOLATILE_FUNCTIONS.search(sql):
+            return
+        tables = extract_tables(sql)
+        if not tables:
+            return
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        key = make_key("result", normalize_sql(sql))
+        with self.lock:
+            self._refresh_versions()
+            self._forget(key)
+            self._remember(key, {
+                "value": value,
+                "versions": {table: self._versions.get(table, 0) for table in _dependencies(tables)},
+                "created_at": time.time(),
+                "size": size,
+            })
+
+    def invalidate_tables(self, tables: List[str]):
+        """Invalidate every cached result that read one of `tables` ("schema.table" or bare names)."""
+        names = _dependencies([table.lower() for table in tables])
+        if not names:
+            return
+        with self.lock:
+            self.connection.executemany(
+                "INSERT INTO table_versions (table_name, version) VALUES (?, 1) "
+                "ON CONFLICT (table_name) DO UPDATE SET version = version + 1",
+                [(name,) for name in names]
+            )
+            self.connection.commit()
+            self._data_version = None
+            self.metrics["invalidations"] += len(names)
+
+    def stats(self) -> dict:
+        with self.lock:
+            metrics = dict(self.metrics)
+            metrics.update({"entries": len(self.memory), "bytes": self.memory_bytes})
+        lookups = metrics["hits"] + metrics["misses"]
+        metrics["hit_ratio"] = metrics["hits"] / lookups if lookups else 0.0
+        if self.spill_store is not None:
+            spilled = self.spill_store.stats()
+            metrics.update({"spilled_entries": spilled["entries"], "spilled_bytes": spilled["bytes"]})
+        return metrics
+
+
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+def get_result_cache() -> Optional[ResultCache]:
+    """Process-wide result cache configured from secrets, or None when RESULT_CACHE_ENABLED is false."""
+    global _result_cache
+    if not config.get("RESULT_CACHE_ENABLED", True):
+        return None
+    with _result_cache_lock:
+        if _result_cache is None:
+            _result_cache = ResultCache(
+                current_dir.parent / config.get("RESULT_CACHE_PATH", ".askdb/result_cache.sqlite"),
+                max_bytes=int(config.get("RESULT_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+                ttl_seconds=float(config.get("RESULT_CACHE_TTL_SECONDS", 600)),
+                spill=bool(config.get("RESULT_CACHE_SPILL", False)),
+                spill_max_bytes=int(config.get("RESULT_CACHE_SPILL_MAX_BYTES", 512 * 1024 * 1024)) or None
+            )
+        return _result_cache
+
+def set_result_cache(result_cache: ResultCache):
+    """Replace the shared result cache, e.g. with a throwaway one in benchmarks."""
+    global _result_cache
+    with _result_cache_lock:
+        _result_cache = result_cache
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Invalidate cached query results, e.g. after a data load.")
+    arg_parser.add_argument("tables", nargs="+", help="tables to invalidate, as schema.table or table")
+    args = arg_parser.parse_args()
+    result_cache = get_result_cache()
+    if result_cache is not None:
+        result_cache.invalidate_tables(args.tables)
+        print(f"Invalidated cached results reading {', '.join(args.tables)}.")
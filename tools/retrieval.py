@@ -0,0 +1,45 @@
+from typing import Any, List, Optional, Protocol
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from tools.config import config
+
+from tools.keyword_index import HybridSearch, get_keyword_index
+from tools.schema_catalog import get_schema_catalog
+from tools.schema_context import SchemaContextRetriever, get_column_index
+
+
+class Retriever(Protocol):
+    """Anything the agent can retrieve its context from: a vector store, HybridSearch or SchemaContextRetriever."""
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        ...
+
+
+def get_retriever(docsearch: VectorStore, embeddings: Optional[Embeddings] = None) -> Retriever:
+    """The retriever selected by RETRIEVAL_MODE.
+
+    "table" searches the table documents, fusing BM25 with the vector store unless HYBRID_SEARCH_ENABLED is false.
+    "column" searches the column index and returns a compact schema context expanded along foreign keys.
+    """
+    mode = config.get("RETRIEVAL_MODE", "table")
+    if mode == "column":
+        return SchemaContextRetriever(
+            get_column_index(embeddings),
+            get_schema_catalog(),
+            columns_k=int(config.get("COLUMN_CONTEXT_COLUMNS_K", 40)),
+            max_columns_per_table=int(config.get("COLUMN_CONTEXT_MAX_COLUMNS_PER_TABLE", 12)),
+            expand_hops=int(config.get("COLUMN_CONTEXT_EXPAND_HOPS", 1)),
+            max_join_partners=int(config.get("COLUMN_CONTEXT_MAX_JOIN_PARTNERS", 5))
+        )
+    if mode != "table":
+        raise ValueError(f"Unknown RETRIEVAL_MODE '{mode}', expected 'table' or 'column'.")
+    if not config.get("HYBRID_SEARCH_ENABLED", True):
+        return docsearch
+    return HybridSearch(
+        docsearch,
+        get_keyword_index(),
+        fetch_k=int(config.get("HYBRID_SEARCH_FETCH_K", 20)),
+        rrf_k=int(config.get("HYBRID_SEARCH_RRF_K", 60))
+    )
@@ -0,0 +1,312 @@
+import os
+import pickle
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from tools.config import config
+
+current_dir = Path(__file__).resolve().parent
+
+
+def table_id(schema_name: str, table_name: str) -> str:
+    return f"{schema_name}.{table_name}"
+
+
+class Column:
+    __slots__ = ("name", "type", "description")
+
+    def __init__(self, name: str, type: str, description: str = ""):
+        self.name = name
+        self.type = type
+        self.description = description
+
+
+class ForeignKey:
+    __slots__ = ("name", "column", "reference_table", "reference_column")
+
+    def __init__(self, name: str, column: str, reference_table: str, reference_column: str):
+        self.name = name
+        self.column = column
+        self.reference_table = reference_table
+        self.reference_column = reference_column
+
+
+class Table:
+    """A crawled table. Columns are pickled as plain tuples and turned into `Column`s on first use,
+    so loading a catalog of wide tables does not build hundreds of thousands of objects up front."""
+
+    __slots__ = ("schema_name", "name", "description", "primary_key", "foreign_keys", "crawled_at", "_column_data", "_columns", "_column_names")
+
+    def __init__(self, schema_name: str, name: str, description: str, primary_key: Optional[str], columns: List[Column], foreign_keys: List[ForeignKey], crawled_at: float):
+        self.schema_name = schema_name
+        self.name = name
+        self.description = description
+        self.primary_key = primary_key
+        self.foreign_keys = foreign_keys
+        self.crawled_at = crawled_at
+        self._column_data = tuple((column.name, column.type, column.description) for column in columns)
+        self._columns = columns
+        self._column_names = None
+
+    def __reduce__(self):
+        foreign_keys = tuple((fk.name, fk.column, fk.reference_table, fk.reference_column) for fk in self.foreign_keys)
+        state = (self.schema_name, self.name, self.description, self.primary_key, self._column_data, foreign_keys, self.crawled_at)
+        return (_restore_table, state)
+
+    @property
+    def id(self) -> str:
+        return table_id(self.schema_name, self.name)
+
+    @property
+    def columns(self) -> List[Column]:
+        if self._columns is None:
+            self._columns = [Column(*column) for column in self._column_data]
+        return self._columns
+
+    @property
+    def column_names(self) -> set:
+        """Lowercased column names, for constant-time membership checks."""
+        if self._column_names is None:
+            self._column_names = {column[0].lower() for column in self._column_data}
+        return self._column_names
+
+    @classmethod
+    def from_metadata(cls, metadata: dict, crawled_at: Optional[float] = None) -> "Table":
+        """Build from the crawl's metadata dict; foreign keys are in the `parse_foreign_key_constraint` shape."""
+        return cls(
+            metadata["schema_name"],
+            metadata["table_name"],
+            metadata["table_description"],
+            metadata["primary_key"].get("primary_key_column"),
+            [Column(column["column_name"], column["column_type"], column["column_description"]) for column in metadata["columns"]],
+            [
+                ForeignKey(
+                    foreign_key["foreign_name"],
+                    foreign_key["foreign_key"],
+                    table_id(foreign_key["reference_schema_name"], foreign_key["reference_table_name"]),
+                    foreign_key["reference_key"]
+                )
+                for foreign_key in metadata["foreign_keys"]
+            ],
+            crawled_at if crawled_at is not None else time.time()
+        )
+
+
+def _restore_table(schema_name, name, description, primary_key, column_data, foreign_keys, crawled_at) -> Table:
+    table = Table.__new__(Table)
+    table.schema_name = schema_name
+    table.name = name
+    table.description = description
+    table.primary_key = primary_key
+    table.foreign_keys = [ForeignKey(*foreign_key) for foreign_key in foreign_keys]
+    table.crawled_at = crawled_at
+    table._column_data = column_data
+    table._columns = None
+    table._column_names = None
+    return table
+
+
+class Join:
+    """One foreign-key equality, `table`.`column` = `reference_table`.`reference_column`."""
+
+    __slots__ = ("table", "column", "reference_table", "reference_column")
+
+    def __init__(self, table: str, column: str, reference_table: str, reference_column: str):
+        self.table = table
+        self.column = column
+        self.reference_table = reference_table
+        self.reference_column = reference_column
+
+    def condition(self) -> str:
+        return f"{self.table}.{self.column} = {self.reference_table}.{self.reference_column}"
+
+
+class SchemaCatalog:
+    """The crawled tables, columns, keys and foreign-key graph, persisted as one pickle file.
+
+    Saving precomputes all-pairs shortest join paths over the foreign-key graph: for every connected
+    component a matrix holds, for each (source, target) pair, the table preceding target on a
+    shortest path from source. `join_path` and `join_clause` then walk it back in O(path length).
+    `refresh` reloads the file when the crawl process rewrites it.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path is not None else None
+        self.tables: Dict[str, Table] = {}
+        self.edges: Dict[str, List[Tuple[str, Join]]] = {}
+        self.by_name: Dict[str, List[str]] = {}
+        self.components: List[List[str]] = []
+        self.predecessors: List[np.ndarray] = []
+        self.positions: Dict[str, Tuple[int, int]] = {}
+        self._mtime = None
+        self.lock = threading.Lock()
+        if self.path is not None and self.path.exists():
+            self.load()
+
+    def load(self):
+        self._mtime = self.path.stat().st_mtime
+        with open(self.path, "rb") as f:
+            state = pickle.load(f)
+        self.tables = {table.id: table for table in state["tables"]}
+        self.components = state["components"]
+        self.predecessors = state["predecessors"]
+        self._index()
+
+    def refresh(self):
+        with self.lock:
+            if self.path is not None and self.path.exists() and self.path.stat().st_mtime != self._mtime:
+                self.load()
+
+    def save(self):
+        self._build_join_paths()
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        state = {"tables": list(self.tables.values()), "components": self.components, "predecessors": self.predecessors}
+        with open(self.path.parent / f"{self.path.name}.tmp", "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(self.path.parent / f"{self.path.name}.tmp", self.path)
+
+    def _index(self):
+        edges: Dict[str, List[Tuple[str, Join]]] = {}
+        by_name: Dict[str, List[str]] = {}
+        for source, table in self.tables.items():
+            by_name.setdefault(table.name.lower(), []).append(source)
+            for foreign_key in table.foreign_keys:
+                join = Join(source, foreign_key.column, foreign_key.reference_table, foreign_key.reference_column)
+                edges.setdefault(source, []).append((foreign_key.reference_table, join))
+                edges.setdefault(foreign_key.reference_table, []).append((source, join))
+        self.edges = edges
+        self.by_name = by_name
+        self.positions = {
+            table: (component_index, position)
+            for component_index, members in enumerate(self.components)
+            for position, table in enumerate(members)
+        }
+
+    def _build_join_paths(self):
+        """Breadth-first search from every table within its connected component of the foreign-key graph."""
+        components, predecessors, seen = [], [], set()
+        for start in self.tables:
+            if start in seen:
+                continue
+            members, queue = [start], deque([start])
+            seen.add(start)
+            while queue:
+                for neighbor, _ in self.edges.get(queue.popleft(), []):
+                    if neighbor in self.tables and neighbor not in seen:
+                        seen.add(neighbor)
+                        members.append(neighbor)
+                        queue.append(neighbor)
+            if len(members) == 1:
+                continue
+            position = {table: i for i, table in enumerate(members)}
+            matrix = np.full((len(members), len(members)), -1, dtype=np.int16 if len(members) < 32767 else np.int32)
+            for source in members:
+                # Plain lists while searching, NumPy element access is slow in a Python loop
+                row = [-1] * len(members)
+                row[position[source]] = position[source]
+                queue = deque([source])
+                while queue:
+                    current = queue.popleft()
+                    for neighbor, _ in self.edges.get(current, []):
+                        if neighbor in position and row[position[neighbor]] == -1:
+                            row[position[neighbor]] = position[current]
+                            queue.append(neighbor)
+                matrix[position[source]] = row
+            components.append(members)
+            predecessors.append(matrix)
+        self.components = components
+        self.predecessors = predecessors
+        self._index()
+
+    def upsert(self, metadatas: List[dict]):
+        """Add or replace tables; join paths are unavailable until the next `save`."""
+        for metadata in metadatas:
+            table = Table.from_metadata(metadata)
+            self.tables[table.id] = table
+        self.components, self.predecessors = [], []
+        self._index()
+
+    def remove(self, table_ids: List[str]):
+        for removed in table_ids:
+            self.tables.pop(removed, None)
+        self.components, self.predecessors = [], []
+        self._index()
+
+    def clear(self):
+        self.remove(list(self.tables))
+
+    def get(self, table: str) -> Optional[Table]:
+        return self.tables.get(table)
+
+    def resolve(self, name: str) -> Optional[str]:
+        """The "schema.table" id of `name`, which may be unqualified when the table name is unambiguous."""
+        name = name.lower()
+        if name in self.tables:
+            return name
+        matches = self.by_name.get(name.split(".")[-1], [])
+        if "." in name:
+            matches = [match for match in matches if match.lower() == name]
+        return matches[0] if len(matches) == 1 else None
+
+    def neighbors(self, table: str) -> List[Tuple[str, Join]]:
+        """(join partner, join) pairs of `table` over foreign keys in either direction."""
+        return self.edges.get(table, [])
+
+    def join_path(self, source: str, target: str) -> Optional[List[Join]]:
+        """The joins along a shortest foreign-key path from `source` to `target`, None when they are not connected."""
+        source, target = self.resolve(source), self.resolve(target)
+        if source is None or target is None:
+            return None
+        if source == target:
+            return []
+        source_position, target_position = self.positions.get(source), self.positions.get(target)
+        if source_position is None or target_position is None or source_position[0] != target_position[0]:
+            return None
+        members = self.components[source_position[0]]
+        row = self.predecessors[source_position[0]][source_position[1]]
+        path, current = [], target_position[1]
+        while current != source_position[1]:
+            previous = int(row[current])
+            path.append((members[previous], members[current]))
+            current = previous
+        joins = []
+        for left, right in reversed(path):
+            joins.append(next(join for neighbor, join in self.edges[left] if neighbor == right))
+        return joins
+
+    def join_clause(self, source: str, target: str) -> Optional[str]:
+        """A ready FROM ... JOIN ... ON clause joining `source` to `target`, e.g. for "how do I join sales to route"."""
+        joins = self.join_path(source, target)
+        if joins is None:
+            return None
+        current = self.resolve(source)
+        lines = [f"FROM {current}"]
+        for join in joins:
+            current = join.reference_table if join.table == current else join.table
+            lines.append(f"JOIN {current} ON {join.condition()}")
+        return "\n".join(lines)
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+def get_schema_catalog() -> SchemaCatalog:
+    """Process-wide catalog loaded from SCHEMA_CATALOG_PATH and refreshed when the crawl rewrites it."""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = SchemaCatalog(current_dir.parent / config.get("SCHEMA_CATALOG_PATH", ".askdb/schema_catalog.pkl"))
+        _catalog.refresh()
+        return _catalog
+
+def set_schema_catalog(catalog: SchemaCatalog):
+    """Replace the shared catalog, e.g. with a synthetic one in benchmarks."""
+    global _catalog
+    with _catalog_lock:
+        _catalog = catalog
@@ -0,0 +1,168 @@
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from tools.config import config
+
+from tools.keyword_index import BM25Index, HybridSearch
+from tools.schema_catalog import Column, Join, SchemaCatalog, Table, table_id
+from tools.vector_store import LocalVectorStore
+
+current_dir = Path(__file__).resolve().parent
+
+
+def column_documents(metadata: dict) -> List[Document]:
+    """One short document per column, carrying its table's description."""
+    docs = []
+    for column in metadata["columns"]:
+        text = f"Column `{column['column_name']}` ({column['column_type']}) of table `{metadata['schema_name']}.{metadata['table_name']}`"
+        if column["column_description"]:
+            text += f": {column['column_description']}"
+        if metadata["table_description"]:
+            text += f". The table {metadata['table_description']}"
+        docs.append(Document(page_content=text, metadata={
+            "schema_name": metadata["schema_name"],
+            "table_name": metadata["table_name"],
+            "column_name": column["column_name"],
+        }))
+    return docs
+
+
+def column_id(doc: Document) -> str:
+    return f"{doc.metadata['schema_name']}.{doc.metadata['table_name']}.{doc.metadata['column_name']}"
+
+
+class ColumnIndex:
+    """Column-granularity index: BM25 over the column documents, fused with a local vector store when given."""
+
+    def __init__(self, keyword_index: BM25Index, vector_store: Optional[LocalVectorStore] = None, fetch_k: int = 50):
+        self.keyword_index = keyword_index
+        self.vector_store = vector_store
+        self.search = HybridSearch(vector_store, keyword_index, fetch_k=fetch_k) if vector_store is not None else None
+
+    def upsert_tables(self, metadatas: List[dict]):
+        self.delete_tables([table_id(metadata["schema_name"], metadata["table_name"]) for metadata in metadatas])
+        docs = [doc for metadata in metadatas for doc in column_documents(metadata)]
+        ids = [column_id(doc) for doc in docs]
+        self.keyword_index.add_documents(docs, ids=ids)
+        if self.vector_store is not None:
+            self.vector_store.add_documents(docs, ids=ids)
+
+    def delete_tables(self, table_ids: List[str]):
+        prefixes = tuple(f"{table}." for table in table_ids)
+        if not prefixes:
+            return
+        self.keyword_index.delete(ids=[doc_id for doc_id in self.keyword_index.documents if doc_id.startswith(prefixes)])
+        if self.vector_store is not None:
+            stale = [doc_id for doc_id in self.vector_store.ids if doc_id.startswith(prefixes)]
+            if stale:
+                self.vector_store.delete(ids=stale)
+
+    def clear(self):
+        self.keyword_index.delete(delete_all=True)
+        if self.vector_store is not None:
+            self.vector_store.delete(delete_all=True)
+
+    def save(self):
+        self.keyword_index.save()
+
+    def similarity_search(self, query: str, k: int = 4) -> List[Document]:
+        if self.search is not None:
+            return self.search.similarity_search(query, k=k)
+        return self.keyword_index.search(query, k=k)
+
+
+def _render_table(table: Table, columns: List[Column], joins: List[Join], expanded: bool) -> str:
+    header = f"Table `{table.id}`" + (" (join partner)" if expanded else "")
+    lines = [header + (f": {table.description}" if table.description else "")]
+    if table.primary_key:
+        lines.append(f"Primary key: `{table.primary_key}`")
+    lines.append("Columns:")
+    for column in columns:
+        line = f"- `{column.name}` ({column.type})"
+        lines.append(line + (f": {column.description}" if column.description else ""))
+    if joins:
+        lines.append("Joins:")
+        lines.extend(f"- {join.condition()}" for join in joins)
+    return "\n".join(lines)
+
+
+class SchemaContextRetriever:
+    """Retrieval at column granularity that returns one compact document per relevant table.
+
+    Column hits are grouped by table and the best `k` tables are kept. Up to `max_join_partners`
+    tables joined to them along the foreign-key graph are added (`expand_hops` hops). Each table document lists only
+    the hit columns plus its primary and join keys, capped at `max_columns_per_table`.
+    """
+
+    def __init__(self, column_index: ColumnIndex, catalog: SchemaCatalog, columns_k: int = 40, max_columns_per_table: int = 12, expand_hops: int = 1, max_join_partners: int = 5):
+        self.column_index = column_index
+        self.catalog = catalog
+        self.columns_k = columns_k
+        self.max_columns_per_table = max_columns_per_table
+        self.expand_hops = expand_hops
+        self.max_join_partners = max_join_partners
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        self.catalog.refresh()
+        # Dicts keep insertion order, so tables are ranked by their best column hit
+        hits: Dict[str, List[str]] = {}
+        for doc in self.column_index.similarity_search(query, k=self.columns_k):
+            table = table_id(doc.metadata["schema_name"], doc.metadata["table_name"])
+            if self.catalog.get(table) is not None:
+                hits.setdefault(table, []).append(doc.metadata["column_name"])
+        selected = list(hits)[:k]
+
+        expanded = []
+        frontier = list(selected)
+        for _ in range(self.expand_hops):
+            next_frontier = []
+            for table in frontier:
+                for neighbor, _ in self.catalog.neighbors(table):
+                    if len(expanded) >= self.max_join_partners:
+                        break
+                    if neighbor not in selected and neighbor not in expanded and self.catalog.get(neighbor) is not None:
+                        expanded.append(neighbor)
+                        next_frontier.append(neighbor)
+            frontier = next_frontier
+
+        included = set(selected) | set(expanded)
+        docs = []
+        for table_key in selected + expanded:
+            table = self.catalog.get(table_key)
+            joins = [join for neighbor, join in self.catalog.neighbors(table_key) if neighbor in included and join.table == table_key]
+            # Keys first so the cap never drops what the joins need, then the hit columns by rank
+            wanted = table.primary_key.split(", ") if table.primary_key else []
+            wanted += [join.column for join in joins]
+            wanted += [
+                join.reference_column for neighbor, join in self.catalog.neighbors(table_key)
+                if neighbor in included and join.reference_table == table_key
+            ]
+            wanted = list(dict.fromkeys(wanted + hits.get(table_key, [])))[:self.max_columns_per_table]
+            columns = [column for column in table.columns if column.name in wanted]
+            docs.append(Document(
+                page_content=_render_table(table, columns, joins, table_key in expanded),
+                metadata={"schema_name": table.schema_name, "table_name": table.name}
+            ))
+
+        # Tables the expansion could not connect get a precomputed multi-hop join clause instead
+        for table_key in selected[1:]:
+            if table_key not in expanded and not any(neighbor in included for neighbor, _ in self.catalog.neighbors(table_key)):
+                clause = self.catalog.join_clause(selected[0], table_key)
+                if clause:
+                    docs.append(Document(
+                        page_content=f"To join `{selected[0]}` to `{table_key}`:\n{clause}",
+                        metadata={"join_path": f"{selected[0]}->{table_key}"}
+                    ))
+        return docs
+
+
+def get_column_index(embeddings: Optional[Embeddings] = None) -> ColumnIndex:
+    """Column index under COLUMN_INDEX_PATH; columns are also embedded when `embeddings` is given."""
+    path = current_dir.parent / config.get("COLUMN_INDEX_PATH", ".askdb/column_index")
+    return ColumnIndex(
+        BM25Index(path / "keyword_index.json", column_boost=0),
+        LocalVectorStore(embeddings, path=path / "vector_store") if embeddings is not None else None,
+        fetch_k=int(config.get("COLUMN_INDEX_FETCH_K", 50))
+    )
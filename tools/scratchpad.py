@@ -0,0 +1,80 @@
+import re
+from typing import List, Optional, Tuple
+
+from langchain_core.agents import AgentAction
+
+VALIDATE_TOOL = "validate_redshift_query"
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough OpenAI token count, about four characters per token."""
+    return (len(text) + 3) // 4
+
+
+def _normalize_sql(sql: str) -> str:
+    return re.sub(r"\s+", " ", sql).strip().rstrip(";").lower()
+
+
+def _truncate(observation: str, max_chars: int) -> str:
+    if len(observation) <= max_chars:
+        return observation
+    omitted = estimate_tokens(observation[max_chars:])
+    return f"{observation[:max_chars]}... [truncated {omitted} tokens of an older observation]"
+
+
+class Scratchpad:
+    """Agent steps kept under a token budget before they are rendered into the prompt.
+
+    Repeated validations of the same query keep only the latest one. When the steps
+    exceed `token_budget`, observations older than the last `keep_recent` steps are
+    truncated to `compact_observation_chars`, oldest first. `token_budget=None` disables compaction.
+    """
+
+    def __init__(self, token_budget: Optional[int] = 2000, keep_recent: int = 2, compact_observation_chars: int = 200):
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        self.compact_observation_chars = compact_observation_chars
+        self.raw_steps: List[Tuple[AgentAction, str]] = []
+        self.iterations: List[dict] = []
+
+    def add(self, action: AgentAction, observation: str):
+        self.raw_steps.append((action, observation))
+
+    def _deduplicated(self) -> List[Tuple[AgentAction, str]]:
+        last_validation = {}
+        for i, (action, _) in enumerate(self.raw_steps):
+            if action.tool == VALIDATE_TOOL:
+                last_validation[_normalize_sql(str(action.tool_input))] = i
+        keep = set(last_validation.values())
+        return [
+            step for i, step in enumerate(self.raw_steps)
+            if step[0].tool != VALIDATE_TOOL or i in keep
+        ]
+
+    def steps(self) -> List[Tuple[AgentAction, str]]:
+        """The steps to render into the next prompt, deduplicated and compacted."""
+        if self.token_budget is None:
+            return list(self.raw_steps)
+        steps = self._deduplicated()
+        total = self.tokens(steps)
+        for i in range(max(len(steps) - self.keep_recent, 0)):
+            if total <= self.token_budget:
+                break
+            action, observation = steps[i]
+            compacted = _truncate(observation, self.compact_observation_chars)
+            total -= estimate_tokens(observation) - estimate_tokens(compacted)
+            steps[i] = (action, compacted)
+        return steps
+
+    @staticmethod
+    def tokens(steps: List[Tuple[AgentAction, str]]) -> int:
+        return sum(estimate_tokens(action.log) + estimate_tokens(observation) for action, observation in steps)
+
+    def record_iteration(self, prompt_tokens: int, completion_tokens: int, scratchpad_tokens: int):
+        self.iterations.append({
+            "iteration": len(self.iterations) + 1,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "scratchpad_tokens": scratchpad_tokens,
+            "uncompacted_scratchpad_tokens": self.tokens(self.raw_steps),
+        })
@@ -0,0 +1,142 @@
+import difflib
+from typing import List, Optional
+
+import sqlglot
+from sqlglot import exp
+from sqlglot.optimizer.scope import Scope, traverse_scope
+
+from tools.schema_catalog import SchemaCatalog
+from tools.sql_parse import DIALECT
+
+# Tables Redshift provides itself, never in the crawled catalog
+SYSTEM_TABLE_PREFIXES = ("pg_", "stl_", "stv_", "svl_", "svv_", "sys_", "information_schema")
+
+
+def _suggest(name: str, candidates) -> str:
+    matches = difflib.get_close_matches(name, list(candidates), n=1)
+    return f", did you mean `{matches[0]}`?" if matches else ""
+
+
+class _Checker:
+    def __init__(self, catalog: SchemaCatalog):
+        self.catalog = catalog
+        self.schemas = {table.schema_name.lower() for table in catalog.tables.values()}
+        self.errors: List[str] = []
+
+    def error(self, message: str):
+        if message not in self.errors:
+            self.errors.append(message)
+
+    def table(self, table: exp.Table) -> Optional[str]:
+        """The catalog id of `table`, None when it is not a crawled table; unknown crawled names are reported."""
+        name, schema = table.name.lower(), table.db.lower()
+        if not name:
+            return None
+        if schema:
+            if schema not in self.schemas:
+                if not schema.startswith(SYSTEM_TABLE_PREFIXES) and _suggest(schema, self.schemas):
+                    self.error(f"Unknown schema `{schema}`{_suggest(schema, self.schemas)}")
+                return None
+            qualified = f"{schema}.{name}"
+            if qualified not in self.catalog.tables:
+                in_schema = [table_id.split(".", 1)[1] for table_id in self.catalog.tables if table_id.startswith(f"{schema}.")]
+                self.error(f"Unknown table `{qualified}`{_suggest(name, in_schema)}")
+                return None
+            return qualified
+        matches = self.catalog.by_name.get(name, [])
+        if not matches:
+            if not name.startswith(SYSTEM_TABLE_PREFIXES):
+                self.error(f"Unknown table `{name}`{_suggest(name, self.catalog.by_name)}")
+            return None
+        # An ambiguous bare name is resolved by the search path, leave it to the warehouse
+        return matches[0] if len(matches) == 1 else None
+
+    def source_columns(self, source) -> Optional[set]:
+        """Lowercased columns a FROM source exposes, None when they are unknown."""
+        if isinstance(source, exp.Table):
+            table_key = self.table(source)
+            return self.catalog.tables[table_key].column_names if table_key else None
+        if isinstance(source, Scope) and isinstance(source.expression, exp.Query):
+            names = source.expression.named_selects
+            if "*" in names or any(select.is_star for select in source.expression.selects):
+                return None
+            return {name.lower() for name in names}
+        return None
+
+    def scope(self, scope: Scope):
+        # Redshift folds identifiers to lower case, so table aliases and qualifiers match in any case
+        sources = {alias.lower(): source for alias, source in scope.sources.items()}
+        if scope.is_subquery:
+            # Subqueries may be correlated, their columns can also come from the enclosing queries
+            for parent in _parents(scope):
+                for alias, source in parent.sources.items():
+                    sources.setdefault(alias.lower(), source)
+        columns = {alias: self.source_columns(source) for alias, source in sources.items()}
+        aliases = {select.alias.lower() for select in getattr(scope.expression, "selects", []) if isinstance(select, exp.Alias)}
+        # Columns of nested subqueries are listed in the enclosing scope too, they are checked in their own scope
+        nested = {id(column) for child in scope.subquery_scopes for column in child.columns}
+        for column in scope.columns:
+            name = column.name.lower()
+            if not name or name == "*" or id(column) in nested:
+                continue
+            qualifier = column.table.lower()
+            if qualifier:
+                if qualifier not in columns:
+                    self.error(f"Unknown table or alias `{qualifier}` in `{column.sql(dialect=DIALECT)}`")
+                elif columns[qualifier] is not None and name not in columns[qualifier]:
+                    self.error(f"Column `{name}` does not exist in `{_source_name(sources[qualifier], qualifier)}`{_suggest(name, columns[qualifier])}")
+                continue
+            if name in aliases or any(known is None for known in columns.values()):
+                continue
+            if not any(name in known for known in columns.values()):
+                candidates = set().union(*columns.values()) if columns else set()
+                names = ", ".join(f"`{_source_name(source, alias)}`" for alias, source in sources.items())
+                self.error(f"Column `{name}` does not exist in {names or 'the query'}{_suggest(name, candidates)}")
+
+
+def _parents(scope: Scope) -> List[Scope]:
+    parents, parent = [], scope.parent
+    while parent is not None:
+        parents.append(parent)
+        parent = parent.parent
+    return parents
+
+
+def _source_name(source, alias: str) -> str:
+    if isinstance(source, exp.Table):
+        return f"{source.db}.{source.name}" if source.db else source.name
+    return alias
+
+
+def check_sql(sql: str, catalog: Optional[SchemaCatalog] = None) -> List[str]:
+    """Statically check generated SQL before it reaches the warehouse, returning error messages (empty when it passes).
+
+    Only single read-only queries are allowed. Tables and columns are resolved against `catalog`; names outside
+    the crawled schemas and anything that cannot be resolved with certainty are left to the warehouse.
+    """
+    try:
+        statements = [statement for statement in sqlglot.parse(sql.strip().rstrip(";"), read=DIALECT) if statement is not None]
+    except sqlglot.errors.ParseError as e:
+        error = e.errors[0] if e.errors else {}
+        location = f" at line {error['line']}, column {error['col']}" if error.get("line") else ""
+        description = error.get("description", str(e)).split(" but got ")[0]
+        near = f" near `{error['highlight']}`" if error.get("highlight") else ""
+        return [f"Syntax error{location}{near}: {description}"]
+    if len(statements) != 1:
+        return ["Only one statement can be run at a time"]
+    statement = statements[0]
+    if not isinstance(statement, exp.Query):
+        return [f"Only SELECT queries are allowed, not {statement.key.upper()} statements"]
+    if statement.find(exp.Into) is not None:
+        # SELECT ... INTO creates a table
+        return ["Only SELECT queries are allowed, not SELECT INTO statements"]
+    if catalog is None or not catalog.tables:
+        return []
+    checker = _Checker(catalog)
+    try:
+        scopes = traverse_scope(statement)
+    except sqlglot.errors.OptimizeError:
+        return []
+    for scope in scopes:
+        checker.scope(scope)
+    return checker.errors
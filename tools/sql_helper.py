@@ -1,21 +1,11 @@
 import re
+from typing import List, Optional, Union
 import sqlalchemy as sa
-from langchain_openai import OpenAI
-from langchain.prompts import PromptTemplate
-from dotenv import load_dotenv
-import os
-from pathlib import Path
-from langchain.schema import Document
-from streamlit import secrets
-
-current_dir = Path(__file__).resolve().parent
-dotenv_path = current_dir.parent / '.env'
-load_dotenv(dotenv_path)
-
-openai_api_key = secrets["OPENAI_API_KEY"]
-redshift_dsn = secrets["REDSHIFT_DSN"]
-
-engine = sa.create_engine(redshift_dsn)
+from langchain_core.prompts import PromptTemplate
+from langchain_core.documents import Document
+from tools.config import config
+from tools.cache import get_llm_cache
+from tools.db import connect
 
 def parse_foreign_key_constraint(sql_statement):
     # Regular expression pattern to match the components
@@ -37,8 +27,15 @@ def parse_foreign_key_constraint(sql_statement):
     else:
         raise ValueError("Invalid SQL statement: Could not parse foreign key constraint")
     
+def add_primary_key_column(primary_key: dict, column_name: str, constraint_name: str):
+    """Add a key column to `primary_key`, a composite key's columns are joined with ", " in key order."""
+    if primary_key:
+        primary_key["primary_key_column"] += f", {column_name}"
+    else:
+        primary_key.update({"primary_key_column": column_name, "primary_key_name": constraint_name})
+
 def get_table_metadata(schema_name: str, table_name: str) -> dict:
-    with engine.connect() as connection:
+    with connect() as connection:
         columns = []
         foreigns = []
         primary_key = {}
@@ -81,15 +78,13 @@ def get_table_metadata(schema_name: str, table_name: str) -> dict:
         left join information_schema.key_column_usage b 
         on b.table_schema = a.table_schema and b.table_name = a.table_name and b.constraint_name = a.constraint_name
         where a.table_schema = '{schema_name}' and a.table_name = '{table_name}'
+        order by a.constraint_name, b.ordinal_position
         """
         constraint_result = connection.execute(sa.text(constraint_query))
         constraint_rows = constraint_result.fetchall()
         for constraint_row in constraint_rows:
             if constraint_row[4] == "PRIMARY KEY":
-                primary_key = {
-                    "primary_key_column": constraint_row[3],
-                    "primary_key_name": constraint_row[2]
-                }
+                add_primary_key_column(primary_key, constraint_row[3], constraint_row[2])
             if constraint_row[4] == "FOREIGN KEY":
                 index = next((i for i, item in enumerate(foreigns) if item['foreign_key'] == constraint_row[3]), -1)
                 if index != -1:
@@ -104,11 +99,105 @@ def get_table_metadata(schema_name: str, table_name: str) -> dict:
             "columns": columns 
         }
         return output_result
+
+def get_schemas_metadata(schema_names: Union[str, List[str]]) -> List[dict]:
+    """Crawl every table of one or more schemas with a fixed number of catalog queries.
+
+    Produces the same dict per table as `get_table_metadata`, without the per-table
+    round trips and without the slow `admin.v_generate_tbl_ddl` view.
+    """
+    if isinstance(schema_names, str):
+        schema_names = [schema_names]
+    schema_param = sa.bindparam("schema_names", expanding=True)
+    params = {"schema_names": list(schema_names)}
+
+    tables_query = sa.text("""
+    SELECT ns.nspname, cl.relname, des.description
+    FROM pg_catalog.pg_class cl
+    JOIN pg_catalog.pg_namespace ns ON ns.oid = cl.relnamespace
+    LEFT JOIN pg_catalog.pg_description des ON des.objoid = cl.oid AND des.objsubid = 0
+    WHERE cl.relkind IN ('r', 'v')
+    AND ns.nspname IN :schema_names
+    ORDER BY ns.nspname, cl.relname
+    """).bindparams(schema_param)
+
+    columns_query = sa.text("""
+    SELECT ns.nspname, cl.relname, att.attname, des.description, ty.typname
+    FROM pg_catalog.pg_attribute att
+    LEFT JOIN pg_catalog.pg_description des ON att.attrelid = des.objoid AND att.attnum = des.objsubid
+    LEFT JOIN pg_type ty ON ty.oid = att.atttypid
+    LEFT JOIN pg_class cl ON cl.oid = att.attrelid
+    LEFT JOIN pg_catalog.pg_namespace ns ON ns.oid = cl.relnamespace
+    WHERE att.attnum > 0
+    AND cl.relkind IN ('r', 'v')
+    AND ns.nspname IN :schema_names
+    ORDER BY ns.nspname, cl.relname, att.attnum
+    """).bindparams(schema_param)
+
+    # pg_constraint replaces both the information_schema lookups and parsing
+    # the DDL from admin.v_generate_tbl_ddl, which are slow on large catalogs.
+    # One row per key column, a key has at most 32 of them
+    constraint_query = sa.text("""
+    SELECT ns.nspname, cl.relname, con.conname, con.contype, att.attname, fns.nspname, fcl.relname, fatt.attname
+    FROM pg_catalog.pg_constraint con
+    CROSS JOIN generate_series(1, 32) AS pos(i)
+    JOIN pg_catalog.pg_class cl ON cl.oid = con.conrelid
+    JOIN pg_catalog.pg_namespace ns ON ns.oid = cl.relnamespace
+    JOIN pg_catalog.pg_attribute att ON att.attrelid = con.conrelid AND att.attnum = con.conkey[pos.i]
+    LEFT JOIN pg_catalog.pg_class fcl ON fcl.oid = con.confrelid
+    LEFT JOIN pg_catalog.pg_namespace fns ON fns.oid = fcl.relnamespace
+    LEFT JOIN pg_catalog.pg_attribute fatt ON fatt.attrelid = con.confrelid AND fatt.attnum = con.confkey[pos.i]
+    WHERE con.contype IN ('p', 'f')
+    AND ns.nspname IN :schema_names
+    ORDER BY ns.nspname, cl.relname, con.conname, pos.i
+    """).bindparams(schema_param)
+
+    tables = {}
+    with connect() as connection:
+        for row in connection.execute(tables_query, params).fetchall():
+            tables[(row[0], row[1])] = {
+                "schema_name": row[0],
+                "table_name": row[1],
+                "table_description": row[2].strip() if row[2] else "",
+                "primary_key": {},
+                "foreign_keys": [],
+                "columns": []
+            }
+
+        for row in connection.execute(columns_query, params).fetchall():
+            table = tables.get((row[0], row[1]))
+            if table is not None:
+                table["columns"].append({
+                    "column_name": row[2],
+                    "column_description": row[3] if row[3] else "",
+                    "column_type": row[4]
+                })
+
+        for row in connection.execute(constraint_query, params).fetchall():
+            table = tables.get((row[0], row[1]))
+            if table is None:
+                continue
+            if row[3] == "p":
+                add_primary_key_column(table["primary_key"], row[4], row[2])
+            else:
+                # A composite foreign key is one entry per column pair, with the same constraint name
+                table["foreign_keys"].append({
+                    'foreign_key': row[4],
+                    'foreign_name': row[2],
+                    'reference_schema_name': row[5],
+                    'reference_table_name': row[6],
+                    'reference_key': row[7]
+                })
+
+    return list(tables.values())
     
-def meaningful_text_from_metadata(metadata: dict) -> Document:
+def metadata_to_text(metadata: dict) -> str:
     meaningful_text = f"""
 Table `{metadata["table_name"]}` in schema `{metadata["schema_name"]}` is a table that {metadata["table_description"]}.
-
+"""
+    # Views and tables without a primary key have none to describe
+    if metadata["primary_key"]:
+        meaningful_text += f"""
 The table has a primary key with column name `{metadata["primary_key"]["primary_key_column"]}` and the name of the constraint is `{metadata["primary_key"]["primary_key_name"]}` which uniquely identifies each row.
     """
     first = True
@@ -118,7 +207,7 @@ The table has a primary key with column name `{metadata["primary_key"]["primary_
             first = False
         else:
             _temp = "It also "
-        _temp += f"maintains a foreign key relationship through the `{foreign_key["foreign_key"]}` column, which references the `{foreign_key["reference_key"]}` column in the table `{foreign_key["reference_table_name"]}` table from schema `{foreign_key["reference_schema_name"]}`, the constraint name is `{foreign_key["foreign_name"]}`.\n"
+        _temp += f"maintains a foreign key relationship through the `{foreign_key['foreign_key']}` column, which references the `{foreign_key['reference_key']}` column in the table `{foreign_key['reference_table_name']}` table from schema `{foreign_key['reference_schema_name']}`, the constraint name is `{foreign_key['foreign_name']}`.\n"
         meaningful_text += _temp
         _temp = ""
     
@@ -128,21 +217,25 @@ The table has a primary key with column name `{metadata["primary_key"]["primary_
         meaningful_text += _temp
         _temp = ""
     meaningful_text += "\n"
-    assumption_summary = get_assumption_summary_and_relationship(meaningful_text)
+    return meaningful_text
+
+def meaningful_text_from_metadata(metadata: dict, assumption_summary: Optional[str] = None) -> Document:
+    meaningful_text = metadata_to_text(metadata)
+    if assumption_summary is None:
+        assumption_summary = get_assumption_summary_and_relationship(meaningful_text)
     meaningful_text += "\n" + assumption_summary + "\n"
     doc = Document(
         page_content=meaningful_text,
         metadata = {
             "table_name": metadata["table_name"], 
             "schema_name": metadata["schema_name"],
-            "primary_key": metadata["primary_key"]["primary_key_column"],
+            "primary_key": metadata["primary_key"].get("primary_key_column", ""),
+            "columns": [column["column_name"] for column in metadata["columns"]],
         }
     )
     return doc
 
-def get_assumption_summary_and_relationship(query: str) -> str:
-    llm = OpenAI(api_key=openai_api_key)
-    template = """
+SUMMARY_TEMPLATE = """
 Given the information about a table in redshift, write an assumption about the table purpose. Also add assumption about the relationship. 
 Example output: 
 This table seems or assumed to be ... 
@@ -156,7 +249,20 @@ Input:
 {query}
 ```
     """
-    prompt = PromptTemplate.from_template(template)
-    chain = prompt | llm
-    result = chain.invoke({"query": query})
+
+_summary_chain = None
+
+def get_summary_chain():
+    """Build the summary chain once; the OpenAI client inside it is thread-safe and reused."""
+    global _summary_chain
+    if _summary_chain is None:
+        from langchain_openai import OpenAI
+
+        llm = OpenAI(api_key=config["OPENAI_API_KEY"], cache=get_llm_cache())
+        prompt = PromptTemplate.from_template(SUMMARY_TEMPLATE)
+        _summary_chain = prompt | llm
+    return _summary_chain
+
+def get_assumption_summary_and_relationship(query: str) -> str:
+    result = get_summary_chain().invoke({"query": query})
     return str(result)
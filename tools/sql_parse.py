@@ -0,0 +1,28 @@
+from typing import List
+
+import sqlglot
+from sqlglot import exp
+
+DIALECT = "redshift"
+
+
+def extract_tables(sql: str) -> List[str]:
+    """Return the lowercased tables a query reads, schema-qualified when the query qualifies them.
+
+    CTE names are excluded. Returns an empty list when the SQL cannot be parsed.
+    """
+    try:
+        expressions = [e for e in sqlglot.parse(sql, read=DIALECT) if e is not None]
+    except sqlglot.errors.ParseError:
+        return []
+    tables = []
+    for expression in expressions:
+        cte_names = {cte.alias_or_name.lower() for cte in expression.find_all(exp.CTE)}
+        for table in expression.find_all(exp.Table):
+            name = table.name.lower()
+            if not name or (not table.db and name in cte_names):
+                continue
+            qualified = f"{table.db.lower()}.{name}" if table.db else name
+            if qualified not in tables:
+                tables.append(qualified)
+    return tables
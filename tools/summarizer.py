@@ -0,0 +1,67 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing `rate` acquisitions per second with bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def call_with_retry(func: Callable[[str], str], text: str, max_retries: int = 3, backoff: float = 1.0) -> str:
+    for attempt in range(max_retries + 1):
+        try:
+            return func(text)
+        except Exception:
+            if attempt == max_retries:
+                raise
+            # Exponential backoff with jitter so parallel workers do not retry in lockstep
+            time.sleep(backoff * (2 ** attempt) * (0.5 + random.random()))
+
+
+def summarize_texts(
+    texts: List[str],
+    summarize: Callable[[str], str],
+    concurrency: int = 8,
+    requests_per_second: Optional[float] = None,
+    max_retries: int = 3,
+    backoff: float = 1.0,
+) -> List[str]:
+    """Run `summarize` over `texts` on a bounded worker pool, preserving input order.
+
+    `requests_per_second` enables token-bucket rate limiting shared by all workers.
+    Each call is retried up to `max_retries` times with exponential backoff.
+    """
+    bucket = TokenBucket(requests_per_second) if requests_per_second else None
+
+    def limited(text: str) -> str:
+        # Retries go through the bucket too, they cost a request like any other call
+        if bucket is not None:
+            bucket.acquire()
+        return summarize(text)
+
+    def worker(text: str) -> str:
+        return call_with_retry(limited, text, max_retries=max_retries, backoff=backoff)
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        return list(executor.map(worker, texts))
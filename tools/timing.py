@@ -0,0 +1,106 @@
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from tools.tracing import NULL_SPAN, Tracer
+
+
+def token_cost(model_name: Optional[str], prompt_tokens: int, completion_tokens: int) -> float:
+    """USD cost of a call at OpenAI list prices, 0.0 for models without a known price."""
+    from langchain_community.callbacks.openai_info import TokenType, get_openai_token_cost_for_model
+
+    if not model_name:
+        return 0.0
+    try:
+        return (
+            get_openai_token_cost_for_model(model_name, prompt_tokens, token_type=TokenType.PROMPT)
+            + get_openai_token_cost_for_model(model_name, completion_tokens, token_type=TokenType.COMPLETION)
+        )
+    except ValueError:
+        return 0.0
+
+
+def llm_usage(response: LLMResult) -> Tuple[int, int, float, Optional[str]]:
+    """Prompt tokens, completion tokens, cost and model name of an LLM call."""
+    llm_output = response.llm_output or {}
+    prompt_tokens = completion_tokens = 0
+    model_name = llm_output.get("model_name")
+    for generation in (g for generations in response.generations for g in generations):
+        message = getattr(generation, "message", None)
+        usage = getattr(message, "usage_metadata", None)
+        if usage:
+            prompt_tokens += usage["input_tokens"]
+            completion_tokens += usage["output_tokens"]
+        model_name = model_name or (message.response_metadata.get("model_name") if message is not None else None)
+    if not prompt_tokens and not completion_tokens:
+        token_usage = llm_output.get("token_usage") or {}
+        prompt_tokens = token_usage.get("prompt_tokens", 0)
+        completion_tokens = token_usage.get("completion_tokens", 0)
+    return prompt_tokens, completion_tokens, token_cost(model_name, prompt_tokens, completion_tokens), model_name
+
+
+class StageUsageHandler(BaseCallbackHandler):
+    """Callback handler that charges every LLM call's tokens and cost to the timer's current stage."""
+
+    def __init__(self, timer: "StageTimer"):
+        self.timer = timer
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any):
+        prompt_tokens, completion_tokens, cost, _ = llm_usage(response)
+        self.timer.add_usage(prompt_tokens, completion_tokens, cost)
+
+
+class StageTimer:
+    """Accumulates wall-clock seconds per named pipeline stage, plus LLM calls, tokens and cost.
+
+    Pass `timer.callbacks` to LLM invocations so their usage is charged to the stage running them.
+    With a `tracer` the timer also records spans, `span` does nothing without one.
+    """
+
+    def __init__(self, tracer: Optional[Tracer] = None):
+        self.timings: Dict[str, float] = {}
+        self.usage: Dict[str, Dict[str, float]] = {}
+        self.current: Optional[str] = None
+        self.tracer = tracer
+        self.callbacks = [StageUsageHandler(self)] + (tracer.callbacks if tracer is not None else [])
+
+    def span(self, name: str, **attributes):
+        return self.tracer.span(name, **attributes) if self.tracer is not None else NULL_SPAN
+
+    @contextmanager
+    def stage(self, name: str):
+        outer = self.current
+        self.current = name
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+            self.current = outer
+
+    def add_usage(self, prompt_tokens: int, completion_tokens: int, cost: float):
+        usage = self.usage.setdefault(self.current or "other", {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost": 0.0})
+        usage["calls"] += 1
+        usage["prompt_tokens"] += prompt_tokens
+        usage["completion_tokens"] += completion_tokens
+        usage["cost"] += cost
+
+    def total(self) -> float:
+        return sum(self.timings.values())
+
+    def total_cost(self) -> float:
+        return sum(usage["cost"] for usage in self.usage.values())
+
+    def report(self) -> str:
+        parts = []
+        for name, seconds in self.timings.items():
+            part = f"{name}={seconds * 1000:.1f}ms"
+            usage = self.usage.get(name)
+            if usage:
+                tokens = usage["prompt_tokens"] + usage["completion_tokens"]
+                part += f" (llm_calls={usage['calls']}, tokens={tokens}, cost=${usage['cost']:.6f})"
+            parts.append(part)
+        return ", ".join(parts)
@@ -0,0 +1,255 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from tools.config import config
+
+current_dir = Path(__file__).resolve().parent
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("askdb_current_span", default=None)
+
+
+class Span:
+    """One timed operation of a question, e.g. retrieval, an agent iteration, an LLM or a tool call."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None, attributes: Optional[dict] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = attributes or {}
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def end(self):
+        self.end_ns = time.time_ns()
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+        }
+
+
+class _NullSpan:
+    """Stand-in returned when tracing is off, so instrumented code needs no checks."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set(self, **attributes):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+def annotate(**attributes):
+    """Add attributes to the innermost open span, e.g. rows fetched inside a tool call; a no-op when not tracing."""
+    span = _current_span.get()
+    if span is not None:
+        span.set(**attributes)
+
+
+def _otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(spans: List[Span], service_name: str = "askdb") -> dict:
+    """Spans as an OTLP/JSON ExportTraceServiceRequest, the OpenTelemetry file exporter format."""
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+        "scopeSpans": [{
+            "scope": {"name": "askdb"},
+            "spans": [
+                {
+                    "traceId": span.trace_id,
+                    "spanId": span.span_id,
+                    "parentSpanId": span.parent_id or "",
+                    "name": span.name,
+                    "kind": 1,
+                    "startTimeUnixNano": str(span.start_ns),
+                    "endTimeUnixNano": str(span.end_ns or span.start_ns),
+                    "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()],
+                    "status": {"code": 2 if "error" in span.attributes else 0},
+                }
+                for span in spans
+            ],
+        }],
+    }]}
+
+
+class TraceExporter:
+    """Appends every finished trace to a file: one JSON object per span ("jsonl") or one OTLP/JSON request per trace ("otlp")."""
+
+    def __init__(self, path: Path, format: str = "jsonl"):
+        if format not in ("jsonl", "otlp"):
+            raise ValueError(f"Unknown trace export format '{format}', use 'jsonl' or 'otlp'")
+        self.path = Path(path)
+        self.format = format
+        self.lock = threading.Lock()
+
+    def export(self, spans: List[Span]):
+        if self.format == "otlp":
+            lines = [json.dumps(to_otlp(spans), default=str)]
+        else:
+            lines = [json.dumps(span.to_dict(), default=str) for span in spans]
+        with self.lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write("\n".join(lines) + "\n")
+
+
+class TracingHandler(BaseCallbackHandler):
+    """Callback handler recording every LLM call as a span under the span that made it."""
+
+    def __init__(self, tracer: "Tracer"):
+        self.tracer = tracer
+        self.runs: Dict[UUID, Span] = {}
+
+    def _start(self, serialized: Optional[dict], run_id: UUID, kwargs: dict):
+        model = (kwargs.get("invocation_params") or {}).get("model_name") or (serialized or {}).get("name", "")
+        self.runs[run_id] = self.tracer.start_span("llm", model=model)
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any):
+        self._start(serialized, run_id, kwargs)
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[list], *, run_id: UUID, **kwargs: Any):
+        self._start(serialized, run_id, kwargs)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+        from tools.timing import llm_usage
+
+        span = self.runs.pop(run_id, None)
+        if span is not None:
+            prompt_tokens, completion_tokens, cost, model_name = llm_usage(response)
+            span.set(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens, cost=cost)
+            if model_name:
+                span.set(model=model_name)
+            span.end()
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        span = self.runs.pop(run_id, None)
+        if span is not None:
+            span.set(error=repr(error))
+            span.end()
+
+
+class Tracer:
+    """Collects the spans of one question under a root span and exports them when it finishes.
+
+    Spans opened with `span` nest through a context variable. A span left open across a generator's
+    yield is the parent of whatever its consumer traces meanwhile, so the agent loop closes its spans
+    before yielding events; the root span, opened with `start`, is not a context span at all.
+    LLM calls are recorded through `callbacks` and `annotate` adds attributes to the innermost open span.
+    """
+
+    def __init__(self, exporter: Optional[TraceExporter] = None):
+        self.trace_id = os.urandom(16).hex()
+        self.exporter = exporter
+        self.spans: List[Span] = []
+        self.root: Optional[Span] = None
+        self.callbacks = [TracingHandler(self)]
+
+    def start(self, name: str, **attributes) -> Span:
+        self.root = self.start_span(name, **attributes)
+        return self.root
+
+    def finish(self, **attributes):
+        """End the root span and export the trace."""
+        if self.root is not None:
+            self.root.set(**attributes)
+            self.root.end()
+        if self.exporter is not None:
+            self.exporter.export(self.spans)
+
+    def start_span(self, name: str, **attributes) -> Span:
+        """A span under the innermost open one, or the root span, ended by the caller with `Span.end`."""
+        parent = _current_span.get()
+        if parent is None or parent.trace_id != self.trace_id:
+            parent = self.root
+        span = Span(name, self.trace_id, parent.span_id if parent is not None else None, attributes)
+        self.spans.append(span)
+        return span
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        span = self.start_span(name, **attributes)
+        outer = _current_span.get()
+        _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set(error=repr(e))
+            raise
+        finally:
+            span.end()
+            # Not ContextVar.reset, a generator may be closed from another context than it started in
+            _current_span.set(outer)
+
+    def waterfall(self) -> List[dict]:
+        """The spans as rows with start and end offsets in ms from the first span, in start order."""
+        if not self.spans:
+            return []
+        origin = min(span.start_ns for span in self.spans)
+        depths: Dict[str, int] = {}
+        rows = []
+        for i, span in enumerate(sorted(self.spans, key=lambda span: span.start_ns), start=1):
+            depths[span.span_id] = depths.get(span.parent_id, -1) + 1
+            rows.append({
+                "span": f"{i:02d} {'  ' * depths[span.span_id]}{span.name}",
+                "start_ms": (span.start_ns - origin) / 1e6,
+                "end_ms": ((span.end_ns or span.start_ns) - origin) / 1e6,
+                "duration_ms": span.duration_ms,
+                "attributes": span.attributes,
+            })
+        return rows
+
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+def new_tracer() -> Optional[Tracer]:
+    """A tracer for one question when TRACING_ENABLED is set, exporting to TRACING_EXPORT_PATH if configured."""
+    global _exporter
+    if not config.get("TRACING_ENABLED", False):
+        return None
+    with _exporter_lock:
+        if _exporter is None and config.get("TRACING_EXPORT_PATH", ""):
+            _exporter = TraceExporter(
+                current_dir.parent / config["TRACING_EXPORT_PATH"],
+                format=config.get("TRACING_EXPORT_FORMAT", "jsonl")
+            )
+    return Tracer(_exporter)
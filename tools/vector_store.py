@@ -0,0 +1,174 @@
+import json
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from tools.config import config
+
+current_dir = Path(__file__).resolve().parent
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+class LocalVectorStore(VectorStore):
+    """In-process vector store holding normalized embeddings in a NumPy matrix.
+
+    Search is a single matrix-vector product followed by `argpartition` top-k.
+    When `path` is set the matrix is persisted as `vectors.npy` (loaded memory-mapped)
+    next to a `documents.json` holding ids, texts and metadata. Both are reloaded when
+    the crawl process rewrites them.
+    """
+
+    def __init__(self, embedding: Embeddings, path: Optional[Path] = None):
+        self.embedding = embedding
+        self.path = Path(path) if path is not None else None
+        self.ids: List[str] = []
+        self.documents: List[Document] = []
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self._mtime = None
+        self.lock = threading.Lock()
+        if self.path is not None and (self.path / "documents.json").exists():
+            self.load()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    def load(self):
+        # documents.json is swapped in last, its mtime marks a complete save
+        mtime = (self.path / "documents.json").stat().st_mtime
+        stored = json.loads((self.path / "documents.json").read_text())
+        vectors = np.load(self.path / "vectors.npy", mmap_mode="r")
+        if len(vectors) != len(stored):
+            # Caught between the two swaps of a save, the next search loads it again
+            return
+        self.ids = [item["id"] for item in stored]
+        self.documents = [Document(page_content=item["page_content"], metadata=item["metadata"]) for item in stored]
+        self.vectors = vectors
+        self._mtime = mtime
+
+    def refresh(self):
+        with self.lock:
+            if self.path is not None and (self.path / "documents.json").exists() and (self.path / "documents.json").stat().st_mtime != self._mtime:
+                self.load()
+
+    def save(self):
+        if self.path is None:
+            return
+        self.path.mkdir(parents=True, exist_ok=True)
+        stored = [
+            {"id": doc_id, "page_content": doc.page_content, "metadata": doc.metadata}
+            for doc_id, doc in zip(self.ids, self.documents)
+        ]
+        # Write to temporary files and swap so readers never see a half-written index
+        with open(self.path / "vectors.npy.tmp", "wb") as f:
+            np.save(f, np.ascontiguousarray(self.vectors))
+        (self.path / "documents.json.tmp").write_text(json.dumps(stored))
+        os.replace(self.path / "vectors.npy.tmp", self.path / "vectors.npy")
+        os.replace(self.path / "documents.json.tmp", self.path / "documents.json")
+        self._mtime = (self.path / "documents.json").stat().st_mtime
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+        vectors = _normalize(np.asarray(self.embedding.embed_documents(texts), dtype=np.float32))
+
+        self._remove(set(ids))
+        new_documents = [Document(page_content=text, metadata=metadata) for text, metadata in zip(texts, metadatas)]
+        self.vectors = vectors if len(self.ids) == 0 else np.vstack([self.vectors, vectors])
+        self.ids.extend(ids)
+        self.documents.extend(new_documents)
+        self.save()
+        return ids
+
+    def _remove(self, ids: set):
+        keep = [i for i, doc_id in enumerate(self.ids) if doc_id not in ids]
+        if len(keep) == len(self.ids):
+            return
+        self.vectors = np.asarray(self.vectors[keep])
+        self.ids = [self.ids[i] for i in keep]
+        self.documents = [self.documents[i] for i in keep]
+
+    def delete(self, ids: Optional[List[str]] = None, delete_all: Optional[bool] = None, **kwargs: Any) -> Optional[bool]:
+        if delete_all:
+            self.ids, self.documents = [], []
+            self.vectors = np.zeros((0, 0), dtype=np.float32)
+        elif ids:
+            self._remove(set(ids))
+        self.save()
+        return True
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4) -> List[Tuple[Document, float]]:
+        self.refresh()
+        documents, vectors = self.documents, self.vectors
+        if len(documents) == 0:
+            return []
+        query = _normalize(np.asarray([embedding], dtype=np.float32))[0]
+        scores = vectors @ query
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(documents[i], float(scores[i])) for i in top]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self.embedding.embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self):
+        return self._cosine_relevance_score_fn
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        path: Optional[Path] = None,
+        **kwargs: Any,
+    ) -> "LocalVectorStore":
+        store = cls(embedding, path=path)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
+
+
+def get_vectorstore(embeddings: Embeddings) -> VectorStore:
+    """Build the vector store selected by the VECTOR_STORE secret ("pinecone" or "local")."""
+    backend = config.get("VECTOR_STORE", "pinecone")
+    if backend == "local":
+        return LocalVectorStore(
+            embeddings,
+            path=current_dir.parent / config.get("LOCAL_VECTOR_STORE_PATH", ".askdb/vector_store")
+        )
+    if backend == "pinecone":
+        from langchain_pinecone import PineconeVectorStore
+        return PineconeVectorStore(
+            index_name=config["PINECONE_INDEX_NAME"],
+            embedding=embeddings,
+            pinecone_api_key=config["PINECONE_API_KEY"]
+        )
+    raise ValueError(f"Unknown VECTOR_STORE '{backend}', expected 'pinecone' or 'local'.")